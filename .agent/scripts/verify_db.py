@@ -1,22 +1,81 @@
 import sys
 import os
-from pathlib import Path
-from dotenv import load_dotenv
+from concurrent.futures import ThreadPoolExecutor
 
-# Load environment variables
-load_dotenv()
-
-# Add project root to path
-project_root = Path(__file__).parent.parent.parent
-sys.path.append(str(project_root))
+import requests
 
+# Requires the project to be installed: pip install -e .
 try:
+    # Loads .env once (cached) before db_manager reads SUPABASE_* vars
+    from config import get_config
+    get_config()
     from src.db_manager import db
     from supabase import Client
 except ImportError as e:
     print(f"Error importing modules: {e}")
+    print("Install the project first: pip install -e .")
     sys.exit(1)
 
+def _fetch_existing_tables(expected_tables):
+    """
+    Returns the subset of expected_tables that exist, using a single RPC call.
+    Returns None if the list_tables() function is not installed.
+    """
+    try:
+        response = db.client.rpc('list_tables', {'names': list(expected_tables)}).execute()
+    except Exception as e:
+        print(f"  ⚠️ RPC 'list_tables' unavailable ({e}); probing tables one by one.")
+        return None
+
+    found = set()
+    for row in response.data or []:
+        # PostgREST returns scalars for SETOF TEXT, but some versions wrap them
+        found.add(row['list_tables'] if isinstance(row, dict) else row)
+    return found
+
+def _probe(session, table):
+    """
+    Checks a single table with a HEAD request against PostgREST.
+    Returns (table, status) where status is 'found', 'missing' or an error message.
+    """
+    try:
+        response = session.head(
+            f"{db.url.rstrip('/')}/rest/v1/{table}",
+            params={"select": "*"},
+            headers={"Range": "0-0"},
+            timeout=15,
+        )
+    except requests.RequestException as e:
+        return (table, str(e))
+
+    if response.status_code in (200, 206):
+        return (table, "found")
+    if response.status_code == 404:
+        return (table, "missing")
+    return (table, f"HTTP {response.status_code}")
+
+def _probe_tables(expected_tables):
+    """Fallback: probe each table concurrently so the round-trips overlap."""
+    found = set()
+    with requests.Session() as session:
+        session.headers.update({"apikey": db.key, "Authorization": f"Bearer {db.key}"})
+
+        # Warm-up: the first probe opens the session's connection on its own,
+        # then the remaining probes reuse the pool concurrently
+        results = [_probe(session, expected_tables[0])]
+        rest = expected_tables[1:]
+        if rest:
+            with ThreadPoolExecutor(max_workers=min(8, len(rest))) as ex:
+                results.extend(ex.map(lambda table: _probe(session, table), rest))
+
+    for table, status in results:
+        if status == "found":
+            found.add(table)
+        elif status != "missing":
+            # Permission or server errors: assume missing for safety if strictly verifying schema
+            print(f"  ⚠️ Error checking '{table}': {status}")
+    return found
+
 def check_database():
     print(f"Checking database connection...")
     
@@ -31,10 +90,9 @@ def check_database():
         print("✅ Client initialized.")
         
         # 2. Check Tables
-        # Using RPC if available or simpler method?
-        # Supabase postgrest doesn't easily expose information_schema via the JS/Python client usually 
-        # unless permissions allow.
-        # However, we can try to query each table we expect to exist with limit=0 to see if it errors.
+        # Preferred: one round-trip via the list_tables() RPC (see docs/V2/database_migration.sql),
+        # which reads information_schema.tables server-side.
+        # Fallback: query each table we expect to exist with limit=0 to see if it errors.
         
         expected_tables = [
             "profiles",
@@ -45,27 +103,18 @@ def check_database():
             "audit_log"
         ]
         
-        missing_tables = []
-        existing_tables = []
-        
         print("\nVerifying tables:")
-        for table in expected_tables:
-            try:
-                # Select 1 row just to check existence
-                db.client.table(table).select("count", count="exact").limit(0).execute()
+        existing = _fetch_existing_tables(expected_tables)
+        if existing is None:
+            existing = _probe_tables(expected_tables)
+        
+        missing_tables = set(expected_tables) - existing
+        # dict.fromkeys: report each table once, in the declared order
+        for table in dict.fromkeys(expected_tables):
+            if table in missing_tables:
+                print(f"  ❌ Table '{table}' NOT found or not accessible.")
+            else:
                 print(f"  ✅ Table '{table}' found.")
-                existing_tables.append(table)
-            except Exception as e:
-                # If error contains "relation ... does not exist"
-                err_str = str(e).lower()
-                if "does not exist" in err_str or "info" in err_str: # API might return 404
-                     print(f"  ❌ Table '{table}' NOT found or not accessible.")
-                     missing_tables.append(table)
-                else:
-                     print(f"  ⚠️ Error checking '{table}': {e}")
-                     # allow it might be permission issue but likely table exists?
-                     # assume missing for safety if strictly verifying schema
-                     missing_tables.append(table)
 
         print("\n" + "="*40)
         if not missing_tables:
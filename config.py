@@ -5,39 +5,162 @@ Configuração centralizada para o agente de qualidade de dados.
 """
 
 import os
+import re
+from dataclasses import dataclass
+from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Optional
 from dotenv import load_dotenv
 
-# Carrega variáveis de ambiente
-load_dotenv()
+if TYPE_CHECKING:
+    # numpy é importado sob demanda nas funções de limites (import de config fica leve)
+    import numpy as np
 
-# === REDCap API Configuration ===
-REDCAP_API_URL = os.getenv("REDCAP_API_URL", "")
-REDCAP_API_TOKEN = os.getenv("REDCAP_API_TOKEN", "")
-REDCAP_TIMEOUT = int(os.getenv("REDCAP_TIMEOUT", "120"))
+def _freeze(mapping: dict) -> MappingProxyType:
+    """Congela um dicionário de configuração (dicts internos → proxies, listas → tuplas)."""
+    frozen = {}
+    for key, value in mapping.items():
+        if isinstance(value, dict):
+            value = MappingProxyType(dict(value))
+        elif isinstance(value, list):
+            value = tuple(value)
+        frozen[key] = value
+    return MappingProxyType(frozen)
 
-# === AI Configuration ===
-AI_PROVIDER = os.getenv("AI_PROVIDER", "gemini").lower() # 'anthropic', 'openai' or 'gemini'
-ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY", "")
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
-GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY", "")
 
-# === Authentication Configuration ===
-SUPABASE_URL = os.getenv("SUPABASE_URL", "")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY", "")
-SECRET_KEY = os.getenv("SECRET_KEY", "dev-secret-key-change-me")
+# Marcador para que subprocessos (que herdam o ambiente) não releiam o .env
+_ENV_LOADED_FLAG = "AUDITPRO_ENV_LOADED"
 
-# === Debug Mode ===
-DEBUG = os.getenv("DEBUG", "false").lower() == "true"
+
+@dataclass(frozen=True, slots=True)
+class Config:
+    """Configurações lidas do ambiente (imutáveis após o carregamento)."""
+    
+    # === REDCap API Configuration ===
+    redcap_api_url: str
+    redcap_api_token: str
+    redcap_timeout: int
+    
+    # === AI Configuration ===
+    ai_provider: str  # 'anthropic', 'openai' or 'gemini'
+    anthropic_api_key: str
+    openai_api_key: str
+    google_api_key: str
+    ai_cache: bool  # cache persistente de respostas (src/llm_cache.py); opt-in, grava dados clínicos em disco
+    ai_model_overrides: MappingProxyType  # {"<provedor>.<tier>": "modelo"}
+    ai_probe_on_init: bool  # testa os modelos Gemini disponíveis ao criar o AIAnalyzer
+    
+    # === Authentication Configuration ===
+    supabase_url: str
+    supabase_key: str
+    secret_key: str
+    
+    # === Debug Mode ===
+    debug: bool
+
+
+def _parse_model_overrides(raw: str) -> MappingProxyType:
+    """
+    Lê AI_MODEL_OVERRIDES no formato "anthropic.cheap=claude-x,gemini.deep=gemini-y".
+    
+    Entradas malformadas são ignoradas.
+    """
+    overrides = {}
+    for item in raw.split(","):
+        key, sep, model = item.partition("=")
+        if sep and key.strip() and model.strip():
+            overrides[key.strip().lower()] = model.strip()
+    return MappingProxyType(overrides)
+
+
+@lru_cache(maxsize=1)
+def get_config() -> Config:
+    """
+    Carrega as configurações do ambiente uma única vez por processo.
+    
+    O arquivo .env só é lido se o ambiente ainda não foi carregado
+    (por este processo ou pelo processo pai).
+    
+    Returns:
+        Config imutável com todas as configurações
+    """
+    if not os.environ.get(_ENV_LOADED_FLAG):
+        load_dotenv()
+        os.environ[_ENV_LOADED_FLAG] = "1"
+    
+    return Config(
+        redcap_api_url=os.getenv("REDCAP_API_URL", ""),
+        redcap_api_token=os.getenv("REDCAP_API_TOKEN", ""),
+        redcap_timeout=int(os.getenv("REDCAP_TIMEOUT", "120")),
+        ai_provider=os.getenv("AI_PROVIDER", "gemini").lower(),
+        anthropic_api_key=os.getenv("ANTHROPIC_API_KEY", ""),
+        openai_api_key=os.getenv("OPENAI_API_KEY", ""),
+        google_api_key=os.getenv("GOOGLE_API_KEY", ""),
+        ai_cache=os.getenv("AI_CACHE", "false").lower() == "true",
+        ai_model_overrides=_parse_model_overrides(os.getenv("AI_MODEL_OVERRIDES", "")),
+        ai_probe_on_init=os.getenv("AI_PROBE_ON_INIT", "false").lower() == "true",
+        supabase_url=os.getenv("SUPABASE_URL", ""),
+        supabase_key=os.getenv("SUPABASE_KEY", ""),
+        secret_key=os.getenv("SECRET_KEY", "dev-secret-key-change-me"),
+        debug=os.getenv("DEBUG", "false").lower() == "true",
+    )
+
+
+_config = get_config()
+
+# Aliases de módulo (compatibilidade com `config.REDCAP_API_URL` etc.)
+REDCAP_API_URL = _config.redcap_api_url
+REDCAP_API_TOKEN = _config.redcap_api_token
+REDCAP_TIMEOUT = _config.redcap_timeout
+
+AI_PROVIDER = _config.ai_provider
+ANTHROPIC_API_KEY = _config.anthropic_api_key
+OPENAI_API_KEY = _config.openai_api_key
+GOOGLE_API_KEY = _config.google_api_key
+AI_CACHE = _config.ai_cache
+AI_MODEL_OVERRIDES = _config.ai_model_overrides
+AI_PROBE_ON_INIT = _config.ai_probe_on_init
+
+SUPABASE_URL = _config.supabase_url
+SUPABASE_KEY = _config.supabase_key
+SECRET_KEY = _config.secret_key
+
+DEBUG = _config.debug
+
+# === AI Models ===
+# Modelo por provedor e tier: "deep" para análise/resumo, "cheap" para tarefas
+# estruturadas (sugestões de correção, interpretação de regras)
+AI_MODELS = _freeze({
+    "anthropic": {"deep": "claude-3-5-sonnet-20240620", "cheap": "claude-haiku-4-5"},
+    "openai": {"deep": "gpt-4-turbo-preview", "cheap": "gpt-4o-mini"},
+    "gemini": {"deep": "gemini-1.5-pro", "cheap": "gemini-1.5-flash"},
+})
+
+
+def ai_model(provider: str, tier: str) -> str:
+    """
+    Retorna o modelo de um provedor para o tier ("deep" ou "cheap").
+    
+    AI_MODEL_OVERRIDES (env) tem precedência sobre AI_MODELS.
+    """
+    return AI_MODEL_OVERRIDES.get(f"{provider}.{tier}") or AI_MODELS[provider][tier]
 
 # === Paths ===
 BASE_DIR = Path(__file__).parent
 OUTPUT_DIR = BASE_DIR / "output"
-OUTPUT_DIR.mkdir(exist_ok=True)
+
+
+@lru_cache(maxsize=1)
+def ensure_output_dir() -> Path:
+    """Cria OUTPUT_DIR na primeira escrita (e só uma vez por processo)."""
+    OUTPUT_DIR.mkdir(exist_ok=True)
+    return OUTPUT_DIR
 
 # === Clinical Validation Limits ===
 # Limites fisiológicos padrão (podem ser sobrescritos por protocolo)
-CLINICAL_LIMITS = {
+CLINICAL_LIMITS = _freeze({
     # Sinais vitais
     "systolic_bp": {"min": 50, "max": 250, "unit": "mmHg"},
     "diastolic_bp": {"min": 30, "max": 150, "unit": "mmHg"},
@@ -57,10 +180,61 @@ CLINICAL_LIMITS = {
     "creatinine": {"min": 0.1, "max": 30, "unit": "mg/dL"},
     "potassium": {"min": 1.5, "max": 10, "unit": "mEq/L"},
     "sodium": {"min": 100, "max": 180, "unit": "mEq/L"},
-}
+})
+
+
+def build_limit_arrays(limits: dict) -> tuple[dict[str, int], "np.ndarray", "np.ndarray"]:
+    """
+    Compila um dicionário de limites clínicos em arrays paralelos (SoA).
+    
+    Args:
+        limits: Dicionário no formato de CLINICAL_LIMITS
+        
+    Returns:
+        Tupla (índice {campo: posição}, array de mínimos, array de máximos).
+        Limites ausentes viram -inf/+inf para não gerar violações.
+    """
+    import numpy as np
+    
+    field_index = {key: idx for idx, key in enumerate(limits)}
+    min_arr = np.array(
+        [v.get("min") if v.get("min") is not None else -np.inf for v in limits.values()],
+        dtype=np.float64,
+    )
+    max_arr = np.array(
+        [v.get("max") if v.get("max") is not None else np.inf for v in limits.values()],
+        dtype=np.float64,
+    )
+    return field_index, min_arr, max_arr
+
+
+@lru_cache(maxsize=1)
+def _default_limit_arrays() -> tuple[dict[str, int], "np.ndarray", "np.ndarray"]:
+    """Arrays SoA de CLINICAL_LIMITS (construídos sob demanda, uma única vez)."""
+    return build_limit_arrays(CLINICAL_LIMITS)
+
+
+def validate_batch(field: str, values, limit_arrays=None) -> "np.ndarray":
+    """
+    Verifica um vetor de valores contra os limites clínicos de um campo.
+    
+    Args:
+        field: Chave de CLINICAL_LIMITS (ex: "heart_rate")
+        values: Valores numéricos (NaN para ausentes/inválidos)
+        limit_arrays: Arrays de build_limit_arrays() (padrão: CLINICAL_LIMITS)
+        
+    Returns:
+        Máscara booleana, True onde o valor está fora dos limites
+    """
+    import numpy as np
+    
+    field_index, min_arr, max_arr = limit_arrays or _default_limit_arrays()
+    idx = field_index[field]
+    values = np.asarray(values, dtype=np.float64)
+    return np.less(values, min_arr[idx]) | np.greater(values, max_arr[idx])
 
 # === Query Priority Definitions ===
-PRIORITY_LEVELS = {
+PRIORITY_LEVELS = _freeze({
     "Alta": [
         "Riscos para integridade do estudo",
         "Segurança do participante",
@@ -79,10 +253,10 @@ PRIORITY_LEVELS = {
         "Informações complementares",
         "Campos opcionais inconsistentes",
     ],
-}
+})
 
 # === Issue Types ===
-ISSUE_TYPES = {
+ISSUE_TYPES = _freeze({
     # Estruturais
     "required_field_empty": "Campo obrigatório vazio",
     "value_out_of_range": "Valor fora do range permitido",
@@ -110,8 +284,31 @@ ISSUE_TYPES = {
     "suspicious_edit_pattern": "Padrão de edição suspeito",
     "edit_after_closure": "Alteração após encerramento",
     "high_edit_volume": "Alto volume de edições",
+})
+
+# Prioridade padrão por tipo de issue (tipos ausentes → "Média")
+ISSUE_TYPE_PRIORITY = _freeze({
+    "required_field_empty": "Alta",
+    "physiologically_impossible": "Alta",
+    "inclusion_criteria_violated": "Alta",
+    "exclusion_criteria_violated": "Alta",
+    "death_date_inconsistent": "Alta",
+    "followup_before_baseline": "Alta",
+    "field_should_be_empty": "Baixa",
+})
+
+# Índice invertido de PRIORITY_LEVELS: descrição → prioridade
+_LABEL_TO_PRIORITY = {
+    label: priority
+    for priority, labels in PRIORITY_LEVELS.items()
+    for label in labels
 }
 
+
+def priority_for(label: str) -> str:
+    """Retorna a prioridade de uma descrição de PRIORITY_LEVELS (padrão: "Baixa")."""
+    return _LABEL_TO_PRIORITY.get(label, "Baixa")
+
 # === Validation Settings ===
 DATE_FORMATS = [
     "%Y-%m-%d",
@@ -121,20 +318,69 @@ DATE_FORMATS = [
     "%Y-%m-%d %H:%M:%S",
 ]
 
-# Campos que tipicamente são datas de referência
-BASELINE_DATE_FIELDS = [
+# Equivalentes pré-compilados de DATE_FORMATS (strptime re-interpreta o formato a cada chamada)
+_ISO_DATE_RE = re.compile(r"(\d{4})-(\d{1,2})-(\d{1,2})(?: (\d{1,2}):(\d{1,2})(?::(\d{1,2}))?)?\Z")
+_SLASH_DATE_RE = re.compile(r"(\d{1,2})/(\d{1,2})/(\d{4})\Z")
+
+
+def parse_date(value: str) -> Optional[datetime]:
+    """
+    Faz parse de uma data em um dos formatos de DATE_FORMATS.
+    
+    Despacha pelo separador (ISO com '-' ou '/' dia/mês) e aplica uma única
+    regex; datas com '/' tentam dia/mês/ano antes de mês/dia/ano, na mesma
+    ordem de DATE_FORMATS.
+    
+    Args:
+        value: String já sem espaços nas pontas
+        
+    Returns:
+        datetime ou None se não corresponder a nenhum formato
+    """
+    if value[4:5] == "-":
+        match = _ISO_DATE_RE.match(value)
+        if not match:
+            return None
+        year, month, day, hour, minute, second = match.groups()
+        try:
+            return datetime(
+                int(year), int(month), int(day),
+                int(hour or 0), int(minute or 0), int(second or 0),
+            )
+        except ValueError:
+            return None
+    
+    match = _SLASH_DATE_RE.match(value)
+    if not match:
+        return None
+    first, second, year = int(match.group(1)), int(match.group(2)), int(match.group(3))
+    try:
+        return datetime(year, second, first)  # %d/%m/%Y
+    except ValueError:
+        pass
+    try:
+        return datetime(year, first, second)  # %m/%d/%Y
+    except ValueError:
+        return None
+
+# Campos que tipicamente são datas de referência (ordem = preferência)
+BASELINE_DATE_FIELDS = (
     "enrollment_date",
     "baseline_date",
     "consent_date",
     "study_start_date",
     "data_inclusao",
     "data_baseline",
-]
+)
 
 # Campos que tipicamente são datas finais
-CRITICAL_DATE_FIELDS = [
+CRITICAL_DATE_FIELDS = (
     "death_date",
     "data_obito",
     "withdrawal_date",
     "data_saida",
-]
+)
+
+# Versões para teste de pertinência O(1) nos loops por registro × campo
+BASELINE_DATE_FIELDS_SET = frozenset(BASELINE_DATE_FIELDS)
+CRITICAL_DATE_FIELDS_SET = frozenset(CRITICAL_DATE_FIELDS)
@@ -58,3 +58,12 @@ CREATE TABLE IF NOT EXISTS ml_models (
 -- Ensure checksums or immutable flags if strictly required
 ALTER TABLE audit_log ADD COLUMN IF NOT EXISTS ip_address INET;
 ALTER TABLE audit_log ADD COLUMN IF NOT EXISTS user_agent TEXT;
+
+-- 7. SCHEMA VERIFICATION HELPER
+-- Lets .agent/scripts/verify_db.py check all expected tables in a single RPC call
+CREATE OR REPLACE FUNCTION public.list_tables(names TEXT[])
+RETURNS SETOF TEXT AS $$
+    SELECT table_name::TEXT
+    FROM information_schema.tables
+    WHERE table_schema = 'public' AND table_name = ANY(names)
+$$ LANGUAGE sql STABLE;
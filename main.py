@@ -7,25 +7,24 @@ Interface de linha de comando para o agente de qualidade de dados.
 import sys
 import argparse
 from pathlib import Path
-from datetime import datetime
 
 from rich.console import Console
-from rich.panel import Panel
-from rich.progress import Progress, SpinnerColumn, TextColumn
 
 # Adiciona diretório pai ao path
 sys.path.insert(0, str(Path(__file__).parent))
 
-import config
-from src.redcap_client import REDCapClient, create_client_from_env, REDCapAPIError
-from src.query_generator import QueryGenerator
-from src.models import ProjectData
+# Imports pesados (src.*, rich.progress) ficam dentro de cada modo,
+# para que --help e --test-connection não paguem pelo que não usam.
 
-console = Console()
+# Em execuções não interativas (CI, pipe) dispensa cores, highlight e banner
+INTERACTIVE = sys.stdout.isatty()
+console = Console(no_color=not INTERACTIVE, highlight=False)
 
 
 def print_banner():
     """Imprime banner do agente."""
+    if not INTERACTIVE:
+        return
     banner = """
 ╔═══════════════════════════════════════════════════════════════════╗
 ║          REDCap Data Quality Intelligence Agent v1.0              ║
@@ -39,6 +38,9 @@ def print_banner():
 
 def test_connection(args):
     """Testa conexão com a API REDCap."""
+    from rich.progress import Progress, SpinnerColumn, TextColumn
+    from src.redcap_client import create_client_from_env, REDCapAPIError
+    
     console.print("\n[bold]🔌 Testando conexão com REDCap...[/bold]")
     
     try:
@@ -55,9 +57,9 @@ def test_connection(args):
             progress.update(task, description="Conexão estabelecida!")
         
         console.print("\n[green]✅ Conexão bem-sucedida![/green]")
-        console.print(f"   Projeto: {project_info.get('project_title', 'N/A')}")
-        console.print(f"   ID: {project_info.get('project_id', 'N/A')}")
-        console.print(f"   Longitudinal: {'Sim' if project_info.get('is_longitudinal') else 'Não'}")
+        console.print(f"   Projeto: {project_info.get('project_title', 'N/A')}", markup=False)
+        console.print(f"   ID: {project_info.get('project_id', 'N/A')}", markup=False)
+        console.print(f"   Longitudinal: {'Sim' if project_info.get('is_longitudinal') else 'Não'}", markup=False)
         
     except ValueError as e:
         console.print(f"\n[red]❌ Erro de configuração: {e}[/red]")
@@ -72,12 +74,17 @@ def test_connection(args):
 
 def run_analysis(args):
     """Executa análise completa."""
+    from rich.progress import Progress, SpinnerColumn, TextColumn
+    import config
+    from src.redcap_client import create_client_from_env, REDCapAPIError
+    from src.query_generator import QueryGenerator
+    
     console.print("\n[bold]🔍 Iniciando Análise de Qualidade de Dados...[/bold]")
     
     try:
         # Conecta à API
         console.print("\n[cyan]Conectando à API REDCap...[/cyan]")
-        client = create_client_from_env()
+        client = create_client_from_env(use_cache=not args.no_cache)
         
         # Exporta dados
         with Progress(
@@ -91,11 +98,11 @@ def run_analysis(args):
         
         # Estatísticas dos dados
         console.print("\n[bold]📊 Dados do Projeto:[/bold]")
-        console.print(f"   • Campos (metadata): {len(project_data.metadata)}")
-        console.print(f"   • Registros: {len(project_data.records)}")
-        console.print(f"   • Eventos: {len(project_data.events)}")
-        console.print(f"   • Braços: {len(project_data.arms)}")
-        console.print(f"   • Logs: {len(project_data.logs)}")
+        console.print(f"   • Campos (metadata): {len(project_data.metadata)}", markup=False)
+        console.print(f"   • Registros: {len(project_data.records)}", markup=False)
+        console.print(f"   • Eventos: {len(project_data.events)}", markup=False)
+        console.print(f"   • Braços: {len(project_data.arms)}", markup=False)
+        console.print(f"   • Logs: {len(project_data.logs)}", markup=False)
         
         # Executa análise
         generator = QueryGenerator(
@@ -141,6 +148,8 @@ def run_analysis(args):
 
 def run_demo(args):
     """Executa demonstração com dados fictícios."""
+    from src.query_generator import QueryGenerator
+    
     console.print("\n[bold]🎯 Modo Demonstração[/bold]")
     console.print("[dim]Executando análise com dados fictícios...[/dim]")
     
@@ -175,71 +184,80 @@ def main():
         formatter_class=argparse.RawDescriptionHelpFormatter,
         epilog="""
 Exemplos de uso:
-  python main.py --test-connection     Testa conexão com REDCap
-  python main.py --analyze             Executa análise completa
-  python main.py --analyze -v          Análise com queries detalhadas
-  python main.py --demo                Demo com dados fictícios
+  python main.py test-connection       Testa conexão com REDCap
+  python main.py analyze               Executa análise completa
+  python main.py analyze -v            Análise com queries detalhadas
+  python main.py demo                  Demo com dados fictícios
         """,
     )
     
-    # Modos de operação
-    mode_group = parser.add_mutually_exclusive_group(required=True)
-    mode_group.add_argument(
-        "--test-connection", "-t",
-        action="store_true",
+    # Modos de operação (cada um só conhece as próprias opções)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    
+    subparsers.add_parser(
+        "test-connection",
+        aliases=["t"],
         help="Testa conexão com a API REDCap",
     )
-    mode_group.add_argument(
-        "--analyze", "-a",
-        action="store_true",
+    
+    analyze_parser = subparsers.add_parser(
+        "analyze",
+        aliases=["a"],
         help="Executa análise completa de qualidade",
     )
-    mode_group.add_argument(
-        "--demo", "-d",
-        action="store_true",
+    demo_parser = subparsers.add_parser(
+        "demo",
+        aliases=["d"],
         help="Executa demonstração com dados fictícios",
     )
     
     # Opções de análise
-    parser.add_argument(
+    analyze_parser.add_argument(
         "--verbose", "-v",
         action="store_true",
         help="Exibe queries detalhadas no console",
     )
-    parser.add_argument(
-        "--limit", "-l",
-        type=int,
-        default=20,
-        help="Limite de queries a exibir (padrão: 20)",
-    )
-    parser.add_argument(
+    for sub in (analyze_parser, demo_parser):
+        sub.add_argument(
+            "--limit", "-l",
+            type=int,
+            default=20,
+            help="Limite de queries a exibir (padrão: 20)",
+        )
+    analyze_parser.add_argument(
         "--priority", "-p",
         choices=["Alta", "Média", "Baixa"],
         help="Filtrar queries por prioridade",
     )
-    parser.add_argument(
+    analyze_parser.add_argument(
         "--include-logs",
         action="store_true",
         help="Incluir análise de logs de auditoria",
     )
-    parser.add_argument(
+    analyze_parser.add_argument(
         "--output", "-o",
         type=str,
         help="Caminho para salvar o relatório JSON",
     )
+    analyze_parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Ignora o cache de metadados/eventos e consulta a API novamente",
+    )
     
     args = parser.parse_args()
     
     print_banner()
     
-    if args.test_connection:
-        return test_connection(args)
-    elif args.analyze:
-        return run_analysis(args)
-    elif args.demo:
-        return run_demo(args)
-    
-    return 0
+    commands = {
+        "test-connection": test_connection,
+        "t": test_connection,
+        "analyze": run_analysis,
+        "a": run_analysis,
+        "demo": run_demo,
+        "d": run_demo,
+    }
+    return commands[args.command](args)
 
 
 if __name__ == "__main__":
@@ -4,5 +4,8 @@ import os
 
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 5000))
-    print(f"Iniciando servidor de produção na porta {port}...")
-    serve(app, host='0.0.0.0', port=port)
+    # Processo único: analysis_cache (web_app) vive em memória e precisa ser
+    # compartilhado entre requisições, então escalamos por threads, não por workers.
+    threads = int(os.environ.get("WAITRESS_THREADS", max(16, 4 * (os.cpu_count() or 1))))
+    print(f"Iniciando servidor de produção na porta {port} ({threads} threads)...")
+    serve(app, host='0.0.0.0', port=port, threads=threads)
@@ -5,29 +5,554 @@ Agente com IA para análise inteligente de qualidade de dados.
 Utiliza LangChain com Claude para fornecer insights mais profundos.
 """
 
+import asyncio
+import copy
+import difflib
+import hashlib
+import importlib
 import json
-from typing import Optional
+import logging
+import re
+import threading
+from collections import Counter, OrderedDict
+from functools import lru_cache
+from typing import Iterator, Optional, Union
 
-# Tenta importar LangChain (opcional)
+import requests
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_exponential_jitter
+
+# tiktoken dá a contagem exata de tokens (opcional; sem ele usa estimativa por caracteres)
 try:
-    from langchain_anthropic import ChatAnthropic
-    from langchain_openai import ChatOpenAI
-    from langchain_core.prompts import ChatPromptTemplate
-    from langchain_core.output_parsers import StrOutputParser
-    LANGCHAIN_AVAILABLE = True
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
 except ImportError:
-    LANGCHAIN_AVAILABLE = False
+    TIKTOKEN_AVAILABLE = False
 
-# Tenta importar Google GenAI
+# orjson faz parse/serialização em C; json é o fallback
 try:
-    import google.generativeai as genai
-    GOOGLE_GENAI_AVAILABLE = True
+    import orjson
+    ORJSON_AVAILABLE = True
 except ImportError:
-    GOOGLE_GENAI_AVAILABLE = False
+    ORJSON_AVAILABLE = False
 
-from src.models import ProjectData, Query, QualityReport
+from pydantic import BaseModel
+
+from src.models import ProjectData, Query, QualityReport, RuleSchema
+from src.llm_cache import response_cache
 import config
-import json
+
+logger = logging.getLogger(__name__)
+
+
+# === Prompts estáticos ===
+# Montados uma única vez por processo; só a parte variável é formatada por chamada.
+
+_ANALYZE_SYSTEM_PROMPT = """Você é um especialista em Data Management de estudos clínicos com vasta experiência em REDCap.
+Sua tarefa é analisar os resultados de uma auditoria automática de qualidade de dados e fornecer:
+1. **Análise Executiva**: Resumo do estado geral da qualidade dos dados (2-3 parágrafos)
+2. **Principais Preocupações**: Lista das 5 questões mais críticas que precisam de atenção imediata
+3. **Padrões Identificados**: Tendências ou padrões nos erros que indicam problemas sistêmicos
+4. **Recomendações**: Ações concretas para melhorar a qualidade dos dados
+5. **Priorização**: Ordem sugerida para resolver os problemas
+Seja objetivo e técnico. Use terminologia de pesquisa clínica."""
+
+_CORRECTIONS_SYSTEM_PROMPT = """Você é um especialista em correção de dados de estudos clínicos.
+Para cada query de qualidade apresentada, sugira uma correção específica e prática.
+Responda em JSON com o formato:
+[{"field": "nome_campo", "suggestion": "sugestão de correção", "action": "ação recomendada"}]"""
+
+_SUMMARY_SYSTEM_PROMPT = """Você é um especialista em pesquisa clínica escrevendo um resumo executivo 
+para o investigador principal de um estudo. Seja conciso e profissional."""
+
+_RULE_SYSTEM_PROMPT = (
+    "Você é um assistente especialista em criação de regras de validação de dados.\n"
+    "Sua tarefa é converter uma solicitação em linguagem natural para um objeto JSON de regra estruturada.\n"
+) + """
+O Schema da Regra é:
+{
+    "name": "Nome curto e descritivo da regra",
+    "field": "nome_do_campo_snake_case (se 'todo o projeto', use '_ALL_')",
+    "rule_type": "comparison" | "range" | "regex" | "condition" | "uniqueness" | "cross_event",
+    "operator": "=" | "!=" | ">" | "<" | ">=" | "<=" | "between" | "matches" | "contains" | "unique" | "empty" | "not_empty" | "present_implies",
+    "value": "valor da regra (para cross_event, é o nome do segundo campo)",
+    "priority": "Alta" | "Média" | "Baixa",
+    "message": "Mensagem de erro amigável pro usuário",
+    "event1": "Nome do evento do primeiro campo (opcional, só para cross_event)",
+    "event2": "Nome do evento do segundo campo (opcional, só para cross_event)"
+}
+
+BIBLIOTECA DE PADRÕES INTELIGENTES:
+1. COMPARAÇÃO SIMPLES: rule_type="comparison", operator="=", value="X"
+2. RANGE NUMÉRICO: rule_type="range", operator="between", value="min,max"
+3. FORMATO (Regex): rule_type="regex", operator="matches", value="pattern"
+4. DATAS RELATIVAS (HOJE/FUTURO):
+   - "A data de nascimento não pode ser no futuro"
+   - JSON: {"rule_type": "comparison", "operator": "<=", "value": "_TODAY_"}
+   - "Data de inclusão deve ser anterior a hoje" -> operator "<", value "_TODAY_"
+   - "Data deve ser hoje ou futuro" -> operator ">=", value "_TODAY_"
+   Use o token especial "_TODAY_" sempre que a regra mencionar "hoje", "futuro", "passado" ou "data atual".
+   
+5. CROSS-EVENT (Entre Visitas):
+   - "O peso na Semana 4 deve ser menor que na Triagem"
+   - JSON: {
+       "name": "Peso Semana 4 < Triagem",
+       "field": "weight",
+       "rule_type": "cross_event",
+       "operator": "<",
+       "value": "weight", 
+       "event1": "week_4_arm_1", 
+       "event2": "screening_arm_1",
+       "priority": "Média",
+       "message": "Perda de peso esperada não observada"
+     }
+   
+Exemplos Avançados:
+
+User: "O CPF deve ter formato válido"
+JSON: {"name": "Formato CPF", "field": "cpf", "rule_type": "regex", "operator": "matches", "value": "^\\d{3}\\.\\d{3}\\.\\d{3}-\\d{2}$", "priority": "Alta", "message": "CPF fora do padrão XXX.XXX.XXX-XX"}
+
+User: "A data da alta deve ser posterior a data de admissão"
+JSON: {"name": "Consistência de Datas", "field": "dt_alta", "rule_type": "comparison", "operator": ">", "value": "dt_admissao", "priority": "Alta", "message": "Data de alta deve ser posterior à admissão"}
+
+User: "No evento Follow-up, o status deve ser Completo"
+JSON: {"name": "Status em Follow-up", "field": "status", "rule_type": "comparison", "operator": "=", "value": "Completo", "event1": "follow_up_arm_1", "priority": "Média", "message": "Status incorreto no Follow-up"}
+"""
+
+# === SDKs dos provedores (opcionais, importados sob demanda) ===
+# LangChain e google-generativeai custam centenas de ms para importar; só o
+# provedor configurado é carregado, na primeira criação de um AIAnalyzer.
+
+_CHAT_MODEL_IMPORTS = {
+    "anthropic": ("langchain_anthropic", "ChatAnthropic"),
+    "openai": ("langchain_openai", "ChatOpenAI"),
+}
+
+
+@lru_cache(maxsize=None)
+def _load_chat_model_class(provider: str):
+    """Importa a classe de chat do LangChain do provedor (None se não instalada)."""
+    module_name, class_name = _CHAT_MODEL_IMPORTS[provider]
+    try:
+        return getattr(importlib.import_module(module_name), class_name)
+    except ImportError:
+        return None
+
+
+@lru_cache(maxsize=8)
+def _shared_chat_model(provider: str, tier: str, api_key: str):
+    """
+    Cliente de chat LangChain compartilhado por (provedor, tier, chave).
+    
+    Cada cliente mantém seu próprio pool httpx; reutilizá-lo entre instâncias
+    de AIAnalyzer preserva conexões keep-alive (sem novo handshake TCP+TLS).
+    
+    Returns:
+        Instância de ChatAnthropic/ChatOpenAI, ou None se o SDK não estiver instalado
+    """
+    chat_model_class = _load_chat_model_class(provider)
+    if chat_model_class is None:
+        return None
+    return chat_model_class(
+        model=config.ai_model(provider, tier),
+        api_key=api_key,
+        temperature=0.3,
+        max_tokens=4096,
+        timeout=LLM_TIMEOUT,
+        max_retries=0,
+    )
+
+
+# Event loop de fundo usado pelas versões síncronas (suggest_corrections_batch,
+# run_full_ai_pipeline). Os clientes de _shared_chat_model ficam presos ao loop
+# em que abriram o pool httpx assíncrono; asyncio.run criaria e fecharia um loop
+# novo a cada chamada, deixando conexões de um loop já fechado no pool.
+_sync_loop: Optional[asyncio.AbstractEventLoop] = None
+_sync_loop_lock = threading.Lock()
+
+
+def _run_sync(coro):
+    """Executa uma corrotina no event loop de fundo do processo e aguarda o resultado."""
+    global _sync_loop
+    with _sync_loop_lock:
+        if _sync_loop is None:
+            _sync_loop = asyncio.new_event_loop()
+            threading.Thread(target=_sync_loop.run_forever, name="ai-analyzer-loop", daemon=True).start()
+    return asyncio.run_coroutine_threadsafe(coro, _sync_loop).result()
+
+
+@lru_cache(maxsize=1)
+def _load_genai():
+    """Importa google.generativeai (None se não instalado)."""
+    try:
+        return importlib.import_module("google.generativeai")
+    except ImportError:
+        return None
+
+
+@lru_cache(maxsize=1)
+def _chain_parts() -> tuple:
+    """
+    Template e parser do LangChain, montados uma vez por processo.
+    
+    O system prompt entra como variável do template (não como texto do template),
+    então chaves literais em exemplos JSON não precisam ser escapadas.
+    """
+    from langchain_core.prompts import ChatPromptTemplate
+    from langchain_core.output_parsers import StrOutputParser
+    
+    template = ChatPromptTemplate.from_messages([("system", "{system_prompt}"), ("human", "{user_input}")])
+    return template, StrOutputParser()
+
+
+def _text_chain(llm):
+    """Cadeia template | llm | parser de texto."""
+    template, parser = _chain_parts()
+    return template | llm | parser
+
+
+def _json_loads(data):
+    """json.loads via orjson quando disponível."""
+    return orjson.loads(data) if ORJSON_AVAILABLE else json.loads(data)
+
+
+# Bloco ```json ... ``` (ou ``` sem linguagem, qualquer caixa) em respostas de LLM
+_JSON_FENCE_RE = re.compile(r"```(?:json)?\s*(.*?)\s*```", re.S | re.I)
+
+
+def _extract_json(text: str):
+    """
+    Faz parse do JSON de uma resposta de LLM.
+    
+    Usa o conteúdo do bloco de código quando houver; se ainda assim o texto
+    tiver prosa antes/depois, decodifica a partir do primeiro '{' ou '['
+    e ignora o que vier depois do valor JSON.
+    
+    Raises:
+        ValueError: Se nenhum JSON válido for encontrado
+    """
+    match = _JSON_FENCE_RE.search(text)
+    payload = (match.group(1) if match else text).strip()
+    try:
+        return _json_loads(payload)
+    except ValueError:
+        pass
+    
+    starts = [i for i in (payload.find("{"), payload.find("[")) if i != -1]
+    if not starts:
+        raise ValueError("Nenhum JSON encontrado na resposta da IA")
+    value, _ = json.JSONDecoder().raw_decode(payload, min(starts))
+    return value
+
+
+def _json_dumps(obj) -> bytes:
+    """Serializa para bytes UTF-8 (orjson quando disponível)."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+
+# Cache exato de parse_natural_language_rule (nível de módulo, compartilhado
+# por todas as instâncias de AIAnalyzer). Eviction FIFO ao atingir o limite.
+RULE_CACHE_MAX_SIZE = 512
+_rule_cache: "OrderedDict[str, dict]" = OrderedDict()
+_rule_cache_lock = threading.Lock()
+
+
+def _rule_cache_key(text: str, field_list: Optional[list[str]], event_list: Optional[list[str]], provider: str) -> str:
+    """Gera a chave do cache de regras a partir do texto, contexto e provedor."""
+    return hashlib.sha256(_json_dumps([text, list(field_list or ()), list(event_list or ()), provider])).hexdigest()
+
+
+_WORD_RE = re.compile(r"[^\W_]+")
+
+
+@lru_cache(maxsize=32)
+def _field_token_index(fields: tuple[str, ...]) -> tuple[tuple[str, frozenset], ...]:
+    """Tokeniza os nomes dos campos uma vez por lista de campos (chamadas repetidas da UI)."""
+    return tuple((name, frozenset(_WORD_RE.findall(name.lower()))) for name in dict.fromkeys(fields))
+
+
+def _shortlist_fields(text: str, field_list: list[str], k: int = 50) -> list[str]:
+    """
+    Seleciona os k campos mais relacionados ao texto da regra.
+    
+    Pontua cada campo pelos tokens em comum com o texto (match exato vale 1,
+    aproximado via difflib vale 0.5). As vagas restantes são preenchidas com
+    os demais campos na ordem original, para manter contexto quando o usuário
+    usa termos diferentes dos nomes das variáveis.
+    
+    Args:
+        text: Texto da regra em linguagem natural
+        field_list: Nomes das variáveis do projeto
+        k: Máximo de campos retornados
+        
+    Returns:
+        Lista de até k nomes de campos, os mais relevantes primeiro
+    """
+    index = _field_token_index(tuple(field_list))
+    if len(index) <= k:
+        return [name for name, _ in index]
+    
+    text_tokens = {t for t in _WORD_RE.findall(text.lower()) if len(t) > 1}
+    vocabulary = sorted({token for _, tokens in index for token in tokens})
+    fuzzy_tokens = {
+        match
+        for token in text_tokens if len(token) >= 4
+        for match in difflib.get_close_matches(token, vocabulary, n=3, cutoff=0.8)
+    } - text_tokens
+    
+    scored = []
+    for position, (name, tokens) in enumerate(index):
+        score = len(tokens & text_tokens) + 0.5 * len(tokens & fuzzy_tokens)
+        if score:
+            scored.append((-score, position, name))
+    
+    shortlist = [name for _, _, name in sorted(scored)[:k]]
+    if len(shortlist) < k:
+        chosen = set(shortlist)
+        shortlist += [name for name, _ in index if name not in chosen][:k - len(shortlist)]
+    return shortlist
+
+
+# Timeout (s) por chamada e tentativas com backoff exponencial + jitter.
+# Os clientes LangChain são criados com max_retries=0: o retry é feito aqui.
+LLM_TIMEOUT = 30
+LLM_MAX_ATTEMPTS = 4
+
+# Nomes de exceções transitórias dos SDKs (anthropic/openai/httpx), sem importá-los
+_TRANSIENT_ERROR_NAMES = frozenset({
+    "APITimeoutError", "APIConnectionError", "RateLimitError", "InternalServerError",
+    "TimeoutException", "ConnectTimeout", "ReadTimeout", "ConnectError",
+})
+
+
+def _is_transient(exc: BaseException) -> bool:
+    """True para timeouts, falhas de conexão, 429 e 5xx (vale a pena tentar de novo)."""
+    response = getattr(exc, "response", None)
+    status = getattr(exc, "status_code", None) or getattr(response, "status_code", None)
+    if isinstance(status, int):
+        return status == 429 or status >= 500
+    return (
+        isinstance(exc, (TimeoutError, ConnectionError, requests.Timeout, requests.ConnectionError))
+        or type(exc).__name__ in _TRANSIENT_ERROR_NAMES
+    )
+
+
+_llm_retry = retry(
+    stop=stop_after_attempt(LLM_MAX_ATTEMPTS),
+    wait=wait_exponential_jitter(initial=1, max=20),
+    retry=retry_if_exception(_is_transient),
+    reraise=True,
+)
+
+
+@_llm_retry
+def _invoke_langchain(runnable, inputs):
+    """runnable.invoke com retry em erros transitórios."""
+    return runnable.invoke(inputs)
+
+
+@_llm_retry
+async def _ainvoke_langchain(runnable, inputs):
+    """runnable.ainvoke com retry em erros transitórios."""
+    return await runnable.ainvoke(inputs)
+
+
+@_llm_retry
+def _open_langchain_stream(runnable, inputs) -> tuple:
+    """Abre runnable.stream e lê o primeiro trecho (falhas até aqui são repetidas)."""
+    iterator = iter(runnable.stream(inputs))
+    return iterator, next(iterator, None)
+
+
+def _stream_langchain(runnable, inputs) -> Iterator:
+    """
+    runnable.stream com retry em erros transitórios até o primeiro trecho chegar.
+    
+    Depois que algo foi entregue ao chamador não dá para repetir sem duplicar texto.
+    """
+    iterator, first = _open_langchain_stream(runnable, inputs)
+    if first is None:
+        return
+    yield first
+    yield from iterator
+
+
+# Sessão HTTP compartilhada: reaproveita conexões keep-alive com a API do Gemini
+_gemini_session = requests.Session()
+
+
+@_llm_retry
+def _post_gemini(url: str, payload: dict, stream: bool = False) -> requests.Response:
+    """POST na API REST do Gemini; 429/5xx viram exceção para acionar o retry."""
+    response = _gemini_session.post(url, json=payload, timeout=LLM_TIMEOUT, stream=stream)
+    if response.status_code == 429 or response.status_code >= 500:
+        response.raise_for_status()
+    return response
+
+
+# Orçamentos de tokens para as listas de queries enviadas nos prompts
+CORRECTIONS_TOKEN_BUDGET = 3000
+SUMMARY_SAMPLE_TOKEN_BUDGET = 1500
+
+
+@lru_cache(maxsize=1)
+def _token_encoder():
+    """Encoder do tiktoken (cl100k_base), ou None se indisponível."""
+    if not TIKTOKEN_AVAILABLE:
+        return None
+    try:
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        # O primeiro uso baixa o vocabulário; sem rede, cai na estimativa
+        return None
+
+
+def _count_tokens(text: str) -> int:
+    """
+    Conta (ou estima) os tokens de um texto.
+    
+    cl100k_base é uma aproximação razoável também para Claude e Gemini;
+    sem tiktoken usa ~4 caracteres por token.
+    """
+    encoder = _token_encoder()
+    if encoder is None:
+        return len(text) // 4 + 1
+    return len(encoder.encode(text, disallowed_special=()))
+
+
+def _pack_by_tokens(items, formatter, budget: int) -> list[str]:
+    """
+    Formata itens em ordem até esgotar o orçamento de tokens.
+    
+    Args:
+        items: Itens a formatar (ex: queries)
+        formatter: Função item -> linha de texto
+        budget: Máximo de tokens somando todas as linhas
+        
+    Returns:
+        Linhas formatadas do prefixo que cabe no orçamento
+    """
+    lines = []
+    used = 0
+    for item in items:
+        line = formatter(item)
+        cost = _count_tokens(line)
+        if used + cost > budget:
+            break
+        lines.append(line)
+        used += cost
+    return lines
+
+
+def _chunk_by_tokens(items: list, formatter, budget: int, max_items: int) -> list[list]:
+    """
+    Divide itens em blocos consecutivos que cabem no orçamento de tokens.
+    
+    Cada bloco tem no máximo max_items itens; um item que sozinho excede o
+    orçamento vai em um bloco próprio (em vez de ser descartado).
+    """
+    chunks: list[list] = []
+    current: list = []
+    used = 0
+    for item in items:
+        cost = _count_tokens(formatter(item))
+        if current and (used + cost > budget or len(current) >= max_items):
+            chunks.append(current)
+            current, used = [], 0
+        current.append(item)
+        used += cost
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _format_correction_query(q: Query) -> str:
+    """Linha de uma query no prompt de suggest_corrections."""
+    return (
+        f"- Campo: {q.field}, Valor: {q.value_found}, Erro: {q.issue_type}, "
+        f"Explicação: {q.explanation}"
+    )
+
+
+# Máximo padrão de chamadas simultâneas ao provedor em suggest_corrections_batch
+BATCH_CONCURRENCY = 8
+
+# System prompt: texto único ou blocos (estável -> variável) para prompt caching
+SystemPrompt = Union[str, tuple[str, ...]]
+
+
+def _join_system(system_prompt: SystemPrompt) -> str:
+    """Concatena os blocos do system prompt para provedores sem prompt caching."""
+    if isinstance(system_prompt, str):
+        return system_prompt
+    return "".join(system_prompt)
+
+
+def _anthropic_messages(system_prompt: SystemPrompt, user_prompt: str) -> list:
+    """
+    Monta as mensagens para a Anthropic marcando cada bloco do system prompt
+    com cache_control, para que o prefixo estável seja cacheado no servidor.
+    """
+    blocks = (system_prompt,) if isinstance(system_prompt, str) else system_prompt
+    content = [
+        {"type": "text", "text": block, "cache_control": {"type": "ephemeral"}}
+        for block in blocks if block
+    ]
+    from langchain_core.messages import HumanMessage, SystemMessage
+    
+    return [SystemMessage(content=content), HumanMessage(content=user_prompt)]
+
+
+# Modelos Gemini usados como fallback quando o modelo do tier falha
+_GEMINI_FALLBACK_MODELS = ("gemini-1.5-flash", "gemini-1.5-pro", "gemini-pro")
+
+
+# Modelos que responderam 404 para esta chave: pulados pelo resto do processo,
+# evitando uma ida e volta perdida em cada chamada
+_gemini_unavailable_models: set[str] = set()
+
+
+def _gemini_models(cheap: bool) -> list[str]:
+    """Ordem de tentativa dos modelos Gemini: o modelo do tier primeiro, depois os fallbacks."""
+    preferred = config.ai_model("gemini", "cheap" if cheap else "deep")
+    models = list(dict.fromkeys((preferred, *_GEMINI_FALLBACK_MODELS)))
+    # Se todos foram marcados indisponíveis, tenta todos de novo
+    return [m for m in models if m not in _gemini_unavailable_models] or models
+
+
+@lru_cache(maxsize=1)
+def _probe_gemini_models() -> None:
+    """
+    Testa (uma vez por processo) quais modelos Gemini a chave acessa, com
+    respostas de 1 token. Ativado por AI_PROBE_ON_INIT=true.
+    """
+    api_key = config.GOOGLE_API_KEY
+    if not api_key:
+        return
+    
+    payload = {
+        "contents": [{"parts": [{"text": "ok"}]}],
+        "generationConfig": {"temperature": 0, "maxOutputTokens": 1},
+    }
+    for model in dict.fromkeys((*_gemini_models(False), *_gemini_models(True))):
+        url = f"https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent?key={api_key}"
+        try:
+            response = _gemini_session.post(url, json=payload, timeout=LLM_TIMEOUT)
+        except requests.RequestException:
+            return  # Sem rede: deixa o fallback por chamada decidir
+        if response.status_code == 404:
+            _gemini_unavailable_models.add(model)
+
+
+def _message_text(message) -> str:
+    """Extrai o texto de uma AIMessage (content pode ser str ou lista de blocos)."""
+    if isinstance(message.content, str):
+        return message.content
+    return "".join(
+        block.get("text", "") if isinstance(block, dict) else str(block)
+        for block in message.content
+    )
 
 
 class AIAnalyzer:
@@ -47,29 +572,18 @@ class AIAnalyzer:
         """
         self.provider = config.AI_PROVIDER
         self.llm = None
+        self.llm_cheap = None  # Modelo mais barato para tarefas estruturadas
         self.gemini_model = None
         
-        if self.provider == "anthropic" and LANGCHAIN_AVAILABLE:
-            key = api_key or config.ANTHROPIC_API_KEY
-            if key:
-                self.llm = ChatAnthropic(
-                    model="claude-3-5-sonnet-20240620",
-                    api_key=key,
-                    temperature=0.3,
-                    max_tokens=4096,
-                )
-        elif self.provider == "openai" and LANGCHAIN_AVAILABLE:
-            key = api_key or config.OPENAI_API_KEY
+        if self.provider in ("anthropic", "openai"):
+            key = api_key or (config.ANTHROPIC_API_KEY if self.provider == "anthropic" else config.OPENAI_API_KEY)
             if key:
-                self.llm = ChatOpenAI(
-                    model="gpt-4-turbo-preview",
-                    api_key=key,
-                    temperature=0.3,
-                    max_tokens=4096,
-                )
-        elif self.provider == "gemini" and GOOGLE_GENAI_AVAILABLE:
+                self.llm = _shared_chat_model(self.provider, "deep", key)
+                self.llm_cheap = _shared_chat_model(self.provider, "cheap", key)
+        elif self.provider == "gemini":
+            genai = _load_genai()
             key = api_key or config.GOOGLE_API_KEY
-            if key:
+            if key and genai:
                 genai.configure(api_key=key)
                 
                 # Lista de prioridade de modelos (do mais novo para o mais estável)
@@ -100,6 +614,9 @@ class AIAnalyzer:
                 # Se o usuário quer "mais novo", vamos configurar explicitamente para tentar 2.0 também se falhar.
                 self.gemini_model_name = 'gemini-1.5-pro' # Default initial
                 self.gemini_model = genai.GenerativeModel(self.gemini_model_name)
+                
+                if config.AI_PROBE_ON_INIT:
+                    _probe_gemini_models()
     
     @property
     def is_available(self) -> bool:
@@ -108,30 +625,219 @@ class AIAnalyzer:
             return self.gemini_model is not None
         return self.llm is not None
     
-    def _invoke_gemini(self, system_instruction: str, user_input: str) -> str:
+    def _invoke(self, system_prompt: SystemPrompt, user_prompt: str, cheap: bool = False) -> str:
+        """
+        Invoca o provedor configurado e retorna o texto da resposta.
+        
+        Args:
+            system_prompt: Texto do system prompt, ou tupla de blocos (do mais estável
+                para o mais variável) para aproveitar o prompt caching da Anthropic
+            user_prompt: Mensagem do usuário
+            cheap: Usa o modelo do tier "cheap" (tarefas estruturadas)
+        """
+        system_text = _join_system(system_prompt)
+        llm = self._llm_for(cheap)
+        key = self._cache_key(system_text, user_prompt, cheap)
+        if key:
+            cached = response_cache.get(key)
+            if cached is not None:
+                return cached
+        
+        if self.provider == "gemini":
+            result = self._invoke_gemini(system_text, user_prompt, cheap)
+        elif self.provider == "anthropic":
+            response = _invoke_langchain(llm, _anthropic_messages(system_prompt, user_prompt))
+            self._log_cache_usage(response)
+            result = _message_text(response)
+        else:
+            chain = _text_chain(llm)
+            result = _invoke_langchain(chain, {"system_prompt": system_text, "user_input": user_prompt})
+        
+        if key:
+            response_cache.set(key, result)
+        return result
+    
+    async def _ainvoke(self, system_prompt: SystemPrompt, user_prompt: str, cheap: bool = False) -> str:
+        """Versão assíncrona de _invoke (várias chamadas podem rodar em paralelo)."""
+        system_text = _join_system(system_prompt)
+        llm = self._llm_for(cheap)
+        key = self._cache_key(system_text, user_prompt, cheap)
+        if key:
+            cached = response_cache.get(key)
+            if cached is not None:
+                return cached
+        
+        if self.provider == "gemini":
+            result = await self._ainvoke_gemini(system_text, user_prompt, cheap)
+        elif self.provider == "anthropic":
+            response = await _ainvoke_langchain(llm, _anthropic_messages(system_prompt, user_prompt))
+            self._log_cache_usage(response)
+            result = _message_text(response)
+        else:
+            chain = _text_chain(llm)
+            result = await _ainvoke_langchain(chain, {"system_prompt": system_text, "user_input": user_prompt})
+        
+        if key:
+            response_cache.set(key, result)
+        return result
+    
+    def _invoke_structured(
+        self, system_prompt: SystemPrompt, user_prompt: str, schema: type[BaseModel], cheap: bool = False
+    ) -> BaseModel:
+        """
+        Invoca o provedor exigindo uma resposta no formato do schema Pydantic.
+        
+        OpenAI/Anthropic usam with_structured_output (tool calling); o Gemini REST
+        usa responseMimeType JSON e a resposta é validada pelo schema.
+        
+        Raises:
+            pydantic.ValidationError: Se a resposta não respeitar o schema
+        """
+        system_text = _join_system(system_prompt)
+        llm = self._llm_for(cheap)
+        key = self._cache_key(system_text, f"{schema.__name__}\x1f{user_prompt}", cheap)
+        if key:
+            cached = response_cache.get(key)
+            if cached is not None:
+                return schema.model_validate_json(cached)
+        
+        if self.provider == "gemini":
+            raw = self._invoke_gemini(system_text, user_prompt, cheap, json_mode=True)
+            result = schema.model_validate(_extract_json(raw))
+        elif self.provider == "anthropic":
+            structured = llm.with_structured_output(schema)
+            result = _invoke_langchain(structured, _anthropic_messages(system_prompt, user_prompt))
+        else:
+            template, _ = _chain_parts()
+            chain = template | llm.with_structured_output(schema)
+            result = _invoke_langchain(chain, {"system_prompt": system_text, "user_input": user_prompt})
+        
+        if key:
+            response_cache.set(key, result.model_dump_json())
+        return result
+    
+    def _llm_for(self, cheap: bool):
+        """Seleciona o modelo LangChain do tier pedido."""
+        return self.llm_cheap if cheap and self.llm_cheap is not None else self.llm
+    
+    def _cache_key(self, system_prompt: str, user_prompt: str, cheap: bool = False) -> Optional[str]:
+        """Chave do cache de respostas (None a menos que o cache esteja ativado via AI_CACHE=true)."""
+        if not config.AI_CACHE:
+            return None
+        if self.provider == "gemini":
+            model = _gemini_models(cheap)[0]  # _invoke_gemini usa os demais só como fallback
+        else:
+            llm = self._llm_for(cheap)
+            model = getattr(llm, "model", None) or getattr(llm, "model_name", "")
+        return response_cache.make_key(self.provider, str(model), system_prompt, user_prompt)
+    
+    @staticmethod
+    def _log_cache_usage(response) -> None:
+        """Registra (nível DEBUG) quantos tokens vieram do prompt cache da Anthropic."""
+        if not logger.isEnabledFor(logging.DEBUG):
+            return
+        usage = getattr(response, "usage_metadata", None) or {}
+        details = usage.get("input_token_details") or {}
+        logger.debug(
+            "Anthropic input=%s cache_read=%s cache_creation=%s",
+            usage.get("input_tokens"), details.get("cache_read"), details.get("cache_creation"),
+        )
+    
+    def _stream(self, system_prompt: SystemPrompt, user_prompt: str, cheap: bool = False) -> Iterator[str]:
+        """Versão em streaming de _invoke (sem cache de respostas)."""
+        system_text = _join_system(system_prompt)
+        llm = self._llm_for(cheap)
+        
+        if self.provider == "gemini":
+            yield from self._stream_gemini(system_text, user_prompt, cheap)
+        elif self.provider == "anthropic":
+            for chunk in _stream_langchain(llm, _anthropic_messages(system_prompt, user_prompt)):
+                yield _message_text(chunk)
+        else:
+            chain = _text_chain(llm)
+            yield from _stream_langchain(chain, {"system_prompt": system_text, "user_input": user_prompt})
+    
+    def _stream_gemini(self, system_instruction: str, user_input: str, cheap: bool = False) -> Iterator[str]:
+        """
+        Streaming do Gemini via REST (streamGenerateContent com Server-Sent Events).
+        Troca de modelo só é possível enquanto nenhum trecho foi entregue.
+        """
+        api_key = config.GOOGLE_API_KEY
+        if not api_key:
+            raise Exception("Google API Key not found in .env")
+        
+        models = _gemini_models(cheap)
+        payload = {
+            "contents": [{
+                "parts": [
+                    {"text": f"{system_instruction}\n\nUser Request:\n{user_input}"}
+                ]
+            }],
+            "generationConfig": {
+                "temperature": 0.3,
+                "maxOutputTokens": 8192
+            }
+        }
+        
+        last_error = None
+        
+        for model in models:
+            url = f"https://generativelanguage.googleapis.com/v1beta/models/{model}:streamGenerateContent?alt=sse&key={api_key}"
+            
+            try:
+                response = _post_gemini(url, payload, stream=True)
+            except Exception as e:
+                logger.warning("Gemini streaming request failed (%s): %s", model, e)
+                last_error = str(e)
+                continue
+        
+            with response:
+                if response.status_code != 200:
+                    # Corpo completo só em DEBUG (pode ecoar trechos do prompt)
+                    logger.warning("Gemini streaming (%s) failed with status %s", model, response.status_code)
+                    logger.debug("Gemini streaming (%s) error body: %s", model, response.text)
+                    last_error = f"{response.status_code} - {response.text}"
+                    if response.status_code == 404:
+                        _gemini_unavailable_models.add(model)
+                    continue
+                
+                for line in response.iter_lines(decode_unicode=True):
+                    if not line or not line.startswith("data:"):
+                        continue
+                    data = _json_loads(line[5:])
+                    for candidate in data.get("candidates", [])[:1]:
+                        for part in candidate.get("content", {}).get("parts", []):
+                            if part.get("text"):
+                                yield part["text"]
+                return
+        
+        raise Exception(f"All Gemini models failed. Last error: {last_error}")
+    
+    async def _ainvoke_gemini(self, system_instruction: str, user_input: str, cheap: bool = False) -> str:
+        """Executa a chamada REST do Gemini em uma thread, sem bloquear o event loop."""
+        return await asyncio.to_thread(self._invoke_gemini, system_instruction, user_input, cheap)
+    
+    def _invoke_gemini(
+        self, system_instruction: str, user_input: str, cheap: bool = False, json_mode: bool = False
+    ) -> str:
         """
         Invocação direta do Gemini via REST API (requests).
         Isso elimina a dependência da biblioteca google-generativeai que estava causando conflito no Render.
+        Erros transitórios (timeout, 429, 5xx) são repetidos com backoff antes de trocar de modelo.
+        Com json_mode=True o modelo é instruído a responder somente JSON.
         """
-        import requests
-        
         api_key = config.GOOGLE_API_KEY
         if not api_key:
             raise Exception("Google API Key not found in .env")
             
-        # Tenta modelos em ordem de preferência (do mais rápido/barato para o mais capaz)
-        # O 1.5 Flash é gratuito e muito rápido.
-        models = ["gemini-1.5-flash", "gemini-1.5-pro", "gemini-pro"]
+        # Tenta o modelo do tier pedido e depois os demais como fallback
+        models = _gemini_models(cheap)
         
         last_error = None
         
         for model in models:
             url = f"https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent?key={api_key}"
             
-            headers = {
-                "Content-Type": "application/json"
-            }
-            
             payload = {
                 "contents": [{
                     "parts": [
@@ -143,9 +849,11 @@ class AIAnalyzer:
                     "maxOutputTokens": 8192
                 }
             }
+            if json_mode:
+                payload["generationConfig"]["responseMimeType"] = "application/json"
             
             try:
-                response = requests.post(url, headers=headers, json=payload, timeout=30)
+                response = _post_gemini(url, payload)
                 
                 if response.status_code == 200:
                     data = response.json()
@@ -161,6 +869,7 @@ class AIAnalyzer:
                     last_error = f"{response.status_code} - {error_msg}"
                     
                     if response.status_code == 404:
+                        _gemini_unavailable_models.add(model)
                         continue # Tenta próximo modelo
                     else:
                         # Erros de permissão/quota (400, 429) geralmente não adiantam trocar de modelo, mas vamos tentar
@@ -221,16 +930,28 @@ class AIAnalyzer:
         if not self.is_available:
             return {"available": False, "message": f"IA ({self.provider}) não configurada. Verifique as chaves de API no .env"}
         
+        try:
+            analysis = self._invoke(*self._build_analysis_prompts(report, project_data))
+            return {"available": True, "analysis": analysis}
+        except Exception as e:
+            return {"available": False, "message": f"Erro na análise de IA: {str(e)}"}
+    
+    async def aanalyze_queries(self, report: QualityReport, project_data: ProjectData) -> dict:
+        """Versão assíncrona de analyze_queries."""
+        if not self.is_available:
+            return {"available": False, "message": f"IA ({self.provider}) não configurada. Verifique as chaves de API no .env"}
+        
+        try:
+            analysis = await self._ainvoke(*self._build_analysis_prompts(report, project_data))
+            return {"available": True, "analysis": analysis}
+        except Exception as e:
+            return {"available": False, "message": f"Erro na análise de IA: {str(e)}"}
+    
+    def _build_analysis_prompts(self, report: QualityReport, project_data: ProjectData) -> tuple[str, str]:
+        """Monta (system_prompt, user_prompt) para analyze_queries."""
         summary = self._prepare_summary(report, project_data)
         
-        system_prompt = """Você é um especialista em Data Management de estudos clínicos com vasta experiência em REDCap.
-Sua tarefa é analisar os resultados de uma auditoria automática de qualidade de dados e fornecer:
-1. **Análise Executiva**: Resumo do estado geral da qualidade dos dados (2-3 parágrafos)
-2. **Principais Preocupações**: Lista das 5 questões mais críticas que precisam de atenção imediata
-3. **Padrões Identificados**: Tendências ou padrões nos erros que indicam problemas sistêmicos
-4. **Recomendações**: Ações concretas para melhorar a qualidade dos dados
-5. **Priorização**: Ordem sugerida para resolver os problemas
-Seja objetivo e técnico. Use terminologia de pesquisa clínica."""
+        system_prompt = _ANALYZE_SYSTEM_PROMPT
 
         user_prompt = f"""Analise os seguintes resultados de auditoria de qualidade de dados do REDCap:
 ## Informações do Projeto
@@ -243,21 +964,11 @@ Seja objetivo e técnico. Use terminologia de pesquisa clínica."""
 {summary['error_types']}
 ## Campos com Mais Problemas
 {summary['problem_fields']}
-## Amostra de Queries (primeiras 20)
+## Amostra de Queries (primeiras {summary['sample_size']})
 {summary['sample_queries']}
 Por favor, forneça sua análise detalhada."""
 
-        try:
-            if self.provider == "gemini":
-                analysis = self._invoke_gemini(system_prompt, user_prompt)
-            else:
-                prompt = ChatPromptTemplate.from_messages([("system", system_prompt), ("human", "{user_input}")])
-                chain = prompt | self.llm | StrOutputParser()
-                analysis = chain.invoke({"user_input": user_prompt})
-
-            return {"available": True, "analysis": analysis}
-        except Exception as e:
-            return {"available": False, "message": f"Erro na análise de IA: {str(e)}"}
+        return system_prompt, user_prompt
     
     def suggest_corrections(self, queries: list[Query]) -> list[dict]:
         """
@@ -271,44 +982,89 @@ Por favor, forneça sua análise detalhada."""
         """
         if not self.is_available: return []
         
-        # Limita a 10 queries para não exceder tokens
-        queries_to_analyze = queries[:10]
+        try:
+            result = self._invoke(*self._build_corrections_prompts(queries), cheap=True)
+            return self._parse_json_response(result)
+        except Exception:
+            return []
+    
+    async def asuggest_corrections(self, queries: list[Query]) -> list[dict]:
+        """Versão assíncrona de suggest_corrections."""
+        if not self.is_available: return []
+        
+        try:
+            result = await self._ainvoke(*self._build_corrections_prompts(queries), cheap=True)
+            return self._parse_json_response(result)
+        except Exception:
+            return []
+    
+    def suggest_corrections_batch(
+        self, queries: list[Query], chunk_size: int = 20, max_concurrency: int = BATCH_CONCURRENCY
+    ) -> list[dict]:
+        """
+        Sugere correções para TODAS as queries (suggest_corrections envia só as que
+        cabem em um orçamento de tokens).
+        
+        Os blocos são enviados em paralelo, então o tempo total fica próximo ao de
+        uma única chamada enquanto houver até max_concurrency blocos.
+        
+        Args:
+            queries: Lista de queries a analisar
+            chunk_size: Máximo de queries por chamada ao provedor
+            max_concurrency: Máximo de chamadas simultâneas (limite de QPM do provedor)
+            
+        Returns:
+            Lista de sugestões de correção, na ordem dos blocos
+        """
+        return _run_sync(self.asuggest_corrections_batch(queries, chunk_size, max_concurrency))
+    
+    async def asuggest_corrections_batch(
+        self, queries: list[Query], chunk_size: int = 20, max_concurrency: int = BATCH_CONCURRENCY
+    ) -> list[dict]:
+        """Versão assíncrona de suggest_corrections_batch."""
+        if not self.is_available: return []
+        
+        chunks = _chunk_by_tokens(queries, _format_correction_query, CORRECTIONS_TOKEN_BUDGET, chunk_size)
+        if len(chunks) <= 1:
+            return await self.asuggest_corrections(queries)
         
-        queries_text = "\n".join([
-            f"- Campo: {q.field}, Valor: {q.value_found}, Erro: {q.issue_type}, "
-            f"Explicação: {q.explanation}"
-            for q in queries_to_analyze
-        ])
+        semaphore = asyncio.Semaphore(max_concurrency)
         
-        system_prompt = """Você é um especialista em correção de dados de estudos clínicos.
-Para cada query de qualidade apresentada, sugira uma correção específica e prática.
-Responda em JSON com o formato:
-[{"field": "nome_campo", "suggestion": "sugestão de correção", "action": "ação recomendada"}]"""
+        async def run_chunk(chunk: list[Query]) -> list[dict]:
+            async with semaphore:
+                try:
+                    result = await self._ainvoke(*self._build_corrections_prompts(chunk, token_budget=None), cheap=True)
+                    return self._parse_json_response(result)
+                except Exception:
+                    # Um bloco com falha não descarta as sugestões dos demais
+                    return []
+        
+        results = await asyncio.gather(*(run_chunk(chunk) for chunk in chunks))
+        return [suggestion for chunk_result in results for suggestion in chunk_result]
+    
+    def _build_corrections_prompts(
+        self, queries: list[Query], token_budget: Optional[int] = CORRECTIONS_TOKEN_BUDGET
+    ) -> tuple[str, str]:
+        """Monta (system_prompt, user_prompt) para suggest_corrections."""
+        # Envia quantas queries couberem no orçamento (None = todas, usado pelo modo em lote)
+        if token_budget is None:
+            lines = [_format_correction_query(q) for q in queries]
+        else:
+            lines = _pack_by_tokens(queries, _format_correction_query, token_budget)
+        
+        queries_text = "\n".join(lines)
+        
+        system_prompt = _CORRECTIONS_SYSTEM_PROMPT
         
         user_prompt = f"""Sugira correções para as seguintes queries:
 {queries_text}
 Retorne apenas o JSON, sem explicações adicionais."""
 
-        try:
-            if self.provider == "gemini":
-                result = self._invoke_gemini(system_prompt, user_prompt)
-            else:
-                prompt = ChatPromptTemplate.from_messages([("system", system_prompt), ("human", "{queries}")])
-                chain = prompt | self.llm | StrOutputParser()
-                result = chain.invoke({"queries": queries_text})
-            
-            # Limpeza do resultado (Markdown block removal se necessário)
-            result = result.strip()
-            if result.startswith("```json"):
-                result = result[7:]
-            if result.endswith("```"):
-                result = result[:-3]
-                
-            # Tenta parsear JSON
-            suggestions = json.loads(result)
-            return suggestions
-        except Exception:
-            return []
+        return system_prompt, user_prompt
+    
+    def _parse_json_response(self, result: str):
+        """Extrai e faz parse do JSON da resposta do LLM (ver _extract_json)."""
+        return _extract_json(result)
     
     def generate_report_summary(self, report: QualityReport) -> str:
         """
@@ -320,13 +1076,56 @@ Retorne apenas o JSON, sem explicações adicionais."""
         Returns:
             Resumo em texto
         """
+        return "".join(self.stream_report_summary(report))
+    
+    def stream_report_summary(self, report: QualityReport) -> Iterator[str]:
+        """
+        Gera o resumo executivo em streaming, entregando o texto à medida que chega.
+        
+        Args:
+            report: Relatório de qualidade
+            
+        Yields:
+            Trechos do resumo
+        """
+        if not self.is_available:
+            yield "Análise de IA não disponível."
+            return
+        
+        system_prompt, user_prompt = self._build_summary_prompts(report)
+        key = self._cache_key(system_prompt, user_prompt)
+        if key:
+            cached = response_cache.get(key)
+            if cached is not None:
+                yield cached
+                return
+        
+        parts = []
+        try:
+            for chunk in self._stream(system_prompt, user_prompt):
+                parts.append(chunk)
+                yield chunk
+        except Exception as e:
+            yield f"Erro ao gerar resumo: {str(e)}"
+            return
+        
+        if key:
+            response_cache.set(key, "".join(parts))
+    
+    async def agenerate_report_summary(self, report: QualityReport) -> str:
+        """Versão assíncrona de generate_report_summary."""
         if not self.is_available: return "Análise de IA não disponível."
         
-        from collections import Counter
+        try:
+            return await self._ainvoke(*self._build_summary_prompts(report))
+        except Exception as e:
+            return f"Erro ao gerar resumo: {str(e)}"
+    
+    def _build_summary_prompts(self, report: QualityReport) -> tuple[str, str]:
+        """Monta (system_prompt, user_prompt) para generate_report_summary."""
         priority_counts = Counter(q.priority for q in report.queries)
         
-        system_prompt = """Você é um especialista em pesquisa clínica escrevendo um resumo executivo 
-para o investigador principal de um estudo. Seja conciso e profissional."""
+        system_prompt = _SUMMARY_SYSTEM_PROMPT
         
         user_prompt = f"""Escreva um resumo executivo (máximo 3 parágrafos) sobre a qualidade dos dados:
 - Total de participantes: {report.project_summary.total_records}
@@ -336,27 +1135,63 @@ para o investigador principal de um estudo. Seja conciso e profissional."""
 - Baixa prioridade: {priority_counts.get("Baixa", 0)}
 - Principais tipos de erro: {", ".join(report.project_summary.most_common_error_types[:5])}"""
 
-        try:
-            if self.provider == "gemini":
-                return self._invoke_gemini(system_prompt, user_prompt)
-            else:
-                prompt = ChatPromptTemplate.from_messages([("system", system_prompt), ("human", "{user_input}")])
-                chain = prompt | self.llm | StrOutputParser()
-                return chain.invoke({"user_input": user_prompt})
-        except Exception as e:
-            return f"Erro ao gerar resumo: {str(e)}"
+        return system_prompt, user_prompt
+    
+    async def arun_full_ai_pipeline(self, report: QualityReport, project_data: ProjectData) -> dict:
+        """
+        Executa análise, resumo e sugestões de correção em paralelo.
+        
+        As três chamadas ao LLM são independentes, então o tempo total passa a ser
+        o da chamada mais lenta em vez da soma das três.
+        
+        Args:
+            report: Relatório de qualidade
+            project_data: Dados do projeto
+            
+        Returns:
+            Dicionário com 'analysis', 'summary' e 'suggestions'
+        """
+        analysis, summary, suggestions = await asyncio.gather(
+            self.aanalyze_queries(report, project_data),
+            self.agenerate_report_summary(report),
+            self.asuggest_corrections(report.queries),
+        )
+        return {"analysis": analysis, "summary": summary, "suggestions": suggestions}
+    
+    def run_full_ai_pipeline(self, report: QualityReport, project_data: ProjectData) -> dict:
+        """Versão síncrona de arun_full_ai_pipeline (ainda sem chamadores na CLI ou no web_app)."""
+        return _run_sync(self.arun_full_ai_pipeline(report, project_data))
     
     def _prepare_summary(self, report: QualityReport, project_data: ProjectData) -> dict:
         """Prepara resumo dos dados para análise de IA."""
-        from collections import Counter
+        issue_types = config.ISSUE_TYPES
         
-        priority_counts = Counter(q.priority for q in report.queries)
-        error_types = Counter(q.issue_type for q in report.queries)
+        # Uma única passada pelas queries: contagens e amostra (primeiras que
+        # couberem em SUMMARY_SAMPLE_TOKEN_BUDGET)
+        priority_counts, error_types = Counter(), Counter()
+        sample_lines = []
+        sample_tokens = 0
+        sampling = True
+        for q in report.queries:
+            priority_counts[q.priority] += 1
+            error_types[q.issue_type] += 1
+            if sampling:
+                line = (
+                    f"- [{q.priority}] Record {q.record_id}, Campo: {q.field}, "
+                    f"Tipo: {issue_types.get(q.issue_type, q.issue_type)}"
+                )
+                cost = _count_tokens(line)
+                if sample_tokens + cost > SUMMARY_SAMPLE_TOKEN_BUDGET:
+                    sampling = False
+                else:
+                    sample_lines.append(line)
+                    sample_tokens += cost
         
         # Formata tipos de erro
+        most_common = error_types.most_common(10)
         error_types_text = "\n".join([
-            f"- {config.ISSUE_TYPES.get(t, t)}: {c} ocorrências"
-            for t, c in error_types.most_common(10)
+            f"- {issue_types.get(t, t)}: {c} ocorrências"
+            for t, c in most_common
         ])
         
         # Formata campos com problemas
@@ -366,11 +1201,7 @@ para o investigador principal de um estudo. Seja conciso e profissional."""
         ])
         
         # Amostra de queries
-        sample_queries_text = "\n".join([
-            f"- [{q.priority}] Record {q.record_id}, Campo: {q.field}, "
-            f"Tipo: {config.ISSUE_TYPES.get(q.issue_type, q.issue_type)}"
-            for q in report.queries[:20]
-        ])
+        sample_queries_text = "\n".join(sample_lines)
         
         return {
             "total_records": report.project_summary.total_records,
@@ -381,6 +1212,7 @@ para o investigador principal de um estudo. Seja conciso e profissional."""
             "error_types": error_types_text,
             "problem_fields": problem_fields_text,
             "sample_queries": sample_queries_text,
+            "sample_size": len(sample_lines),
         }
 
     def parse_natural_language_rule(self, text: str, field_list: list[str] = None, event_list: list[str] = None) -> dict:
@@ -397,17 +1229,24 @@ para o investigador principal de um estudo. Seja conciso e profissional."""
         """
         if not self.is_available:
             return {"success": False, "error": "IA não configurada"}
+        
+        cache_key = _rule_cache_key(text, field_list, event_list, self.provider)
+        with _rule_cache_lock:
+            cached = _rule_cache.get(cache_key)
+        if cached is not None:
+            # Cópia para que o chamador não altere a entrada cacheada
+            return copy.deepcopy(cached)
             
         context_str = ""
         if field_list:
-            # Limita a 500 campos para não estourar o contexto
+            # Envia só os campos mais relacionados ao texto (menos tokens de entrada)
             context_str += f"""
 CONTEXTO - CAMPOS:
 Abaixo estão os nomes reais das variáveis (campos) no banco de dados.
 Sempre que possível, use um valor desta lista para o campo 'field'.
 Se o usuário disser "idade", e na lista tiver "age_years", use "age_years".
 
-Campos Disponíveis: [{', '.join(field_list[:500])}]
+Campos Disponíveis: [{', '.join(_shortlist_fields(text, field_list))}]
 """
 
         if event_list:
@@ -419,88 +1258,26 @@ Use estes nomes exatos para 'event1' e 'event2' em regras Cross-Event.
 Eventos Disponíveis: [{', '.join(event_list[:100])}]
 """
 
-        # Build prompt using string concatenation to safely handle JSON braces
-        system_intro = "Você é um assistente especialista em criação de regras de validação de dados.\n"
-        system_intro += "Sua tarefa é converter uma solicitação em linguagem natural para um objeto JSON de regra estruturada.\n"
-        
-        # Schema definition - IMPORTANT: double braces {{ }} to escape for LangChain
-        schema_def = """
-        O Schema da Regra é:
-        {{
-            "name": "Nome curto e descritivo da regra",
-            "field": "nome_do_campo_snake_case (se 'todo o projeto', use '_ALL_')",
-            "rule_type": "comparison" | "range" | "regex" | "condition" | "uniqueness" | "cross_event",
-            "operator": "=" | "!=" | ">" | "<" | ">=" | "<=" | "between" | "matches" | "contains" | "unique" | "empty" | "not_empty" | "present_implies",
-            "value": "valor da regra (para cross_event, é o nome do segundo campo)",
-            "priority": "Alta" | "Média" | "Baixa",
-            "message": "Mensagem de erro amigável pro usuário",
-            "event1": "Nome do evento do primeiro campo (opcional, só para cross_event)",
-            "event2": "Nome do evento do segundo campo (opcional, só para cross_event)"
-        }}
-        
-        BIBLIOTECA DE PADRÕES INTELIGENTES:
-        1. COMPARAÇÃO SIMPLES: rule_type="comparison", operator="=", value="X"
-        2. RANGE NUMÉRICO: rule_type="range", operator="between", value="min,max"
-        3. FORMATO (Regex): rule_type="regex", operator="matches", value="pattern"
-        4. DATAS RELATIVAS (HOJE/FUTURO):
-           - "A data de nascimento não pode ser no futuro"
-           - JSON: {{"rule_type": "comparison", "operator": "<=", "value": "_TODAY_"}}
-           - "Data de inclusão deve ser anterior a hoje" -> operator "<", value "_TODAY_"
-           - "Data deve ser hoje ou futuro" -> operator ">=", value "_TODAY_"
-           Use o token especial "_TODAY_" sempre que a regra mencionar "hoje", "futuro", "passado" ou "data atual".
-           
-        5. CROSS-EVENT (Entre Visitas):
-           - "O peso na Semana 4 deve ser menor que na Triagem"
-           - JSON: {{
-               "name": "Peso Semana 4 < Triagem",
-               "field": "weight",
-               "rule_type": "cross_event",
-               "operator": "<",
-               "value": "weight", 
-               "event1": "week_4_arm_1", 
-               "event2": "screening_arm_1",
-               "priority": "Média",
-               "message": "Perda de peso esperada não observada"
-             }}
-           
-        Exemplos Avançados:
-        
-        User: "O CPF deve ter formato válido"
-        JSON: {{"name": "Formato CPF", "field": "cpf", "rule_type": "regex", "operator": "matches", "value": "^\\d{{3}}\\.\\d{{3}}\\.\\d{{3}}-\\d{{2}}$", "priority": "Alta", "message": "CPF fora do padrão XXX.XXX.XXX-XX"}}
-
-        User: "A data da alta deve ser posterior a data de admissão"
-        JSON: {{"name": "Consistência de Datas", "field": "dt_alta", "rule_type": "comparison", "operator": ">", "value": "dt_admissao", "priority": "Alta", "message": "Data de alta deve ser posterior à admissão"}}
-        
-        User: "No evento Follow-up, o status deve ser Completo"
-        JSON: {{"name": "Status em Follow-up", "field": "status", "rule_type": "comparison", "operator": "=", "value": "Completo", "event1": "follow_up_arm_1", "priority": "Média", "message": "Status incorreto no Follow-up"}}
-        """
-        
-        full_system_message = system_intro + context_str + schema_def
+        # Blocos do mais estável (schema) para o mais variável (campos/eventos do projeto),
+        # permitindo que a Anthropic cacheie o prefixo entre chamadas
+        system_blocks = (_RULE_SYSTEM_PROMPT, context_str)
         user_prompt = f"""Converta esta regra para JSON:
 "{text}"
 
 Retorne APENAS o JSON válido, sem markdown ou explicações."""
 
         try:
-            if self.provider == "gemini":
-                result = self._invoke_gemini(full_system_message, user_prompt)
-            else:
-                prompt = ChatPromptTemplate.from_messages([("system", full_system_message), ("human", "{text}")])
-                chain = prompt | self.llm | StrOutputParser()
-                result = chain.invoke({"text": text})
-            
-            # Limpeza do resultado (Markdown block removal se necessário)
-            result = result.strip()
-            if result.startswith("```json"):
-                result = result[7:]
-            if result.endswith("```"):
-                result = result[:-3]
-                
-            rule_data = json.loads(result)
-            return {
+            rule = self._invoke_structured(system_blocks, user_prompt, RuleSchema, cheap=True)
+            rule_data = rule.model_dump(exclude_none=True)
+            result = {
                 "success": True,
                 "rule": rule_data
             }
+            with _rule_cache_lock:
+                _rule_cache[cache_key] = copy.deepcopy(result)
+                if len(_rule_cache) > RULE_CACHE_MAX_SIZE:
+                    _rule_cache.popitem(last=False)
+            return result
         except Exception as e:
             return {
                 "success": False,
@@ -508,11 +1285,23 @@ Retorne APENAS o JSON válido, sem markdown ou explicações."""
             }
 
 
+_instance: Optional[AIAnalyzer] = None
+_instance_lock = threading.Lock()
+
+
 def create_ai_analyzer() -> AIAnalyzer:
     """
-    Cria instância do analisador de IA.
+    Retorna a instância compartilhada do analisador de IA (criada no primeiro uso).
+    
+    O AIAnalyzer não guarda estado por requisição, então uma única instância
+    (e seus clientes HTTP) atende todo o processo.
     
     Returns:
         AIAnalyzer configurado
     """
-    return AIAnalyzer()
+    global _instance
+    if _instance is None:
+        with _instance_lock:
+            if _instance is None:
+                _instance = AIAnalyzer()
+    return _instance
@@ -0,0 +1,135 @@
+"""
+REDCap Data Quality Intelligence Agent - Clinical Kernels
+
+Kernels numéricos das verificações clínicas sobre colunas float64
+(NaN = ausente ou não numérico). Com Numba disponível os laços são
+compilados (njit, paralelos); sem ele, ou com NUMBA_DISABLE_JIT=1, são
+usadas as versões NumPy equivalentes.
+"""
+
+import os
+
+import numpy as np
+
+# Numba é opcional: compila os laços para código nativo multi-thread
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = os.getenv("NUMBA_DISABLE_JIT", "0") != "1"
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+
+def _bp_violations_numpy(systolic: np.ndarray, diastolic: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    with np.errstate(invalid="ignore"):
+        inverted = diastolic >= systolic
+        narrow = ~inverted & (systolic - diastolic < 10)
+    return inverted, narrow
+
+
+def _bmi_violations_numpy(
+    weight: np.ndarray, height: np.ndarray, bmi: np.ndarray
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    with np.errstate(invalid="ignore", divide="ignore"):
+        # Converte altura para metros se estiver em cm
+        height_m = np.where(height > 3, height / 100, height)
+        valid = ~np.isnan(weight) & (height_m > 0)
+        calculated = np.where(valid, weight / (height_m ** 2), np.nan)
+        mismatch = valid & (np.abs(calculated - bmi) > 1)
+        implausible = valid & ((calculated < 10) | (calculated > 80))
+    return calculated, mismatch, implausible
+
+
+def _age_violations_numpy(age: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    with np.errstate(invalid="ignore"):
+        return age < 0, age > 120
+
+
+if NUMBA_AVAILABLE:
+
+    @njit(cache=True, parallel=True)
+    def _bp_violations_jit(systolic, diastolic):
+        n = systolic.shape[0]
+        inverted = np.zeros(n, dtype=np.bool_)
+        narrow = np.zeros(n, dtype=np.bool_)
+        for i in prange(n):
+            if diastolic[i] >= systolic[i]:
+                inverted[i] = True
+            elif systolic[i] - diastolic[i] < 10:
+                narrow[i] = True
+        return inverted, narrow
+
+    @njit(cache=True, parallel=True)
+    def _bmi_violations_jit(weight, height, bmi):
+        n = weight.shape[0]
+        calculated = np.full(n, np.nan)
+        mismatch = np.zeros(n, dtype=np.bool_)
+        implausible = np.zeros(n, dtype=np.bool_)
+        for i in prange(n):
+            height_m = height[i] / 100 if height[i] > 3 else height[i]
+            if np.isnan(weight[i]) or not height_m > 0:
+                continue
+            value = weight[i] / (height_m * height_m)
+            calculated[i] = value
+            mismatch[i] = abs(value - bmi[i]) > 1
+            implausible[i] = value < 10 or value > 80
+        return calculated, mismatch, implausible
+
+    @njit(cache=True, parallel=True)
+    def _age_violations_jit(age):
+        n = age.shape[0]
+        negative = np.zeros(n, dtype=np.bool_)
+        too_old = np.zeros(n, dtype=np.bool_)
+        for i in prange(n):
+            negative[i] = age[i] < 0
+            too_old[i] = age[i] > 120
+        return negative, too_old
+
+
+def bp_violations(systolic: np.ndarray, diastolic: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Pressão arterial: diastólica >= sistólica ou diferencial < 10 mmHg.
+    
+    Args:
+        systolic: Sistólica por linha
+        diastolic: Diastólica por linha
+        
+    Returns:
+        Tupla de máscaras (invertida, diferencial baixo), mutuamente exclusivas
+    """
+    if NUMBA_AVAILABLE:
+        return _bp_violations_jit(systolic, diastolic)
+    return _bp_violations_numpy(systolic, diastolic)
+
+
+def bmi_violations(
+    weight: np.ndarray, height: np.ndarray, bmi: np.ndarray
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    IMC calculado a partir de peso (kg) e altura (m ou cm).
+    
+    Args:
+        weight: Peso por linha
+        height: Altura por linha
+        bmi: IMC registrado por linha (NaN se ausente)
+        
+    Returns:
+        Tupla (IMC calculado, diverge do registrado em > 1, fora de 10-80)
+    """
+    if NUMBA_AVAILABLE:
+        return _bmi_violations_jit(weight, height, bmi)
+    return _bmi_violations_numpy(weight, height, bmi)
+
+
+def age_violations(age: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Idade negativa ou maior que 120 anos.
+    
+    Args:
+        age: Idade por linha
+        
+    Returns:
+        Tupla de máscaras (negativa, muito alta)
+    """
+    if NUMBA_AVAILABLE:
+        return _age_violations_jit(age)
+    return _age_violations_numpy(age)
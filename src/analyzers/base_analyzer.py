@@ -4,15 +4,52 @@ REDCap Data Quality Intelligence Agent - Base Analyzer
 Classe base para todos os analisadores de qualidade de dados.
 """
 
+import sys
 from abc import ABC, abstractmethod
-from typing import Optional
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Iterable, Optional
 from datetime import datetime
-from dateutil import parser as date_parser
+
+import numpy as np
+import pandas as pd
 
 from ..models import ProjectData, Query, FieldMetadata
+from .branching_logic import Evaluator, LogicError, compile_logic
 import config
 
 
+# Valor padrão para evento/instrumento ausente (internado: compartilhado por todas as queries)
+_NA = sys.intern("N/A")
+
+# logic -> função compilada (None se a lógica não é suportada)
+_logic_cache: dict[str, Optional[Evaluator]] = {}
+
+
+@lru_cache(maxsize=65536)
+def _parse_date_cached(value: str) -> Optional[datetime]:
+    """
+    Parse de data memoizado pela string (já sem espaços).
+    
+    Exports do REDCap repetem as mesmas datas em muitos registros/eventos;
+    acertos e falhas (None) ficam no cache. datetime é imutável, então o
+    mesmo objeto pode ser devolvido a vários chamadores.
+    """
+    # Tenta formatos conhecidos primeiro
+    parsed = config.parse_date(value)
+    if parsed is not None:
+        return parsed
+    
+    # Demais variantes ISO (ex: "2024-01-15T10:30", "2024/01/15").
+    # Datas em texto livre não são aceitas (antes caíam no dateutil).
+    try:
+        parsed = datetime.fromisoformat(value.replace("/", "-"))
+    except ValueError:
+        return None
+    # Remove fuso para permitir comparação com as demais datas (naive)
+    return parsed.replace(tzinfo=None)
+
+
 class BaseAnalyzer(ABC):
     """
     Classe base abstrata para analisadores de qualidade de dados.
@@ -21,6 +58,46 @@ class BaseAnalyzer(ABC):
     implementar o método analyze().
     """
     
+    # Modificações simples - apenas preencher ou corrigir valor
+    _SIMPLE_TYPES = frozenset({
+        "required_field_empty",
+        "invalid_choice",
+        "invalid_format",
+        "value_out_of_range",
+    })
+    
+    # Modificações complexas - requer análise detalhada
+    _COMPLEX_TYPES = frozenset({
+        "physiologically_impossible",
+        "clinical_classification_mismatch",
+        "death_date_inconsistent",
+        "suspicious_edit_pattern",
+        "inclusion_criteria_violated",
+        "exclusion_criteria_violated",
+        "broken_sequence",
+    })
+    
+    # Valores aceitos pelos padrões de Query.priority / Query.modification_severity
+    _PRIORITIES = frozenset({"Alta", "Média", "Baixa"})
+    _SEVERITIES = frozenset({"Simples", "Moderada", "Complexa"})
+    
+    _MODIFICATION_DETAILS = MappingProxyType({
+        "required_field_empty": "Preencher valor ausente. Consultar fonte primária de dados ou contatar participante.",
+        "invalid_choice": "Corrigir código inválido para opção válida. Verificar lista de opções no dicionário de dados.",
+        "invalid_format": "Ajustar formato do valor (ex: data, número). Verificar formato esperado no REDCap.",
+        "value_out_of_range": "Verificar valor com fonte primária. Se correto, documentar exceção no campo de comentários.",
+        "date_out_of_order": "Revisar cronologia dos eventos. Verificar se datas foram invertidas ou se evento foi registrado no formulário errado.",
+        "followup_before_baseline": "Verificar se data de follow-up está correta ou se baseline precisa correção.",
+        "event_out_of_timeline": "Documentar desvio de protocolo ou corrigir data se erro de digitação.",
+        "field_should_be_empty": "Remover valor ou corrigir campo condicional relacionado.",
+        "calculated_field_mismatch": "Verificar valores fonte e recalcular. Pode indicar erro de digitação.",
+        "physiologically_impossible": "Requer investigação detalhada. Verificar com equipe clínica e fonte primária.",
+        "clinical_classification_mismatch": "Revisar valores clínicos relacionados. Possível inversão de valores.",
+        "death_date_inconsistent": "Investigação crítica. Verificar prontuário e registros oficiais.",
+        "suspicious_edit_pattern": "Auditar edições. Verificar com usuário responsável pelas modificações.",
+        "broken_sequence": "Verificar sequência de instrumentos repetidos. Pode indicar dados faltantes.",
+    })
+    
     def __init__(self, project_data: ProjectData):
         """
         Inicializa o analisador.
@@ -30,6 +107,7 @@ class BaseAnalyzer(ABC):
         """
         self.project_data = project_data
         self.queries: list[Query] = []
+        self._field_names_lower: dict[str, str] = {}
         
     @abstractmethod
     def analyze(self) -> list[Query]:
@@ -78,9 +156,9 @@ class BaseAnalyzer(ABC):
         if modification_details is None:
             modification_details = self._get_modification_details(issue_type, value_found)
         
-        query = Query(
+        fields = dict(
             record_id=str(record_id),
-            event=event or "N/A",
+            event=event or _NA,
             instrument=instrument,
             field=field,
             value_found=value_found,
@@ -91,8 +169,70 @@ class BaseAnalyzer(ABC):
             modification_severity=modification_severity,
             modification_details=modification_details,
         )
+        
+        # Caminho comum: argumentos já no formato do modelo, dispensa a validação
+        # do Pydantic (regex de priority/severity por query). Qualquer outro caso
+        # passa pela validação completa e falha como antes.
+        if (
+            priority in self._PRIORITIES
+            and modification_severity in self._SEVERITIES
+            and type(fields["event"]) is str
+            and type(instrument) is str
+            and type(field) is str
+            and type(issue_type) is str
+            and type(explanation) is str
+            and (suggested_action is None or type(suggested_action) is str)
+            and (modification_details is None or type(modification_details) is str)
+        ):
+            query = Query.model_construct(**fields)
+        else:
+            query = Query(**fields)
         self.queries.append(query)
     
+    def bulk_add_queries(
+        self,
+        issue_type: str,
+        rows: Iterable[tuple],
+        priority: str = "Média",
+        suggested_action: Optional[str] = None,
+    ) -> None:
+        """
+        Adiciona várias queries do mesmo tipo de uma vez.
+        
+        Grau e detalhes da modificação são resolvidos uma única vez para o
+        issue_type, em vez de uma vez por query como em add_query().
+        
+        Args:
+            issue_type: Tipo de inconsistência (comum a todas as queries)
+            rows: Tuplas (record_id, event, instrument, field, value_found, explanation)
+            priority: Alta, Média ou Baixa
+            suggested_action: Sugestão de correção (opcional)
+        """
+        modification_severity = self._determine_modification_severity(issue_type)
+        modification_details = self._get_modification_details(issue_type, None)
+        
+        if priority in self._PRIORITIES:
+            build = Query.model_construct
+        else:
+            build = Query  # Valida (e rejeita) a prioridade como add_query
+        
+        self.queries.extend(
+            build(
+                record_id=str(record_id),
+                event=event or _NA,
+                instrument=instrument,
+                field=field,
+                value_found=value_found,
+                issue_type=issue_type,
+                explanation=explanation,
+                priority=priority,
+                suggested_action=suggested_action,
+                modification_severity=modification_severity,
+                modification_details=modification_details,
+            )
+            for record_id, event, instrument, field, value_found, explanation in rows
+        )
+    
     def _determine_modification_severity(self, issue_type: str) -> str:
         """
         Determina o grau de modificação baseado no tipo de issue.
@@ -100,27 +240,9 @@ class BaseAnalyzer(ABC):
         Returns:
             "Simples", "Moderada" ou "Complexa"
         """
-        # Modificações simples - apenas preencher ou corrigir valor
-        simple_types = [
-            "required_field_empty",
-            "invalid_choice",
-            "invalid_format",
-            "value_out_of_range",
-        ]
-                # Modificações complexas - requer análise detalhada
-        complex_types = [
-            "physiologically_impossible",
-            "clinical_classification_mismatch",
-            "death_date_inconsistent",
-            "suspicious_edit_pattern",
-            "inclusion_criteria_violated",
-            "exclusion_criteria_violated",
-            "broken_sequence",
-        ]
-        
-        if issue_type in simple_types:
+        if issue_type in self._SIMPLE_TYPES:
             return "Simples"
-        elif issue_type in complex_types:
+        elif issue_type in self._COMPLEX_TYPES:
             return "Complexa"
         else:
             return "Moderada"
@@ -132,24 +254,7 @@ class BaseAnalyzer(ABC):
         Returns:
             String com detalhes da modificação
         """
-        details = {
-            "required_field_empty": "Preencher valor ausente. Consultar fonte primária de dados ou contatar participante.",
-            "invalid_choice": "Corrigir código inválido para opção válida. Verificar lista de opções no dicionário de dados.",
-            "invalid_format": "Ajustar formato do valor (ex: data, número). Verificar formato esperado no REDCap.",
-            "value_out_of_range": "Verificar valor com fonte primária. Se correto, documentar exceção no campo de comentários.",
-            "date_out_of_order": "Revisar cronologia dos eventos. Verificar se datas foram invertidas ou se evento foi registrado no formulário errado.",
-            "followup_before_baseline": "Verificar se data de follow-up está correta ou se baseline precisa correção.",
-            "event_out_of_timeline": "Documentar desvio de protocolo ou corrigir data se erro de digitação.",
-            "field_should_be_empty": "Remover valor ou corrigir campo condicional relacionado.",
-            "calculated_field_mismatch": "Verificar valores fonte e recalcular. Pode indicar erro de digitação.",
-            "physiologically_impossible": "Requer investigação detalhada. Verificar com equipe clínica e fonte primária.",
-            "clinical_classification_mismatch": "Revisar valores clínicos relacionados. Possível inversão de valores.",
-            "death_date_inconsistent": "Investigação crítica. Verificar prontuário e registros oficiais.",
-            "suspicious_edit_pattern": "Auditar edições. Verificar com usuário responsável pelas modificações.",
-            "broken_sequence": "Verificar sequência de instrumentos repetidos. Pode indicar dados faltantes.",
-        }
-        
-        return details.get(issue_type, "Verificar valor e corrigir conforme necessário.")
+        return self._MODIFICATION_DETAILS.get(issue_type, "Verificar valor e corrigir conforme necessário.")
     
     def get_field_metadata(self, field_name: str) -> Optional[FieldMetadata]:
         """
@@ -163,6 +268,21 @@ class BaseAnalyzer(ABC):
         """
         return self.project_data.metadata_by_field.get(field_name)
     
+    def field_name_lower(self, field_name: str) -> str:
+        """
+        Nome do campo em minúsculas, calculado uma vez por campo.
+        
+        Args:
+            field_name: Nome do campo
+            
+        Returns:
+            Nome em minúsculas
+        """
+        lowered = self._field_names_lower.get(field_name)
+        if lowered is None:
+            lowered = self._field_names_lower[field_name] = field_name.lower()
+        return lowered
+    
     def get_record_id_field(self) -> str:
         """
         Obtém o nome do campo de ID do registro.
@@ -196,7 +316,9 @@ class BaseAnalyzer(ABC):
         if value is None:
             return True
         if isinstance(value, str):
-            return value.strip() == ""
+            # isspace() equivale a strip() == "" sem alocar uma nova string
+            # e para no primeiro caractere não branco
+            return not value or value.isspace()
         return False
     
     def parse_date(self, value: str) -> Optional[datetime]:
@@ -212,18 +334,7 @@ class BaseAnalyzer(ABC):
         if self.is_empty(value):
             return None
         
-        # Tenta formatos conhecidos primeiro
-        for fmt in config.DATE_FORMATS:
-            try:
-                return datetime.strptime(value.strip(), fmt)
-            except ValueError:
-                continue
-        
-        # Tenta parser genérico
-        try:
-            return date_parser.parse(value.strip())
-        except (ValueError, TypeError):
-            return None
+        return _parse_date_cached(value.strip())
     
     def parse_number(self, value: str) -> Optional[float]:
         """
@@ -235,16 +346,41 @@ class BaseAnalyzer(ABC):
         Returns:
             float ou None se não for possível parsear
         """
-        if self.is_empty(value):
+        if value is None:
+            return None
+        if type(value) is float or type(value) is int:
+            return float(value)
+        
+        text = value.strip() if isinstance(value, str) else str(value).strip()
+        if not text:
             return None
         
         try:
-            # Remove espaços e troca vírgula por ponto
-            clean_value = str(value).strip().replace(",", ".")
-            return float(clean_value)
-        except (ValueError, TypeError):
+            return float(text)
+        except ValueError:
+            # Decimal com vírgula (ex: "37,5"): só aloca a cópia quando necessário
+            if "," in text:
+                try:
+                    return float(text.replace(",", "."))
+                except ValueError:
+                    return None
             return None
     
+    @staticmethod
+    def parse_number_array(values) -> np.ndarray:
+        """
+        Equivalente vetorizado de parse_number para uma coluna inteira.
+        
+        Args:
+            values: Sequência/array de valores (strings, números ou None)
+            
+        Returns:
+            Array float64 com NaN onde o valor está vazio ou não é numérico
+        """
+        text = np.asarray(values, dtype=object).astype(str)
+        text = np.char.replace(np.char.strip(text), ",", ".")
+        return pd.to_numeric(text, errors="coerce").astype(np.float64)
+    
     def evaluate_branching_logic(self, logic: str, record: dict) -> bool:
         """
         Avalia branching logic do REDCap.
@@ -259,66 +395,24 @@ class BaseAnalyzer(ABC):
         if not logic or not logic.strip():
             return True  # Sem lógica = sempre visível
         
+        if logic in _logic_cache:
+            evaluator = _logic_cache[logic]
+        else:
+            try:
+                evaluator = compile_logic(logic)
+            except LogicError:
+                evaluator = None
+            _logic_cache[logic] = evaluator
+        
+        if evaluator is None:
+            return True  # Lógica não suportada: assume que é válido
+        
         try:
-            # Converte sintaxe REDCap para Python
-            python_logic = self._convert_redcap_logic(logic, record)
-            # 🛡️ SECURITY FIX: Validação adicional antes do eval
-            if "__" in python_logic or "lambda" in python_logic or "import" in python_logic:
-                # Log or just return False/True safely
-                print(f"Security Warning: Dangerous pattern detected in logic: {python_logic}")
-                return False
-
-            # 🛡️ SECURITY FIX: Restringir eval para evitar injeção de código
-            # Remove builtins para que comandos como __import__ não funcionem
-            return eval(python_logic, {"__builtins__": None}, {})
-        except Exception:
+            return bool(evaluator(record))
+        except (LogicError, ArithmeticError):
             # Se não conseguir avaliar, assume que é válido
             return True
     
-    def _convert_redcap_logic(self, logic: str, record: dict) -> str:
-        """
-        Converte branching logic do REDCap para expressão Python.
-        
-        Args:
-            logic: Lógica REDCap
-            record: Registro para obter valores
-            
-        Returns:
-            String com expressão Python
-        """
-        import re
-        
-        result = logic
-        
-        # Substitui operadores
-        result = result.replace(" and ", " and ")
-        result = result.replace(" or ", " or ")
-        result = result.replace("<>", "!=")
-        result = result.replace("=", "==").replace("!==", "!=").replace("<==", "<=").replace(">==", ">=")
-        
-        # Encontra referências a campos [field_name]
-        field_pattern = r'\[([^\]]+)\]'
-        
-        def replace_field(match):
-            field_name = match.group(1)
-            # Trata checkboxes [field(code)]
-            checkbox_match = re.match(r'(\w+)\((\d+)\)', field_name)
-            if checkbox_match:
-                base_field = checkbox_match.group(1)
-                code = checkbox_match.group(2)
-                checkbox_field = f"{base_field}___{code}"
-                value = record.get(checkbox_field, "")
-                return f'"{value}"'
-            else:
-                value = record.get(field_name, "")
-                if isinstance(value, str):
-                    return f'"{value}"'
-                return str(value) if value else '""'
-        
-        result = re.sub(field_pattern, replace_field, result)
-        
-        return result
-    
     def determine_priority(self, issue_type: str, field_name: str = "") -> str:
         """
         Determina a prioridade de uma query baseado no tipo.
@@ -330,28 +424,8 @@ class BaseAnalyzer(ABC):
         Returns:
             "Alta", "Média" ou "Baixa"
         """
-        # Issues de alta prioridade
-        high_priority_types = [
-            "required_field_empty",
-            "physiologically_impossible",
-            "inclusion_criteria_violated",
-            "exclusion_criteria_violated",
-            "death_date_inconsistent",
-            "followup_before_baseline",
-        ]
-        
-        # Issues de baixa prioridade
-        low_priority_types = [
-            "field_should_be_empty",
-        ]
-        
         # Campos críticos sempre alta prioridade
-        if field_name in config.CRITICAL_DATE_FIELDS:
+        if field_name in config.CRITICAL_DATE_FIELDS_SET:
             return "Alta"
         
-        if issue_type in high_priority_types:
-            return "Alta"
-        elif issue_type in low_priority_types:
-            return "Baixa"
-        else:
-            return "Média"
+        return config.ISSUE_TYPE_PRIORITY.get(issue_type, "Média")
@@ -0,0 +1,246 @@
+"""
+REDCap Data Quality Intelligence Agent - Branching Logic
+
+Compilador de branching logic do REDCap para funções Python.
+
+A expressão é analisada uma única vez (parser descendente recursivo) e
+convertida em uma árvore de closures avaliada diretamente sobre o dict do
+registro, sem eval e sem reprocessar texto a cada registro.
+
+Gramática suportada:
+    expr       := and_expr ("or" and_expr)*
+    and_expr   := not_expr ("and" not_expr)*
+    not_expr   := "not" not_expr | comparison
+    comparison := arith (("=" | "==" | "<>" | "!=" | "<" | "<=" | ">" | ">=") arith)?
+    arith      := term (("+" | "-") term)*
+    term       := unary (("*" | "/") unary)*
+    unary      := "-" unary | primary
+    primary    := [campo] | [campo(código)] | número | "texto" | 'texto' | "(" expr ")"
+"""
+
+import operator
+import re
+from typing import Any, Callable
+
+
+Evaluator = Callable[[dict], Any]
+
+
+class LogicError(Exception):
+    """Erro de tradução ou de avaliação de uma branching logic."""
+
+
+_TOKEN_RE = re.compile(r"""
+    \s*(?:
+        (?P<field>\[[^\]]+\])
+      | (?P<number>\d+(?:\.\d+)?|\.\d+)
+      | (?P<string>"[^"]*"|'[^']*')
+      | (?P<op><>|!=|<=|>=|==|=|<|>|\+|-|\*|/|\(|\))
+      | (?P<word>[A-Za-z_]\w*)
+    )""", re.VERBOSE)
+
+_CHECKBOX_RE = re.compile(r"(\w+)\((\d+)\)\Z")
+
+# Número decimal simples, como o REDCap reconhece; float() aceitaria também
+# "nan", "inf", "1e3" e "1_000", que no REDCap são texto
+_DECIMAL_RE = re.compile(r"-?(?:\d+(?:\.\d+)?|\.\d+)\Z")
+
+_KEYWORDS = frozenset(("and", "or", "not"))
+
+_COMPARISONS = {
+    "=": operator.eq,
+    "==": operator.eq,
+    "<>": operator.ne,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+
+_ARITHMETIC = {
+    "+": operator.add,
+    "-": operator.sub,
+    "*": operator.mul,
+    "/": operator.truediv,
+}
+
+
+def _tokenize(logic: str) -> list[tuple[str, str]]:
+    """Divide a lógica em tokens (tipo, texto)."""
+    tokens = []
+    pos = 0
+    end = len(logic.rstrip())
+    while pos < end:
+        match = _TOKEN_RE.match(logic, pos)
+        if not match:
+            raise LogicError(f"Token inválido na posição {pos}: {logic[pos:pos + 10]!r}")
+        kind = match.lastgroup
+        text = match.group(kind)
+        if kind == "word":
+            text = text.lower()
+            if text not in _KEYWORDS:
+                raise LogicError(f"Função ou identificador não suportado: {text}")
+            kind = "op"
+        tokens.append((kind, text))
+        pos = match.end()
+    return tokens
+
+
+def _as_number(value: Any) -> float:
+    """Converte um operando para número (LogicError se não for numérico)."""
+    if isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str) and _DECIMAL_RE.match(value.strip()):
+        return float(value)
+    raise LogicError(f"Valor não numérico: {value!r}")
+
+
+def _is_numeric(value: Any) -> bool:
+    """True se o valor pode ser comparado numericamente."""
+    if isinstance(value, (int, float)):
+        return True
+    if isinstance(value, str):
+        return _DECIMAL_RE.match(value.strip()) is not None
+    return False
+
+
+def _compare(op: Callable[[Any, Any], bool], left: Any, right: Any) -> bool:
+    """
+    Compara como o REDCap: numericamente quando ambos os lados são números,
+    senão como texto. Ordenação entre texto e número é indefinida (LogicError).
+    """
+    if _is_numeric(left) and _is_numeric(right):
+        return op(float(left), float(right))
+    if op in (operator.eq, operator.ne):
+        return op(str(left), str(right))
+    if isinstance(left, str) and isinstance(right, str):
+        return op(left, right)
+    raise LogicError(f"Comparação inválida entre {left!r} e {right!r}")
+
+
+class _Parser:
+    """Parser descendente recursivo que produz closures (registro -> valor)."""
+
+    def __init__(self, tokens: list[tuple[str, str]]):
+        self.tokens = tokens
+        self.pos = 0
+
+    def _peek(self) -> tuple[str, str]:
+        if self.pos < len(self.tokens):
+            return self.tokens[self.pos]
+        return ("eof", "")
+
+    def _accept(self, *ops: str) -> str:
+        kind, text = self._peek()
+        if kind == "op" and text in ops:
+            self.pos += 1
+            return text
+        return ""
+
+    def parse(self) -> Evaluator:
+        node = self._or()
+        if self.pos != len(self.tokens):
+            raise LogicError(f"Token inesperado: {self._peek()[1]!r}")
+        return node
+
+    def _or(self) -> Evaluator:
+        nodes = [self._and()]
+        while self._accept("or"):
+            nodes.append(self._and())
+        if len(nodes) == 1:
+            return nodes[0]
+        return lambda rec: any(node(rec) for node in nodes)
+
+    def _and(self) -> Evaluator:
+        nodes = [self._not()]
+        while self._accept("and"):
+            nodes.append(self._not())
+        if len(nodes) == 1:
+            return nodes[0]
+        return lambda rec: all(node(rec) for node in nodes)
+
+    def _not(self) -> Evaluator:
+        if self._accept("not"):
+            node = self._not()
+            return lambda rec: not node(rec)
+        return self._comparison()
+
+    def _comparison(self) -> Evaluator:
+        left = self._arith()
+        op_text = self._accept(*_COMPARISONS)
+        if not op_text:
+            return left
+        right = self._arith()
+        op = _COMPARISONS[op_text]
+        return lambda rec: _compare(op, left(rec), right(rec))
+
+    def _arith(self) -> Evaluator:
+        node = self._term()
+        while True:
+            op_text = self._accept("+", "-")
+            if not op_text:
+                return node
+            node = self._binary(_ARITHMETIC[op_text], node, self._term())
+
+    def _term(self) -> Evaluator:
+        node = self._unary()
+        while True:
+            op_text = self._accept("*", "/")
+            if not op_text:
+                return node
+            node = self._binary(_ARITHMETIC[op_text], node, self._unary())
+
+    @staticmethod
+    def _binary(op: Callable[[Any, Any], Any], left: Evaluator, right: Evaluator) -> Evaluator:
+        return lambda rec: op(_as_number(left(rec)), _as_number(right(rec)))
+
+    def _unary(self) -> Evaluator:
+        if self._accept("-"):
+            node = self._unary()
+            return lambda rec: -_as_number(node(rec))
+        return self._primary()
+
+    def _primary(self) -> Evaluator:
+        kind, text = self._peek()
+        self.pos += 1
+
+        if kind == "field":
+            field_name = text[1:-1].strip()
+            # Trata checkboxes [field(code)]
+            checkbox_match = _CHECKBOX_RE.match(field_name)
+            if checkbox_match:
+                field_name = f"{checkbox_match.group(1)}___{checkbox_match.group(2)}"
+            return lambda rec: rec.get(field_name) or ""
+
+        if kind == "number":
+            value = float(text)
+            return lambda rec: value
+
+        if kind == "string":
+            value = text[1:-1]
+            return lambda rec: value
+
+        if kind == "op" and text == "(":
+            node = self._or()
+            if not self._accept(")"):
+                raise LogicError("Parêntese não fechado")
+            return node
+
+        raise LogicError(f"Token inesperado: {text!r}")
+
+
+def compile_logic(logic: str) -> Evaluator:
+    """
+    Compila uma branching logic do REDCap.
+
+    Args:
+        logic: Lógica REDCap (ex: '[sexo] = "1" and [idade] >= 18')
+
+    Returns:
+        Função que recebe o registro e retorna o resultado da expressão
+
+    Raises:
+        LogicError: Se a lógica usa sintaxe ou funções não suportadas
+    """
+    return _Parser(_tokenize(logic)).parse()
@@ -4,13 +4,44 @@ REDCap Data Quality Intelligence Agent - Clinical Analyzer
 Analisador de inconsistências clínicas nos dados.
 """
 
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
 from typing import Optional
 
-from .base_analyzer import BaseAnalyzer
-from ..models import Query
+import numpy as np
+import pandas as pd
+
+from .base_analyzer import BaseAnalyzer, _NA
+from ._clinical_kernels import age_violations, bmi_violations, bp_violations
+from ..models import LazyText, Query, ProjectData
 import config
 from ..rules_manager import rules_manager # Import para verificar duplicatas
 
+# Padrões de nome usados para localizar campos clínicos (ordem = preferência)
+FIELD_PATTERNS = {
+    "systolic": ["systolic", "pas", "sistolica", "sbp"],
+    "diastolic": ["diastolic", "pad", "diastolica", "dbp"],
+    "weight": ["weight", "peso", "wt"],
+    "height": ["height", "altura", "estatura"],  # Removed 'ht' as it matches 'weight'
+    "bmi": ["bmi", "imc"],
+    "age": ["age", "idade"],
+    "dob": ["birth", "nascimento", "dob", "dtn"],
+}
+
+# A partir deste número de registros a análise é dividida entre processos.
+# As verificações já são vetorizadas, então só compensa em projetos grandes.
+PARALLEL_MIN_RECORDS = 50000
+
+
+def _analyze_chunk(metadata: list, records: list[dict], clinical_limits: dict) -> list[Query]:
+    """Analisa uma fatia dos registros (nível de módulo para ser picklável)."""
+    chunk_data = ProjectData.model_construct(metadata=metadata, records=records)
+    return ClinicalAnalyzer(chunk_data, custom_limits=clinical_limits, max_workers=1).analyze()
+
+
 class ClinicalAnalyzer(BaseAnalyzer):
     """
     Analisador de inconsistências clínicas.
@@ -21,282 +52,366 @@ class ClinicalAnalyzer(BaseAnalyzer):
     - Classificações clínicas incorretas
     """
     
-    def __init__(self, project_data, custom_limits: Optional[dict] = None):
+    # Lido pelo QueryGenerator, que roda o analisador fora do seu pool quando
+    # ele mesmo vai dividir os registros entre processos
+    parallel_min_records = PARALLEL_MIN_RECORDS
+    
+    def __init__(self, project_data, custom_limits: Optional[dict] = None, max_workers: Optional[int] = None):
         """
         Inicializa o analisador clínico.
         
         Args:
             project_data: Dados do projeto
             custom_limits: Limites clínicos customizados (opcional)
+            max_workers: Processos para projetos grandes (padrão: número de CPUs)
         """
         super().__init__(project_data)
         self.clinical_limits = {**config.CLINICAL_LIMITS}
         if custom_limits:
             self.clinical_limits.update(custom_limits)
+        self._limit_arrays = config.build_limit_arrays(self.clinical_limits)
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._form_by_field = {
+            m.field_name: sys.intern(m.form_name or _NA) for m in project_data.metadata
+        }
+        
+        # Em modo paralelo cada processo monta suas próprias colunas
+        if not self._should_shard():
+            self._prepare_columns()
+    
+    def _should_shard(self) -> bool:
+        """
+        Decide se a análise será dividida entre processos.
+        
+        Não divide quando já está rodando dentro de um processo filho
+        (ex: pool do QueryGenerator), evitando pools aninhados.
+        """
+        return (
+            self.max_workers > 1
+            and len(self.project_data.records) >= self.parallel_min_records
+            and multiprocessing.parent_process() is None
+        )
+    
+    def _prepare_columns(self) -> None:
+        """Monta a visão colunar e resolve os campos usados pelas verificações."""
+        # Registros em formato colunar, compartilhado via ProjectData.columns
+        self.df = pd.DataFrame(self.project_data.columns, copy=False)
+        self._filled_cache: dict[str, np.ndarray] = {}
+        
+        # Nomes de campo são os mesmos em todos os registros: resolve uma única vez
+        self._resolved = {
+            key: self._columns_by_pattern(patterns)
+            for key, patterns in FIELD_PATTERNS.items()
+        }
+        # Allowlist de colunas com limite fisiológico: campo -> chave de clinical_limits
+        limit_keys = [(key, key.lower()) for key in self.clinical_limits]
+        self._field_to_limit: dict[str, str] = {}
+        for column in self.df.columns:
+            limit_key = self._limit_for_column(column, limit_keys)
+            if limit_key is not None:
+                self._field_to_limit[column] = limit_key
     
     def analyze(self) -> list[Query]:
         """
         Executa análise clínica completa.
         
+        As verificações operam coluna a coluna sobre self.df; apenas as
+        linhas reprovadas voltam para Python para gerar as queries.
+        
         Returns:
             Lista de queries identificadas
         """
         self.queries = []
         
+        if self._should_shard():
+            return self._analyze_parallel()
+        
+        if self.df.empty:
+            return self.queries
+        
         record_id_field = self.get_record_id_field()
         event_field = self.get_event_field()
+        record_ids = self._column_or_default(record_id_field, "UNKNOWN")
+        events = self._column_or_default(event_field, "")
         
-        for record in self.project_data.records:
-            record_id = record.get(record_id_field, "UNKNOWN")
-            event = record.get(event_field, "")
-            
-            self._check_physiological_values(record_id, event, record)
-            self._check_blood_pressure_consistency(record_id, event, record)
-            self._check_bmi_consistency(record_id, event, record)
-            self._check_age_consistency(record_id, event, record)
+        self._check_physiological_values(record_ids, events)
+        self._check_blood_pressure_consistency(record_ids, events)
+        self._check_bmi_consistency(record_ids, events)
+        self._check_age_consistency(record_ids, events)
+        
+        return self.queries
+    
+    def _analyze_parallel(self) -> list[Query]:
+        """
+        Divide os registros em fatias contíguas e analisa cada uma em um processo.
+        
+        As verificações são independentes por registro; os resultados são
+        concatenados na ordem das fatias.
+        
+        Returns:
+            Lista de queries identificadas
+        """
+        records = self.project_data.records
+        chunk_size = -(-len(records) // self.max_workers)
+        chunks = [records[i:i + chunk_size] for i in range(0, len(records), chunk_size)]
+        # Os limites padrão são mappingproxy (não picklável): envia cópias simples
+        limits = {key: dict(value) for key, value in self.clinical_limits.items()}
+        
+        with ProcessPoolExecutor(max_workers=len(chunks)) as executor:
+            futures = [
+                executor.submit(_analyze_chunk, self.project_data.metadata, chunk, limits)
+                for chunk in chunks
+            ]
+            for future in futures:
+                self.queries.extend(future.result())
         
         return self.queries
     
-    def _find_field_by_pattern(self, record: dict, patterns: list[str]) -> Optional[tuple[str, any]]:
+    def _column_or_default(self, column: str, default: str) -> np.ndarray:
+        """Valores de uma coluna (object), com default onde o campo não existe."""
+        if column not in self.df.columns:
+            return np.full(len(self.df), default, dtype=object)
+        values = self.df[column].to_numpy()
+        return np.where(pd.isna(values), default, values)
+    
+    def _filled(self, column: str) -> np.ndarray:
+        """Máscara das linhas com valor não vazio (equivalente vetorizado de is_empty)."""
+        mask = self._filled_cache.get(column)
+        if mask is None:
+            col = self.df[column]
+            mask = (col.notna() & col.astype(str).str.strip().ne("")).to_numpy()
+            self._filled_cache[column] = mask
+        return mask
+    
+    def _columns_by_pattern(self, patterns: list[str]) -> list[str]:
         """
-        Encontra um campo por padrões de nome.
+        Colunas cujo nome contém algum dos padrões, na ordem dos campos.
         
         Args:
-            record: Registro atual
             patterns: Lista de padrões a buscar
             
         Returns:
-            Tupla (field_name, value) ou None
+            Lista de nomes de campo candidatos
+        """
+        lowered = [pattern.lower() for pattern in patterns]
+        return [
+            column for column in self.df.columns
+            if any(pattern in self.field_name_lower(column) for pattern in lowered)
+        ]
+    
+    def _first_filled(self, columns: list[str]) -> tuple[np.ndarray, np.ndarray]:
         """
-        for field_name, value in record.items():
-            field_lower = field_name.lower()
-            for pattern in patterns:
-                if pattern.lower() in field_lower:
-                    if not self.is_empty(value):
-                        return (field_name, value)
+        Para cada linha, o primeiro campo candidato preenchido.
+        
+        Args:
+            columns: Campos candidatos (ordem = preferência)
+            
+        Returns:
+            Tupla (nomes de campo, valores) por linha; None onde nenhum está preenchido
+        """
+        n = len(self.df)
+        fields = np.full(n, None, dtype=object)
+        values = np.full(n, None, dtype=object)
+        pending = np.ones(n, dtype=bool)
+        
+        for column in columns:
+            hit = pending & self._filled(column)
+            if hit.any():
+                fields[hit] = column
+                values[hit] = self.df[column].to_numpy()[hit]
+                pending &= ~hit
+        
+        return fields, values
+    
+    def _limit_for_column(self, column: str, limit_keys: list[tuple[str, str]]) -> Optional[str]:
+        """
+        Primeira chave de clinical_limits que corresponde ao nome do campo.
+        
+        Args:
+            column: Nome do campo
+            limit_keys: Pares (chave, chave em minúsculas) na ordem de clinical_limits
+            
+        Returns:
+            Chave correspondente ou None
+        """
+        field_lower = self.field_name_lower(column)
+        for limit_key, key_lower in limit_keys:
+            if key_lower in field_lower or field_lower in key_lower:
+                return limit_key
         return None
     
-    def _check_physiological_values(self, record_id: str, event: str, record: dict) -> None:
+    def _check_physiological_values(self, record_ids: np.ndarray, events: np.ndarray) -> None:
         """Verifica valores contra limites fisiológicos."""
-        for field_name, value in record.items():
-            if self.is_empty(value):
+        for field_name, limit_key in self._field_to_limit.items():
+            raw_values = self.df[field_name].to_numpy()
+            num_values = self.parse_number_array(raw_values)
+            out_of_range = config.validate_batch(limit_key, num_values, self._limit_arrays)
+            failing = np.flatnonzero(out_of_range)
+            if not len(failing):
                 continue
             
-            num_value = self.parse_number(value)
-            if num_value is None:
-                continue
+            limits = self.clinical_limits[limit_key]
+            min_val = limits.get("min")
+            max_val = limits.get("max")
+            unit = limits.get("unit", "")
+            form_name = self._form_by_field.get(field_name, _NA)
             
-            # Busca correspondência com limites conhecidos
-            field_lower = field_name.lower()
+            def explanation(i: int) -> str:
+                if min_val is not None and num_values[i] < min_val:
+                    bound = f"mínimo esperado: {min_val} {unit}"
+                else:
+                    bound = f"máximo esperado: {max_val} {unit}"
+                return f"O valor {raw_values[i]} {unit} é fisiologicamente impossível ({bound})."
             
-            for limit_key, limits in self.clinical_limits.items():
-                if limit_key.lower() in field_lower or field_lower in limit_key.lower():
-                    min_val = limits.get("min")
-                    max_val = limits.get("max")
-                    unit = limits.get("unit", "")
-                    
-                    if min_val is not None and num_value < min_val:
-                        field_meta = self.get_field_metadata(field_name)
-                        self.add_query(
-                            record_id=record_id,
-                            event=event,
-                            instrument=field_meta.form_name if field_meta else "N/A",
-                            field=field_name,
-                            value_found=value,
-                            issue_type="physiologically_impossible",
-                            explanation=f"O valor {value} {unit} é fisiologicamente impossível (mínimo esperado: {min_val} {unit}).",
-                            priority="Alta",
-                            suggested_action=f"Verificar entrada de dados. Valor deve estar entre {min_val} e {max_val} {unit}.",
-                        )
-                    elif max_val is not None and num_value > max_val:
-                        field_meta = self.get_field_metadata(field_name)
-                        self.add_query(
-                            record_id=record_id,
-                            event=event,
-                            instrument=field_meta.form_name if field_meta else "N/A",
-                            field=field_name,
-                            value_found=value,
-                            issue_type="physiologically_impossible",
-                            explanation=f"O valor {value} {unit} é fisiologicamente impossível (máximo esperado: {max_val} {unit}).",
-                            priority="Alta",
-                            suggested_action=f"Verificar entrada de dados. Valor deve estar entre {min_val} e {max_val} {unit}.",
-                        )
-                    break
+            self.bulk_add_queries(
+                "physiologically_impossible",
+                (
+                    (record_ids[i], events[i], form_name, field_name, raw_values[i], explanation(i))
+                    for i in failing
+                ),
+                priority="Alta",
+                suggested_action=f"Verificar entrada de dados. Valor deve estar entre {min_val} e {max_val} {unit}.",
+            )
     
-    def _check_blood_pressure_consistency(self, record_id: str, event: str, record: dict) -> None:
+    def _check_blood_pressure_consistency(self, record_ids: np.ndarray, events: np.ndarray) -> None:
         """Verifica consistência entre pressão sistólica e diastólica."""
-        # Busca campos de PA
-        systolic_patterns = ["systolic", "pas", "sistolica", "sbp"]
-        diastolic_patterns = ["diastolic", "pad", "diastolica", "dbp"]
+        sys_fields, sys_values = self._first_filled(self._resolved["systolic"])
+        dia_fields, dia_values = self._first_filled(self._resolved["diastolic"])
         
-        systolic = self._find_field_by_pattern(record, systolic_patterns)
-        diastolic = self._find_field_by_pattern(record, diastolic_patterns)
+        sys_num = self.parse_number_array(sys_values)
+        dia_num = self.parse_number_array(dia_values)
         
-        if not systolic or not diastolic:
-            return
-        
-        sys_field, sys_value = systolic
-        dia_field, dia_value = diastolic
-        
-        sys_num = self.parse_number(sys_value)
-        dia_num = self.parse_number(dia_value)
-        
-        if sys_num is None or dia_num is None:
-            return
+        inverted, narrow = bp_violations(sys_num, dia_num)
+        form_by_field = self._form_by_field
         
         # Diastólica deve ser menor que sistólica
-        if dia_num >= sys_num:
-            field_meta = self.get_field_metadata(dia_field)
-            self.add_query(
-                record_id=record_id,
-                event=event,
-                instrument=field_meta.form_name if field_meta else "N/A",
-                field=dia_field,
-                value_found=f"Sistólica: {sys_value}, Diastólica: {dia_value}",
-                issue_type="clinical_classification_mismatch",
-                explanation=f"Pressão diastólica ({dia_value} mmHg) é maior ou igual à sistólica ({sys_value} mmHg), o que é clinicamente impossível.",
-                priority="Alta",
-                suggested_action="Verificar se os valores foram invertidos ou se há erro de digitação.",
-            )
+        self.bulk_add_queries(
+            "clinical_classification_mismatch",
+            (
+                (
+                    record_ids[i], events[i], form_by_field.get(dia_fields[i], _NA), dia_fields[i],
+                    LazyText("Sistólica: {}, Diastólica: {}", sys_values[i], dia_values[i]),
+                    f"Pressão diastólica ({dia_values[i]} mmHg) é maior ou igual à sistólica ({sys_values[i]} mmHg), o que é clinicamente impossível.",
+                )
+                for i in np.flatnonzero(inverted)
+            ),
+            priority="Alta",
+            suggested_action="Verificar se os valores foram invertidos ou se há erro de digitação.",
+        )
         
         # Diferença muito pequena (< 10 mmHg) é suspeita
-        elif sys_num - dia_num < 10:
-            field_meta = self.get_field_metadata(dia_field)
-            self.add_query(
-                record_id=record_id,
-                event=event,
-                instrument=field_meta.form_name if field_meta else "N/A",
-                field=dia_field,
-                value_found=f"Diferencial: {sys_num - dia_num} mmHg",
-                issue_type="clinical_classification_mismatch",
-                explanation=f"Pressão diferencial muito baixa ({sys_num - dia_num} mmHg). Diferencial < 10 mmHg é altamente improvável.",
-                priority="Média",
-                suggested_action="Verificar medição da pressão arterial.",
-            )
+        pulse_pressure = sys_num - dia_num
+        self.bulk_add_queries(
+            "clinical_classification_mismatch",
+            (
+                (
+                    record_ids[i], events[i], form_by_field.get(dia_fields[i], _NA), dia_fields[i],
+                    LazyText("Diferencial: {} mmHg", float(pulse_pressure[i])),
+                    f"Pressão diferencial muito baixa ({float(pulse_pressure[i])} mmHg). Diferencial < 10 mmHg é altamente improvável.",
+                )
+                for i in np.flatnonzero(narrow)
+            ),
+            priority="Média",
+            suggested_action="Verificar medição da pressão arterial.",
+        )
     
-    def _check_bmi_consistency(self, record_id: str, event: str, record: dict) -> None:
+    def _check_bmi_consistency(self, record_ids: np.ndarray, events: np.ndarray) -> None:
         """Verifica consistência do IMC com peso e altura."""
-        # Busca campos
-        weight_patterns = ["weight", "peso", "wt"]
-        height_patterns = ["height", "altura", "estatura"]  # Removed 'ht' as it matches 'weight'
-        bmi_patterns = ["bmi", "imc"]
-        
-        weight = self._find_field_by_pattern(record, weight_patterns)
-        height = self._find_field_by_pattern(record, height_patterns)
-        bmi = self._find_field_by_pattern(record, bmi_patterns)
-        
-        if not weight or not height:
-            return
-        
-        weight_num = self.parse_number(weight[1])
-        height_num = self.parse_number(height[1])
-        
-        if weight_num is None or height_num is None:
-            return
-        
-        # Converte altura para metros se estiver em cm
-        if height_num > 3:  # Provavelmente em cm
-            height_m = height_num / 100
-        else:
-            height_m = height_num
-        
-        if height_m <= 0:
-            return
-        
-        calculated_bmi = weight_num / (height_m ** 2)
-        
-        # Se há campo de IMC preenchido, verifica se confere
-        if bmi:
-            bmi_num = self.parse_number(bmi[1])
-            if bmi_num is not None:
-                diff = abs(calculated_bmi - bmi_num)
-                if diff > 1:  # Tolerância de 1 unidade
-                    field_meta = self.get_field_metadata(bmi[0])
-                    self.add_query(
-                        record_id=record_id,
-                        event=event,
-                        instrument=field_meta.form_name if field_meta else "N/A",
-                        field=bmi[0],
-                        value_found=f"Registrado: {bmi[1]}, Calculado: {calculated_bmi:.1f}",
-                        issue_type="calculated_field_mismatch",
-                        explanation=f"O IMC registrado ({bmi[1]}) difere do calculado ({calculated_bmi:.1f}) baseado em peso ({weight[1]}) e altura ({height[1]}).",
-                        priority="Média",
-                        suggested_action="Verificar peso e altura, ou recalcular o IMC.",
-                    )
-        
-        # Verifica se IMC está em faixa plausível
-        if calculated_bmi < 10 or calculated_bmi > 80:
-            field_meta = self.get_field_metadata(weight[0])
-            self.add_query(
-                record_id=record_id,
-                event=event,
-                instrument=field_meta.form_name if field_meta else "N/A",
-                field=weight[0],
-                value_found=f"Peso: {weight[1]}, Altura: {height[1]}, IMC: {calculated_bmi:.1f}",
-                issue_type="physiologically_impossible",
-                explanation=f"O IMC calculado ({calculated_bmi:.1f}) está fora da faixa fisiológica plausível (10-80).",
-                priority="Alta",
-                suggested_action="Verificar os valores de peso e altura.",
-            )
+        weight_fields, weight_values = self._first_filled(self._resolved["weight"])
+        height_fields, height_values = self._first_filled(self._resolved["height"])
+        bmi_fields, bmi_values = self._first_filled(self._resolved["bmi"])
+        
+        weight_num = self.parse_number_array(weight_values)
+        height_num = self.parse_number_array(height_values)
+        bmi_num = self.parse_number_array(bmi_values)
+        
+        # IMC divergente do registrado (tolerância de 1 unidade) ou fora da faixa plausível
+        calculated_bmi, mismatch, implausible = bmi_violations(weight_num, height_num, bmi_num)
+        form_by_field = self._form_by_field
+        
+        self.bulk_add_queries(
+            "calculated_field_mismatch",
+            (
+                (
+                    record_ids[i], events[i], form_by_field.get(bmi_fields[i], _NA), bmi_fields[i],
+                    LazyText("Registrado: {}, Calculado: {:.1f}", bmi_values[i], calculated_bmi[i]),
+                    f"O IMC registrado ({bmi_values[i]}) difere do calculado ({calculated_bmi[i]:.1f}) baseado em peso ({weight_values[i]}) e altura ({height_values[i]}).",
+                )
+                for i in np.flatnonzero(mismatch)
+            ),
+            priority="Média",
+            suggested_action="Verificar peso e altura, ou recalcular o IMC.",
+        )
+        
+        self.bulk_add_queries(
+            "physiologically_impossible",
+            (
+                (
+                    record_ids[i], events[i], form_by_field.get(weight_fields[i], _NA), weight_fields[i],
+                    LazyText(
+                        "Peso: {}, Altura: {}, IMC: {:.1f}",
+                        weight_values[i], height_values[i], calculated_bmi[i],
+                    ),
+                    f"O IMC calculado ({calculated_bmi[i]:.1f}) está fora da faixa fisiológica plausível (10-80).",
+                )
+                for i in np.flatnonzero(implausible)
+            ),
+            priority="Alta",
+            suggested_action="Verificar os valores de peso e altura.",
+        )
     
-    def _check_age_consistency(self, record_id: str, event: str, record: dict) -> None:
+    def _check_age_consistency(self, record_ids: np.ndarray, events: np.ndarray) -> None:
         """Verifica consistência de idade."""
-        # Busca campos de idade e data de nascimento
-        age_patterns = ["age", "idade"]
-        dob_patterns = ["birth", "nascimento", "dob", "dtn"]
-        
-        age = self._find_field_by_pattern(record, age_patterns)
-        dob = self._find_field_by_pattern(record, dob_patterns)
-        
-        if age:
-            age_num = self.parse_number(age[1])
-            if age_num is not None:
-                # Idade negativa
-                if age_num < 0:
-                    field_meta = self.get_field_metadata(age[0])
-                    self.add_query(
-                        record_id=record_id,
-                        event=event,
-                        instrument=field_meta.form_name if field_meta else "N/A",
-                        field=age[0],
-                        value_found=age[1],
-                        issue_type="physiologically_impossible",
-                        explanation="Idade negativa é impossível.",
-                        priority="Alta",
-                        suggested_action="Corrigir valor da idade.",
-                    )
-                # Idade muito alta
-                elif age_num > 120:
-                    field_meta = self.get_field_metadata(age[0])
-                    self.add_query(
-                        record_id=record_id,
-                        event=event,
-                        instrument=field_meta.form_name if field_meta else "N/A",
-                        field=age[0],
-                        value_found=age[1],
-                        issue_type="physiologically_impossible",
-                        explanation=f"Idade {age_num} anos é altamente improvável (> 120 anos).",
-                        priority="Alta",
-                        suggested_action="Verificar data de nascimento e idade.",
-                    )
-        
-        # Se temos data de nascimento e data de visita, podemos verificar
-        if dob:
-            dob_date = self.parse_date(dob[1])
-            if dob_date:
-                from datetime import datetime
-                today = datetime.now()
-                
-                if dob_date > today:
-                    field_meta = self.get_field_metadata(dob[0])
-                    self.add_query(
-                        record_id=record_id,
-                        event=event,
-                        instrument=field_meta.form_name if field_meta else "N/A",
-                        field=dob[0],
-                        value_found=dob[1],
-                        issue_type="physiologically_impossible",
-                        explanation="Data de nascimento está no futuro.",
-                        priority="Alta",
-                        suggested_action="Corrigir data de nascimento.",
-                    )
+        age_fields, age_values = self._first_filled(self._resolved["age"])
+        dob_fields, dob_values = self._first_filled(self._resolved["dob"])
+        
+        age_num = self.parse_number_array(age_values)
+        negative, too_old = age_violations(age_num)
+        form_by_field = self._form_by_field
+        
+        # Idade negativa
+        self.bulk_add_queries(
+            "physiologically_impossible",
+            (
+                (
+                    record_ids[i], events[i], form_by_field.get(age_fields[i], _NA), age_fields[i],
+                    age_values[i], "Idade negativa é impossível.",
+                )
+                for i in np.flatnonzero(negative)
+            ),
+            priority="Alta",
+            suggested_action="Corrigir valor da idade.",
+        )
+        
+        # Idade muito alta
+        self.bulk_add_queries(
+            "physiologically_impossible",
+            (
+                (
+                    record_ids[i], events[i], form_by_field.get(age_fields[i], _NA), age_fields[i],
+                    age_values[i], f"Idade {float(age_num[i])} anos é altamente improvável (> 120 anos).",
+                )
+                for i in np.flatnonzero(too_old)
+            ),
+            priority="Alta",
+            suggested_action="Verificar data de nascimento e idade.",
+        )
+        
+        # Data de nascimento no futuro
+        today = datetime.now()
+        future_dob = [
+            i for i in np.flatnonzero(pd.notna(dob_fields))
+            if (dob_date := self.parse_date(dob_values[i])) and dob_date > today
+        ]
+        self.bulk_add_queries(
+            "physiologically_impossible",
+            (
+                (
+                    record_ids[i], events[i], form_by_field.get(dob_fields[i], _NA), dob_fields[i],
+                    dob_values[i], "Data de nascimento está no futuro.",
+                )
+                for i in future_dob
+            ),
+            priority="Alta",
+            suggested_action="Corrigir data de nascimento.",
+        )
@@ -4,14 +4,63 @@ REDCap Data Quality Intelligence Agent - Custom Rules Analyzer
 Analisador que aplica regras customizadas definidas pelo usuário.
 """
 
+import logging
 import re
+from datetime import datetime
+from functools import lru_cache
 from typing import Optional
 from collections import Counter
 
+# RE2 (opcional) casa em tempo linear: regex de usuário não sofre backtracking exponencial
+try:
+    import re2
+    RE2_AVAILABLE = True
+except ImportError:
+    RE2_AVAILABLE = False
+
 from .base_analyzer import BaseAnalyzer
 from ..models import Query
 from ..rules_manager import rules_manager
 
+logger = logging.getLogger(__name__)
+
+
+# Campos de sistema do REDCap ignorados por regras aplicadas a todos os campos ('_ALL_')
+_SYSTEM_FIELDS = frozenset({"redcap_event_name", "redcap_repeat_instrument", "redcap_repeat_instance"})
+
+# operador da regra -> predicado que retorna True se (valor, referência) VIOLA a regra.
+# Escrito como "not (a < b)" e não "a >= b" para manter o comportamento com NaN.
+_VIOLATES = {
+    "=": lambda a, b: a != b,
+    "!=": lambda a, b: a == b,
+    "<": lambda a, b: not (a < b),
+    ">": lambda a, b: not (a > b),
+    "<=": lambda a, b: not (a <= b),
+    ">=": lambda a, b: not (a >= b),
+}
+
+# Marcador de "ainda não calculado" nos caches por (registro, campo); None é um resultado válido
+_SENTINEL = object()
+
+
+@lru_cache(maxsize=256)
+def _compile_rule_pattern(pattern: str):
+    """
+    Compila o padrão de uma regra regex uma única vez.
+    
+    Usa RE2 quando disponível; padrões que o RE2 não suporta
+    (backreferences, lookarounds) caem para o módulo re.
+    
+    Raises:
+        re.error: Se o padrão é inválido
+    """
+    if RE2_AVAILABLE:
+        try:
+            return re2.compile(pattern)
+        except re2.error:
+            pass
+    return re.compile(pattern)
+
 
 class CustomRulesAnalyzer(BaseAnalyzer):
     """
@@ -31,6 +80,28 @@ class CustomRulesAnalyzer(BaseAnalyzer):
         super().__init__(project_data)
         self.user_id = user_id
         self.access_token = access_token
+        # id(regra) -> padrão compilado (None = padrão inválido, regra ignorada)
+        self._compiled_regex: dict[int, Optional[object]] = {}
+        self._instrument_by_field: dict[str, str] = {}
+        # id(regra condition) -> (if_field, if_operator, if_value, then_field, then_operator, then_value);
+        # campos None = usar o campo atual da iteração
+        self._parsed_conditions: dict[int, tuple] = {}
+        # (id(registro), campo) -> número/data já convertidos nesta execução de analyze()
+        self._num_cache: dict[tuple[int, str], Optional[float]] = {}
+        self._date_cache: dict[tuple[int, str], Optional[datetime]] = {}
+        self._str_cache: dict[tuple[int, str], str] = {}
+        
+        # rule_type -> verificador com assinatura uniforme:
+        # (record_id, event, record, rule, target_field, field_value, uniqueness_maps) -> viola?
+        self._dispatch = {
+            "range": lambda rid, evt, rec, rule, field, value, umaps: self._check_range(rec, rule, field),
+            "comparison": lambda rid, evt, rec, rule, field, value, umaps: self._check_comparison(rec, rule, field),
+            "cross_field": lambda rid, evt, rec, rule, field, value, umaps: self._check_cross_field(rec, rule, field),
+            "cross_event": lambda rid, evt, rec, rule, field, value, umaps: self._check_cross_event(rid, evt, rec, rule, field),
+            "regex": lambda rid, evt, rec, rule, field, value, umaps: self._check_regex(value, rule),
+            "condition": lambda rid, evt, rec, rule, field, value, umaps: self._check_condition(rec, rule, field),
+            "uniqueness": lambda rid, evt, rec, rule, field, value, umaps: self._check_uniqueness(rec, rule, field, umaps),
+        }
     
     def analyze(self) -> list[Query]:
         """
@@ -45,23 +116,62 @@ class CustomRulesAnalyzer(BaseAnalyzer):
         rules = rules_manager.get_enabled_rules(self.user_id, self.access_token)
         
         if not rules:
-            print(f"DEBUG: No enabled rules found for user_id={self.user_id} (token={'present' if self.access_token else 'MISSING'}).")
+            logger.debug(
+                "No enabled rules found for user_id=%s (token=%s).",
+                self.user_id, "present" if self.access_token else "MISSING",
+            )
             return self.queries
             
-        print(f"DEBUG: Analying {len(rules)} custom rules.")
+        logger.debug("Analyzing %d custom rules.", len(rules))
         
-        # Otimização para Unicidade: Pré-calcula contagem de valores para regras de 'uniqueness'
-        uniqueness_maps = {}
+        # Campo -> nome do instrumento (invariante entre registros)
+        self._instrument_by_field = {
+            m.field_name: m.form_name for m in (self.project_data.metadata or [])
+        }
+        
+        # Compila os padrões das regras regex uma única vez para toda a análise
+        self._compiled_regex = {}
         for rule in rules:
-            if rule.rule_type == "uniqueness":
-                field_values = [
-                    str(r.get(rule.field)).strip() 
-                    for r in self.project_data.records 
-                    if not self.is_empty(r.get(rule.field))
-                ]
-                count = Counter(field_values)
-                uniqueness_maps[rule.field] = count
-                print(f"DEBUG: Uniqueness map for '{rule.field}': found {len(field_values)} values, {len(count)} unique. Duplicates: {[k for k,v in count.items() if v > 1]}")
+            if rule.rule_type == "regex":
+                try:
+                    self._compiled_regex[id(rule)] = _compile_rule_pattern(rule.value)
+                except (re.error, TypeError):
+                    logger.debug("Invalid regex in rule '%s': %r (ignored)", rule.field, rule.value)
+                    self._compiled_regex[id(rule)] = None
+        
+        # Resolve os campos/operadores das regras condicionais uma única vez
+        self._parsed_conditions = {
+            id(rule): self._parse_condition(rule)
+            for rule in rules
+            if rule.rule_type == "condition" and isinstance(rule.value, dict)
+        }
+        
+        # Otimização para Unicidade: Pré-calcula contagem de valores para regras de 'uniqueness'
+        # (uma única passada pelos registros para todos os campos, mesmo com várias regras)
+        uniq_fields = list(dict.fromkeys(rule.field for rule in rules if rule.rule_type == "uniqueness"))
+        uniqueness_maps = {field: Counter() for field in uniq_fields}
+        if uniq_fields:
+            counters = tuple(uniqueness_maps.items())
+            for r in self.project_data.records:
+                for field, counter in counters:
+                    value = r.get(field)
+                    # Equivale a is_empty() inline: None ou só espaços não contam
+                    if value is not None:
+                        str_val = value.strip() if type(value) is str else str(value).strip()
+                        if str_val:
+                            counter[str_val] += 1
+            # A lista de duplicados é O(valores distintos): só monta com DEBUG ativo
+            if logger.isEnabledFor(logging.DEBUG):
+                for field, count in uniqueness_maps.items():
+                    logger.debug(
+                        "Uniqueness map for '%s': found %d values, %d unique. Duplicates: %s",
+                        field, count.total(), len(count), [k for k, v in count.items() if v > 1],
+                    )
+            # Só valores duplicados violam: mantém apenas eles (com a contagem, para a mensagem)
+            uniqueness_maps = {
+                field: {k: v for k, v in count.items() if v > 1}
+                for field, count in uniqueness_maps.items()
+            }
 
         record_id_field = self.get_record_id_field()
         event_field = self.get_event_field()
@@ -74,32 +184,140 @@ class CustomRulesAnalyzer(BaseAnalyzer):
             key = (rid, evt)
             self.records_index[key] = rec
         
-        for record in self.project_data.records:
-            record_id = record.get(record_id_field, "UNKNOWN")
-            event = record.get(event_field, "")
-            
-            for rule in rules:
-                if rule.field == '_ALL_':
-                    # Apply to ALL fields in record
-                    # We must iterate over METADATA to catch empty fields that might not be in the record dict
-                    if self.project_data.metadata:
-                        fields_to_check = [m.field_name for m in self.project_data.metadata]
-                    else:
-                        # Fallback if metadata is not available (should rarely happen)
-                        fields_to_check = list(record.keys())
-
-                    for field_name in fields_to_check:
-                        # Skip system fields
-                        if field_name in ['redcap_event_name', 'redcap_repeat_instrument', 'redcap_repeat_instance']:
+        # Campos para regras '_ALL_': iteramos o METADATA para pegar também campos
+        # vazios que podem não estar no dict do registro (já sem campos de sistema)
+        all_fields = None
+        if self.project_data.metadata:
+            all_fields = tuple(
+                m.field_name for m in self.project_data.metadata
+                if m.field_name not in _SYSTEM_FIELDS
+            )
+        
+        # Regras '_ALL_' cujo resultado não depende do campo iterado: aplicadas uma vez por registro
+        fixed_fields = {
+            id(rule): self._fixed_target_field(rule)
+            for rule in rules if rule.field == '_ALL_'
+        }
+        
+        # Regras presas a um evento (cross_event com event1) só valem para registros
+        # desse evento: lista de regras aplicáveis montada uma vez por evento,
+        # na ordem original das regras
+        bound_events = {id(rule): self._bound_event(rule) for rule in rules}
+        rules_by_event = {}
+        
+        # Cada (registro, campo) é convertido/normalizado no máximo uma vez por
+        # execução, mesmo quando várias regras usam o mesmo campo
+        self._num_cache = {}
+        self._date_cache = {}
+        self._str_cache = {}
+        try:
+            for record in self.project_data.records:
+                record_id = record.get(record_id_field, "UNKNOWN")
+                event = record.get(event_field, "")
+                
+                applicable = rules_by_event.get(event)
+                if applicable is None:
+                    applicable = rules_by_event[event] = tuple(
+                        rule for rule in rules
+                        if bound_events[id(rule)] in (None, event)
+                    )
+                
+                for rule in applicable:
+                    if rule.field == '_ALL_':
+                        fixed_field = fixed_fields[id(rule)]
+                        if fixed_field is not None:
+                            self._apply_rule(record_id, event, record, rule, uniqueness_maps, field_override=fixed_field)
                             continue
-                            
-                        # Apply rule
-                        self._apply_rule(record_id, event, record, rule, uniqueness_maps, field_override=field_name)
-                else:
-                    self._apply_rule(record_id, event, record, rule, uniqueness_maps)
+                        
+                        # Apply to ALL fields in record
+                        if all_fields is not None:
+                            fields_to_check = all_fields
+                        else:
+                            # Fallback if metadata is not available (should rarely happen)
+                            fields_to_check = [f for f in record if f not in _SYSTEM_FIELDS]
+
+                        for field_name in fields_to_check:
+                            # Apply rule
+                            self._apply_rule(record_id, event, record, rule, uniqueness_maps, field_override=field_name)
+                    else:
+                        self._apply_rule(record_id, event, record, rule, uniqueness_maps)
+        finally:
+            # As chaves usam id(registro): não podem sobreviver à execução
+            self._num_cache = {}
+            self._date_cache = {}
+            self._str_cache = {}
         
         return self.queries
     
+    @staticmethod
+    def _bound_event(rule) -> Optional[str]:
+        """
+        Evento ao qual a regra se restringe, se houver.
+        
+        _check_cross_event (modo par-a-par) ignora registros de eventos
+        diferentes de event1; as demais regras valem para qualquer evento.
+        
+        Args:
+            rule: Regra a classificar
+            
+        Returns:
+            Nome do evento 1, ou None se a regra se aplica a todos os eventos
+        """
+        if rule.rule_type != "cross_event" or rule.event2 == '_ALL_EVENTS_':
+            return None
+        return rule.event1 or None
+    
+    def _fixed_target_field(self, rule) -> Optional[str]:
+        """
+        Campo efetivamente verificado por uma regra '_ALL_' que não usa o campo iterado.
+        
+        Só regras 'condition' com if_field explícito e then_field explícito (ou field2)
+        se encaixam: repetir a verificação para cada campo geraria a mesma violação
+        F vezes. Nesses casos a query é reportada no campo do THEN.
+        
+        Args:
+            rule: Regra com field == '_ALL_'
+            
+        Returns:
+            Nome do campo do THEN, ou None se a regra depende do campo iterado
+        """
+        parsed = self._parsed_conditions.get(id(rule))
+        if parsed is None or parsed[0] is None:
+            return None
+        return parsed[3]
+    
+    def _num(self, record: dict, field_name: str) -> Optional[float]:
+        """parse_number(record[field_name]) memoizado por (registro, campo)."""
+        key = (id(record), field_name)
+        value = self._num_cache.get(key, _SENTINEL)
+        if value is _SENTINEL:
+            value = self.parse_number(record.get(field_name))
+            self._num_cache[key] = value
+        return value
+    
+    def _date(self, record: dict, field_name: str) -> Optional[datetime]:
+        """parse_date(record[field_name]) memoizado por (registro, campo)."""
+        key = (id(record), field_name)
+        value = self._date_cache.get(key, _SENTINEL)
+        if value is _SENTINEL:
+            value = self.parse_date(record.get(field_name))
+            self._date_cache[key] = value
+        return value
+    
+    def _str(self, record: dict, field_name: str) -> str:
+        """str(record[field_name]).strip() ("" se ausente) memoizado por (registro, campo)."""
+        key = (id(record), field_name)
+        value = self._str_cache.get(key)
+        if value is None:
+            raw = record.get(field_name)
+            # Exportações do REDCap trazem quase tudo como str: evita o str() redundante
+            if type(raw) is str:
+                value = raw.strip()
+            else:
+                value = "" if raw is None else str(raw).strip()
+            self._str_cache[key] = value
+        return value
+    
     def _apply_rule(self, record_id: str, event: str, record: dict, rule, uniqueness_maps=None, field_override=None) -> None:
         """Aplica uma regra a um registro."""
         
@@ -115,32 +333,17 @@ class CustomRulesAnalyzer(BaseAnalyzer):
         if self.is_empty(field_value) and not is_empty_check and not is_condition_rule:
             return
         
-        # Obtém metadata do campo para nome do instrumento
-        field_meta = self.get_field_metadata(target_field)
-        instrument = field_meta.form_name if field_meta else "unknown"
-        
-        violation = False
-        
-        if rule.rule_type == "range":
-            violation = self._check_range(field_value, rule)
-        elif rule.rule_type == "comparison":
-            violation = self._check_comparison(field_value, rule)
-        elif rule.rule_type == "cross_field":
-            violation = self._check_cross_field(record, rule, target_field)
-        elif rule.rule_type == "cross_event":
-            violation = self._check_cross_event(record_id, event, record, rule, target_field)
-        elif rule.rule_type == "regex":
-            violation = self._check_regex(field_value, rule)
-        elif rule.rule_type == "condition":
-            violation = self._check_condition(record, rule, target_field)
-        elif rule.rule_type == "uniqueness":
-            violation = self._check_uniqueness(field_value, rule, uniqueness_maps)
+        checker = self._dispatch.get(rule.rule_type)
+        if checker is None:
+            return  # Tipo de regra desconhecido
+        
+        violation = checker(record_id, event, record, rule, target_field, field_value, uniqueness_maps)
         
         if violation:
             self.add_query(
                 record_id=record_id,
                 event=event,
-                instrument=instrument,
+                instrument=self._instrument_by_field.get(target_field, "unknown"),
                 field=target_field,
                 value_found=field_value,
                 issue_type="custom_rule_violation",
@@ -149,9 +352,9 @@ class CustomRulesAnalyzer(BaseAnalyzer):
                 suggested_action=f"Verificar campo conforme regra customizada: {rule.name}",
             )
     
-    def _check_range(self, value, rule) -> bool:
+    def _check_range(self, record: dict, rule, target_field: str) -> bool:
         """Verifica se valor está fora do range."""
-        num_value = self.parse_number(value)
+        num_value = self._num(record, target_field)
         if num_value is None:
             return False
         
@@ -171,13 +374,14 @@ class CustomRulesAnalyzer(BaseAnalyzer):
         
         return False
     
-    def _check_comparison(self, value, rule) -> bool:
+    def _check_comparison(self, record: dict, rule, target_field: str) -> bool:
         """Verifica comparação simples."""
         operator = rule.operator
         compare_value = rule.value
+        value = record.get(target_field)
         
         # Tenta converter para número se possível
-        num_value = self.parse_number(value)
+        num_value = self._num(record, target_field)
         num_compare = self.parse_number(compare_value) if compare_value is not None else None
         
         # Se ambos são números, compara numericamente
@@ -185,7 +389,7 @@ class CustomRulesAnalyzer(BaseAnalyzer):
             return self._compare_values(num_value, operator, num_compare)
         
         # Comparação como string
-        str_value = str(value).strip() if value is not None else ""
+        str_value = self._str(record, target_field)
         str_compare = str(compare_value).strip() if compare_value is not None else ""
         
         if operator == "=":
@@ -202,8 +406,7 @@ class CustomRulesAnalyzer(BaseAnalyzer):
         # Normaliza o valor de comparação para checar se é um token de data
         normalized_compare = str_compare.upper().strip()
         if normalized_compare in ["_TODAY_", "TODAY", "HOJE", "_HOJE_"]:
-            from datetime import datetime
-            date_value = self.parse_date(value)
+            date_value = self._date(record, target_field)
             if date_value:
                 now = datetime.now()
                 # Zera horas para comparação de data pura
@@ -215,19 +418,8 @@ class CustomRulesAnalyzer(BaseAnalyzer):
     
     def _compare_values(self, value, operator: str, compare_value) -> bool:
         """Compara valores numéricos. Retorna True se VIOLA a regra."""
-        if operator == "=":
-            return value != compare_value
-        elif operator == "!=":
-            return value == compare_value
-        elif operator == "<":
-            return not (value < compare_value)  # Viola se NÃO for menor
-        elif operator == ">":
-            return not (value > compare_value)
-        elif operator == "<=":
-            return not (value <= compare_value)
-        elif operator == ">=":
-            return not (value >= compare_value)
-        return False
+        violates = _VIOLATES.get(operator)
+        return violates(value, compare_value) if violates else False
     
     def _check_cross_field(self, record: dict, rule, target_field: str = None) -> bool:
         """Verifica comparação entre dois campos."""
@@ -243,15 +435,15 @@ class CustomRulesAnalyzer(BaseAnalyzer):
             return False
         
         # Tenta como datas primeiro
-        date1 = self.parse_date(value1)
-        date2 = self.parse_date(value2)
+        date1 = self._date(record, actual_field)
+        date2 = self._date(record, rule.field2)
         
         if date1 and date2:
             return self._compare_values_cross(date1, rule.operator, date2)
         
         # Tenta como números
-        num1 = self.parse_number(value1)
-        num2 = self.parse_number(value2)
+        num1 = self._num(record, actual_field)
+        num2 = self._num(record, rule.field2)
         
         if num1 is not None and num2 is not None:
             return self._compare_values_cross(num1, rule.operator, num2)
@@ -263,19 +455,8 @@ class CustomRulesAnalyzer(BaseAnalyzer):
         """Compara dois valores. Retorna True se VIOLA a expectativa."""
         # Aqui a lógica é: a regra define o que DEVERIA ser verdade
         # Se não for, é uma violação
-        if operator == ">":
-            return not (value1 > value2)
-        elif operator == "<":
-            return not (value1 < value2)
-        elif operator == ">=":
-            return not (value1 >= value2)
-        elif operator == "<=":
-            return not (value1 <= value2)
-        elif operator == "=":
-            return value1 != value2
-        elif operator == "!=":
-            return value1 == value2
-        return False
+        violates = _VIOLATES.get(operator)
+        return violates(value1, value2) if violates else False
     
     def _check_cross_event(self, record_id: str, current_event: str, record: dict, rule, target_field: str = None) -> bool:
         """
@@ -378,15 +559,15 @@ class CustomRulesAnalyzer(BaseAnalyzer):
             return False
         
         # Tenta comparar como datas primeiro
-        date1 = self.parse_date(value1)
-        date2 = self.parse_date(value2)
+        date1 = self._date(record, actual_field)
+        date2 = self._date(record2, rule.field2)
         
         if date1 and date2:
             return self._compare_values_cross(date1, rule.operator, date2)
         
         # Tenta como números
-        num1 = self.parse_number(value1)
-        num2 = self.parse_number(value2)
+        num1 = self._num(record, actual_field)
+        num2 = self._num(record2, rule.field2)
         
         if num1 is not None and num2 is not None:
             return self._compare_values_cross(num1, rule.operator, num2)
@@ -399,94 +580,110 @@ class CustomRulesAnalyzer(BaseAnalyzer):
         if self.is_empty(value):
             return False
         
-        try:
-            pattern = rule.value
-            match = re.match(pattern, str(value))
-            
-            if rule.operator == "matches":
-                return match is None  # Viola se NÃO corresponde
-            elif rule.operator == "not_matches":
-                return match is not None  # Viola se corresponde
-        except re.error:
+        pattern = self._compiled_regex.get(id(rule))
+        if pattern is None:
             return False
         
+        match = pattern.match(str(value))
+        
+        if rule.operator == "matches":
+            return match is None  # Viola se NÃO corresponde
+        elif rule.operator == "not_matches":
+            return match is not None  # Viola se corresponde
+        
         return False
     
     def _check_condition(self, record: dict, rule, target_field: str = None) -> bool:
         """
         Verifica regra condicional (SE-ENTÃO).
         """
-        if not isinstance(rule.value, dict):
-            return False
+        parsed = self._parsed_conditions.get(id(rule))
+        if parsed is None:
+            return False  # rule.value não é dict
         
-        condition = rule.value
+        if_field, if_operator, if_value, then_field, then_operator, then_value = parsed
         actual_field = target_field if target_field else rule.field
         
-        # Verifica a condição IF
-        # Se if_field não estiver definido ou for igual ao field original da regra (_ALL_ ou outro),
-        # usamos o actual_field (campo atual da iteração)
-        if_field_config = condition.get("if_field")
-        if_field = if_field_config if if_field_config and if_field_config != rule.field else actual_field
-        
-        if_operator = condition.get("if_operator", "=")
-        if_value = condition.get("if_value")
-        
-        field_value = record.get(if_field)
-        
         # Se a condição IF não é satisfeita, não há violação
-        if not self._condition_matches(field_value, if_operator, if_value):
+        if not self._condition_matches(record, if_field or actual_field, if_operator, if_value):
             return False
         
-        # A condição IF foi satisfeita, agora verifica THEN
-        then_field_config = condition.get("then_field")
-        # Mesma lógica para o then_field
-        then_field = then_field_config if then_field_config and then_field_config != rule.field else (rule.field2 or actual_field)
+        # A condição IF foi satisfeita, agora verifica THEN (viola se não é satisfeito)
+        return not self._condition_matches(record, then_field or actual_field, then_operator, then_value)
+    
+    @staticmethod
+    def _parse_condition(rule) -> tuple:
+        """
+        Extrai de rule.value os parâmetros de uma regra condicional.
         
-        then_operator = condition.get("then_operator", "=")
-        then_value = condition.get("then_value")
+        Se if_field não estiver definido ou for igual ao field original da regra
+        (_ALL_ ou outro), fica None: a verificação usa o campo atual da iteração.
+        Mesma lógica para then_field, que antes cai para rule.field2.
         
-        then_field_value = record.get(then_field)
+        Args:
+            rule: Regra 'condition' com value dict
+            
+        Returns:
+            Tupla (if_field, if_operator, if_value, then_field, then_operator, then_value)
+        """
+        condition = rule.value
         
-        # Viola se o THEN não é satisfeito
-        return not self._condition_matches(then_field_value, then_operator, then_value)
+        if_field = condition.get("if_field")
+        if not if_field or if_field == rule.field:
+            if_field = None
+        
+        then_field = condition.get("then_field")
+        if not then_field or then_field == rule.field:
+            then_field = rule.field2 or None
+        
+        return (
+            if_field,
+            condition.get("if_operator", "="),
+            condition.get("if_value"),
+            then_field,
+            condition.get("then_operator", "="),
+            condition.get("then_value"),
+        )
     
-    def _check_uniqueness(self, value, rule, uniqueness_maps) -> bool:
+    def _check_uniqueness(self, record: dict, rule, target_field: str, uniqueness_maps) -> bool:
         """Verifica se o valor é único no projeto."""
-        if not uniqueness_maps or rule.field not in uniqueness_maps:
+        # uniqueness_maps: campo -> {valor duplicado: ocorrências}
+        duplicates = uniqueness_maps.get(rule.field) if uniqueness_maps else None
+        if not duplicates:
             return False
         
-        if self.is_empty(value):
-            return False
-            
-        str_val = str(value).strip()
-        count = uniqueness_maps[rule.field].get(str_val, 0)
+        str_val = self._str(record, target_field)
+        count = duplicates.get(str_val) if str_val else None
         
-        # Se contagem > 1, existe duplicidade
-        if count > 1:
+        # Valor presente entre os duplicados
+        if count:
             # Atualiza mensagem se necessário
             if not rule.message:
-                rule.message = f"Valor duplicado encontrado '{value}' ({count} ocorrências)"
-            print(f"DEBUG: Validating uniqueness for '{str_val}': Count={count} -> VIOLATION")
+                rule.message = f"Valor duplicado encontrado '{record.get(target_field)}' ({count} ocorrências)"
+            logger.debug("Validating uniqueness for '%s': Count=%d -> VIOLATION", str_val, count)
             return True
             
         return False
         
-    def _condition_matches(self, value, operator: str, expected) -> bool:
-        """Verifica se uma condição é satisfeita."""
-        str_value = str(value).strip() if value is not None else ""
-        str_expected = str(expected).strip() if expected is not None else ""
+    def _condition_matches(self, record: dict, field_name: str, operator: str, expected) -> bool:
+        """Verifica se uma condição sobre record[field_name] é satisfeita."""
+        str_value = self._str(record, field_name)
+        str_expected = "" if expected is None else str(expected).strip()
         
         if operator == "=":
             return str_value == str_expected
         elif operator == "!=":
             return str_value != str_expected
-        elif operator == "empty":
-            return self.is_empty(value)
+        
+        # Valores do registro são str ou None: vazio equivale a str_value == ""
+        empty = str_value == ""
+        if operator == "empty":
+            return empty
         elif operator == "not_empty":
-            return not self.is_empty(value)
+            return not empty
         
         # Comparações numéricas
-        num_value = self.parse_number(value)
+        num_value = self._num(record, field_name)
         num_expected = self.parse_number(expected)
         
         if num_value is not None and num_expected is not None:
@@ -4,12 +4,20 @@ REDCap Data Quality Intelligence Agent - Operational Analyzer
 Analisador de inconsistências operacionais (logs e auditoria).
 """
 
+from bisect import bisect_right
 from collections import defaultdict
 from datetime import timedelta
+from operator import itemgetter
+
+import numpy as np
+import pandas as pd
 
 from .base_analyzer import BaseAnalyzer
 from ..models import Query
 
+# Entradas do índice por campo são tuplas (registro, usuário, timestamp), sem um dict por log
+_field_edit_record = itemgetter(0)
+
 
 class OperationalAnalyzer(BaseAnalyzer):
     """
@@ -47,6 +55,7 @@ class OperationalAnalyzer(BaseAnalyzer):
         if not self.project_data.logs:
             return self.queries
         
+        self._build_indexes()
         self._check_edit_spikes()
         self._check_high_volume_users()
         self._check_after_hours_edits()
@@ -54,32 +63,83 @@ class OperationalAnalyzer(BaseAnalyzer):
         
         return self.queries
     
-    def _check_edit_spikes(self) -> None:
-        """Detecta picos de edição por registro."""
-        # Agrupa logs por registro
-        logs_by_record = defaultdict(list)
+    def _build_indexes(self) -> None:
+        """
+        Percorre os logs uma única vez e monta as estruturas usadas pelas verificações.
+        
+        parsed_timestamp faz strptime a cada acesso, então é lido uma vez por log.
+        """
+        self._timed_logs_by_record = defaultdict(list)
+        self._edits_by_user = defaultdict(int)
+        self._unusual_edits = None
+        self._field_edits = defaultdict(list)
+        timed_logs = []
         
         for log in self.project_data.logs:
-            if log.record:
-                logs_by_record[log.record].append(log)
-        
-        for record_id, logs in logs_by_record.items():
-            # Ordena por timestamp
-            sorted_logs = sorted(
-                [log_entry for log_entry in logs if log_entry.parsed_timestamp],
-                key=lambda x: x.parsed_timestamp
-            )
+            record = log.record
+            username = log.username
+            ts = log.parsed_timestamp
+            
+            # Volume por usuário
+            self._edits_by_user[username] += 1
             
-            if len(sorted_logs) < self.edit_threshold:
+            if ts and record:
+                self._timed_logs_by_record[record].append((ts, log))
+                timed_logs.append((ts, log))
+            
+            # Tenta extrair nome do campo do detalhe
+            # Formato típico: "campo = valor"
+            details = log.details
+            if details and "=" in details:
+                field_name = details.split("=", 1)[0].strip()
+                self._field_edits[field_name].append((record, username, log.timestamp))
+        
+        self._index_unusual_edits(timed_logs)
+    
+    def _index_unusual_edits(self, timed_logs: list) -> None:
+        """
+        Agrupa por registro as edições de madrugada ou fim de semana.
+        
+        Hora e dia da semana são calculados de uma vez em datetime64 e a
+        contagem por registro (edições e usuários distintos) sai de um groupby.
+        Resultado em self._unusual_edits: DataFrame indexado por registro com
+        as colunas n (edições) e users (usuários, em ordem de aparição).
+        
+        Args:
+            timed_logs: Pares (timestamp convertido, log) de logs com registro
+        """
+        if not timed_logs:
+            return
+        
+        ts = np.array([parsed for parsed, _ in timed_logs], dtype="datetime64[m]")
+        hours = ts.astype("datetime64[h]").astype(np.int64) % 24
+        # 1970-01-01 foi quinta-feira (weekday 3); segunda = 0 como em datetime.weekday()
+        weekdays = (ts.astype("datetime64[D]").astype(np.int64) + 3) % 7
+        is_weekend = weekdays >= 5
+        mask = is_weekend | (hours < 6) | (hours > 22)
+        
+        flagged = [timed_logs[i][1] for i in np.flatnonzero(mask).tolist()]
+        if not flagged:
+            return
+        
+        frame = pd.DataFrame({
+            "record": [log.record for log in flagged],
+            "user": [log.username for log in flagged],
+        })
+        self._unusual_edits = frame.groupby("record", sort=False)["user"].agg(n="size", users="unique")
+    
+    def _check_edit_spikes(self) -> None:
+        """Detecta picos de edição por registro."""
+        for record_id, timed_logs in self._timed_logs_by_record.items():
+            if len(timed_logs) < self.edit_threshold:
                 continue
             
-            # Detecta janelas com muitas edições
-            for i, log in enumerate(sorted_logs):
-                window_end = log.parsed_timestamp + self.time_window
-                edits_in_window = sum(
-                    1 for log_entry in sorted_logs[i:]
-                    if log_entry.parsed_timestamp <= window_end
-                )
+            timed_logs.sort(key=lambda item: item[0])
+            timestamps = [parsed for parsed, _ in timed_logs]
+            
+            # Detecta janelas com muitas edições (fim da janela por busca binária)
+            for i, (parsed, log) in enumerate(timed_logs):
+                edits_in_window = bisect_right(timestamps, parsed + self.time_window, lo=i) - i
                 
                 if edits_in_window >= self.edit_threshold:
                     self.add_query(
@@ -97,13 +157,7 @@ class OperationalAnalyzer(BaseAnalyzer):
     
     def _check_high_volume_users(self) -> None:
         """Detecta usuários com volume anormal de edições."""
-        edits_by_user = defaultdict(int)
-        records_by_user = defaultdict(set)
-        
-        for log in self.project_data.logs:
-            edits_by_user[log.username] += 1
-            if log.record:
-                records_by_user[log.username].add(log.record)
+        edits_by_user = self._edits_by_user
         
         if not edits_by_user:
             return
@@ -114,81 +168,60 @@ class OperationalAnalyzer(BaseAnalyzer):
         
         # Usuários com mais de 3x a média são suspeitos
         threshold = avg * 3
+        suspect_users = {
+            user: count for user, count in edits_by_user.items()
+            if count > threshold and count > self.edit_threshold * 5
+        }
+        if not suspect_users:
+            return
         
-        for user, count in edits_by_user.items():
-            if count > threshold and count > self.edit_threshold * 5:
-                self.add_query(
-                    record_id="GLOBAL",
-                    event="N/A",
-                    instrument="Audit Log",
-                    field="user_activity",
-                    value_found=f"Usuário: {user}, Edições: {count}",
-                    issue_type="high_edit_volume",
-                    explanation=f"O usuário '{user}' realizou {count} edições (média: {avg:.0f}), afetando {len(records_by_user[user])} registros. Isso representa um volume significativamente acima do normal.",
-                    priority="Baixa",
-                    suggested_action="Verificar se o alto volume é justificado (ex: entrada de dados em lote) ou requer investigação.",
-                )
+        # Registros afetados: só coletados para os (poucos) suspeitos
+        records_by_user = defaultdict(set)
+        for log in self.project_data.logs:
+            if log.record and log.username in suspect_users:
+                records_by_user[log.username].add(log.record)
+        
+        for user, count in suspect_users.items():
+            self.add_query(
+                record_id="GLOBAL",
+                event="N/A",
+                instrument="Audit Log",
+                field="user_activity",
+                value_found=f"Usuário: {user}, Edições: {count}",
+                issue_type="high_edit_volume",
+                explanation=f"O usuário '{user}' realizou {count} edições (média: {avg:.0f}), afetando {len(records_by_user[user])} registros. Isso representa um volume significativamente acima do normal.",
+                priority="Baixa",
+                suggested_action="Verificar se o alto volume é justificado (ex: entrada de dados em lote) ou requer investigação.",
+            )
     
     def _check_after_hours_edits(self) -> None:
         """Detecta edições em horários incomuns."""
-        unusual_edits = defaultdict(list)
+        unusual_edits = self._unusual_edits
+        if unusual_edits is None:
+            return
         
-        for log in self.project_data.logs:
-            ts = log.parsed_timestamp
-            if not ts:
-                continue
-            
-            # Define horário comercial (8h-20h)
-            hour = ts.hour
-            is_weekend = ts.weekday() >= 5
-            is_after_hours = hour < 6 or hour > 22
-            
-            if is_weekend or is_after_hours:
-                if log.record:
-                    unusual_edits[log.record].append({
-                        "timestamp": log.timestamp,
-                        "user": log.username,
-                        "action": log.action,
-                        "is_weekend": is_weekend,
-                        "hour": hour,
-                    })
-        
-        # Reporta registros com múltiplas edições fora de horário
-        for record_id, edits in unusual_edits.items():
-            if len(edits) >= 3:  # Só reporta se houver padrão
-                users = set(e["user"] for e in edits)
-                self.add_query(
-                    record_id=record_id,
-                    event="N/A",
-                    instrument="Audit Log",
-                    field="edit_timing",
-                    value_found=f"{len(edits)} edições fora de horário por {len(users)} usuário(s)",
-                    issue_type="suspicious_edit_pattern",
-                    explanation=f"Detectadas {len(edits)} edições em horários incomuns (madrugada ou fim de semana) por {', '.join(users)}.",
-                    priority="Baixa",
-                    suggested_action="Verificar se as edições são legítimas ou se há padrão de manipulação de dados.",
-                )
+        # Reporta registros com múltiplas edições fora de horário (só se houver padrão)
+        patterns = unusual_edits[unusual_edits["n"] >= 3]
+        for record_id, count, users in patterns.itertuples(name=None):
+            self.add_query(
+                record_id=record_id,
+                event="N/A",
+                instrument="Audit Log",
+                field="edit_timing",
+                value_found=f"{count} edições fora de horário por {len(users)} usuário(s)",
+                issue_type="suspicious_edit_pattern",
+                explanation=f"Detectadas {count} edições em horários incomuns (madrugada ou fim de semana) por {', '.join(users)}.",
+                priority="Baixa",
+                suggested_action="Verificar se as edições são legítimas ou se há padrão de manipulação de dados.",
+            )
     
     def _check_field_specific_patterns(self) -> None:
         """Detecta padrões suspeitos em campos específicos."""
-        # Agrupa edições por campo
-        field_edits = defaultdict(list)
-        
-        for log in self.project_data.logs:
-            if log.details:
-                # Tenta extrair nome do campo do detalhe
-                # Formato típico: "campo = valor"
-                if "=" in log.details:
-                    field_name = log.details.split("=")[0].strip()
-                    field_edits[field_name].append({
-                        "record": log.record,
-                        "user": log.username,
-                        "timestamp": log.timestamp,
-                    })
+        field_edits = self._field_edits
         
         # Detecta campos com muitas correções
         for field_name, edits in field_edits.items():
-            unique_records = set(e["record"] for e in edits if e["record"])
+            unique_records = set(filter(None, map(_field_edit_record, edits)))
             
             if len(edits) > len(unique_records) * 2:  # Média de 2+ edições por registro
                 self.add_query(
@@ -4,10 +4,68 @@ REDCap Data Quality Intelligence Agent - Structural Analyzer
 Analisador de inconsistências estruturais nos dados.
 """
 
+import logging
 import re
+from datetime import datetime
+from typing import Any, Callable, Iterator, Optional
+
+import numpy as np
+import pandas as pd
+
 from .base_analyzer import BaseAnalyzer
 from ..models import Query, FieldMetadata
 
+logger = logging.getLogger(__name__)
+
+# Padrões de formato compilados uma vez (usados para cada registro × campo)
+_EMAIL_RE = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+_PHONE_RE = re.compile(r'^[\d\s\-\(\)\+]+$')
+
+_NUMERIC_TYPES = frozenset({"number", "integer", "number_1dp", "number_2dp"})
+_DATE_TYPES = frozenset({"date_ymd", "date_mdy", "date_dmy"})
+_DATETIME_TYPES = frozenset({"datetime_ymd", "datetime_mdy", "datetime_dmy", "datetime_seconds_ymd"})
+
+# Termos que permitem datas futuras / que elevam a prioridade (heurística pelo nome)
+_FUTURE_TERMS = ('next', 'expected', 'forecast', 'scheduled', 'proxima', 'agendada', 'previsao')
+_CRITICAL_TERMS = ('birth', 'dob', 'nasc', 'enroll', 'inclusao', 'consent', 'death', 'obito', 'admission', 'admissao')
+
+# Posição de cada verificação na ordem de emissão por (registro, campo)
+_REQUIRED, _RANGE, _FORMAT, _CHOICES, _BRANCHING, _FUTURE_DATE = range(6)
+
+
+class _Column:
+    """
+    Coluna de um campo fatorada em valores distintos.
+    
+    As validações rodam uma vez por valor distinto (uniques) e são projetadas
+    de volta nas linhas por codes, preservando a semântica das funções Python
+    (parse_number, parse_date, int(), regex) sem percorrer registro a registro.
+    Ausentes (None) ficam no último índice de uniques, alcançado pelo code -1.
+    O teste de vazio é feito uma vez por valor distinto, na construção.
+    """
+    
+    __slots__ = ("values", "codes", "uniques", "empty", "filled")
+    
+    def __init__(self, values: np.ndarray, is_empty: Callable[[Any], bool]):
+        self.values = values
+        codes, uniques = pd.factorize(values)
+        self.codes = codes
+        self.uniques = [*uniques, None]
+        self.empty = [is_empty(value) for value in self.uniques]
+        self.filled = ~self.rows(self.empty)
+    
+    def apply(self, func: Callable[[Any], Any]) -> list:
+        """Resultado de func para cada valor distinto (indexável por codes)."""
+        return [func(value) for value in self.uniques]
+    
+    def apply_filled(self, func: Callable[[Any], Any], default: Any = False) -> list:
+        """Como apply, mas func só roda nos valores não vazios (vazios recebem default)."""
+        return [default if empty else func(value) for value, empty in zip(self.uniques, self.empty)]
+
+    def rows(self, flags: list) -> np.ndarray:
+        """Máscara por linha a partir de um resultado booleano por valor distinto."""
+        return np.array(flags, dtype=bool)[self.codes]
+
 
 class StructuralAnalyzer(BaseAnalyzer):
     """
@@ -30,14 +88,15 @@ class StructuralAnalyzer(BaseAnalyzer):
     def __init__(self, project_data, enabled_checks: list[str] = None):
         super().__init__(project_data)
         # Default: if None, enable ALL (to be safe), but QueryGenerator will pass specific list
-        self.enabled_checks = enabled_checks if enabled_checks is not None else [
+        # frozenset: is_check_enabled faz busca O(1)
+        self.enabled_checks = frozenset(enabled_checks if enabled_checks is not None else [
             '00000000-0000-0000-0000-000000000002', # sys_required
             '00000000-0000-0000-0000-000000000006', # sys_range
             '00000000-0000-0000-0000-000000000005', # sys_format
             '00000000-0000-0000-0000-000000000007', # sys_choices
             '00000000-0000-0000-0000-000000000001', # sys_branching
             '00000000-0000-0000-0000-000000000008'  # sys_future_date
-        ]
+        ])
         
         # Cache fields by form for quick lookup
         self.fields_by_form = {}
@@ -45,7 +104,7 @@ class StructuralAnalyzer(BaseAnalyzer):
             if field.form_name not in self.fields_by_form:
                 self.fields_by_form[field.form_name] = []
             self.fields_by_form[field.form_name].append(field.field_name)
-
+        
         # Cache forms by event (for longitudinal projects)
         self.forms_by_event = {}
         if self.project_data.form_event_mapping:
@@ -53,146 +112,224 @@ class StructuralAnalyzer(BaseAnalyzer):
                 if fem.unique_event_name not in self.forms_by_event:
                     self.forms_by_event[fem.unique_event_name] = set()
                 self.forms_by_event[fem.unique_event_name].add(fem.form)
+        
+        # Caches por execução de analyze() (colunas, máscaras de formulário e de branching logic)
+        self._columns: dict[str, _Column] = {}
+        self._form_rows: dict[str, np.ndarray] = {}
+        self._form_has_data: dict[str, np.ndarray] = {}
+        self._should_exist: dict[str, np.ndarray] = {}
+        self._event_column: Optional[_Column] = None
+        self._event_forms: list = []
     
     def analyze(self) -> list[Query]:
         """
         Executa análise estrutural completa.
         
+        Cada verificação é avaliada por campo sobre a coluna inteira; as
+        violações são emitidas na mesma ordem da varredura registro × campo.
+        
         Returns:
             Lista de queries identificadas
         """
         self.queries = []
         
+        if not self.project_data.records:
+            return self.queries
+        
         record_id_field = self.get_record_id_field()
         event_field = self.get_event_field()
         
-        for record in self.project_data.records:
-            record_id = record.get(record_id_field, "UNKNOWN")
-            event = record.get(event_field, "")
-            
-            # Filter valid forms for this event (if longitudinal)
-            valid_forms = None
-            if self.project_data.events and event in self.forms_by_event:
-                valid_forms = self.forms_by_event[event]
-            
-            for field_meta in self.project_data.metadata:
-                # SKIP if form not validated for this event
-                if valid_forms is not None and field_meta.form_name not in valid_forms:
-                    continue
-
-                field_name = field_meta.field_name
-                value = record.get(field_name)
-                
+        # Validações baseadas em configuração (Suporta chaves legíveis e UUIDs);
+        # invariantes: resolvidas uma vez, não a cada registro × campo
+        checks = (
+            (_REQUIRED, self.is_check_enabled('sys_required', '00000000-0000-0000-0000-000000000002'), self._check_required_field),
+            (_RANGE, self.is_check_enabled('sys_range', '00000000-0000-0000-0000-000000000006'), self._check_value_range),
+            (_FORMAT, self.is_check_enabled('sys_format', '00000000-0000-0000-0000-000000000005'), self._check_format),
+            (_CHOICES, self.is_check_enabled('sys_choices', '00000000-0000-0000-0000-000000000007'), self._check_choices),
+            (_BRANCHING, self.is_check_enabled('sys_branching', '00000000-0000-0000-0000-000000000001'), self._check_branching_logic_violation),
+            # New check for future dates
+            (_FUTURE_DATE, self.is_check_enabled('sys_future_date', '00000000-0000-0000-0000-000000000008'), self._check_future_date),
+        )
+        checks = [(position, check) for position, enabled, check in checks if enabled]
+        
+        self._columns = {}
+        self._form_rows = {}
+        self._form_has_data = {}
+        self._should_exist = {}
+        try:
+            # Filter valid forms for each event (if longitudinal)
+            self._event_column = self._column(event_field)
+            self._event_forms = self._event_column.apply(
+                lambda event: self.forms_by_event.get(event) if self.project_data.events else None
+            )
+        
+            # (linha, posição do campo, posição da verificação, argumentos da query)
+            pending = []
+            for field_pos, field_meta in enumerate(self.project_data.metadata):
                 # Pula campo de ID
-                if field_name == record_id_field:
+                if field_meta.field_name == record_id_field:
                     continue
-                
-                # Verifica branching logic primeiro
-                should_exist = self.evaluate_branching_logic(
-                    field_meta.branching_logic, record
+        
+                column = self._column(field_meta.field_name)
+                # SKIP rows whose event does not include this form
+                rows = self._rows_for_form(field_meta.form_name)
+        
+                # Células vazias só interessam ao campo obrigatório: as demais
+                # verificações recebem apenas as linhas preenchidas
+                filled = rows & column.filled
+                has_filled = filled.any()
+        
+                for check_pos, check in checks:
+                    if check_pos == _REQUIRED:
+                        check_rows = rows
+                    elif has_filled:
+                        check_rows = filled
+                    else:
+                        continue
+                    for row, query in check(field_meta, column, check_rows):
+                        pending.append((row, field_pos, check_pos, query))
+        
+            pending.sort(key=lambda item: item[:3])
+        
+            record_ids = self._column(record_id_field).values
+            events = self._event_column.values
+            for row, _, _, query in pending:
+                record_id = record_ids[row]
+                event = events[row]
+                self.add_query(
+                    record_id="UNKNOWN" if record_id is None else record_id,
+                    event="" if event is None else event,
+                    **query,
                 )
-                
-                # Validações
-                # Validações baseadas em configuração (Suporta chaves legíveis e UUIDs)
-                if self.is_check_enabled('sys_required', '00000000-0000-0000-0000-000000000002'):
-                    self._check_required_field(
-                        record_id, event, field_meta, value, should_exist, record
-                    )
-                
-                if self.is_check_enabled('sys_range', '00000000-0000-0000-0000-000000000006'):
-                    self._check_value_range(
-                        record_id, event, field_meta, value, should_exist
-                    )
-                
-                if self.is_check_enabled('sys_format', '00000000-0000-0000-0000-000000000005'):
-                    self._check_format(
-                        record_id, event, field_meta, value, should_exist
-                    )
-                
-                if self.is_check_enabled('sys_choices', '00000000-0000-0000-0000-000000000007'):
-                    self._check_choices(
-                        record_id, event, field_meta, value, should_exist
-                    )
-                
-                if self.is_check_enabled('sys_branching', '00000000-0000-0000-0000-000000000001'):
-                    self._check_branching_logic_violation(
-                        record_id, event, field_meta, value, should_exist
-                    )
-                
-                # New check for future dates
-                if self.is_check_enabled('sys_future_date', '00000000-0000-0000-0000-000000000008'): 
-                    self._check_future_date(
-                        record_id, event, field_meta, value, should_exist
-                    )
+        finally:
+            self._columns = {}
+            self._form_rows = {}
+            self._form_has_data = {}
+            self._should_exist = {}
+            self._event_column = None
+            self._event_forms = []
         
         return self.queries
-
+    
     def is_check_enabled(self, key: str, uuid: str) -> bool:
         """Verifica se uma checagem está habilitada (por chave ou UUID)."""
         if not self.enabled_checks:
             return False
-        # Special case: sys_future_date might not be in the list if using old defaults, 
-        # so we force it if enabled_checks is explicitly using the default set 
+        # Special case: sys_future_date might not be in the list if using old defaults,
+        # so we force it if enabled_checks is explicitly using the default set
         # (but here enabled_checks is a list, we can't easily know if it's default).
-        # However, QueryGenerator usually passes specific checks. 
+        # However, QueryGenerator usually passes specific checks.
         # For now, we rely on the init default.
         return key in self.enabled_checks or uuid in self.enabled_checks
     
+    def _column(self, field_name: str) -> _Column:
+        """Coluna fatorada do campo (todos None se nenhum registro tem o campo)."""
+        column = self._columns.get(field_name)
+        if column is None:
+            values = self.project_data.columns.get(field_name)
+            if values is None:
+                values = np.full(len(self.project_data.records), None, dtype=object)
+            column = self._columns[field_name] = _Column(values, self.is_empty)
+        return column
+    
+    def _rows_for_form(self, form_name: str) -> np.ndarray:
+        """Linhas cujo evento inclui o formulário (todas, se não longitudinal)."""
+        rows = self._form_rows.get(form_name)
+        if rows is None:
+            rows = self._form_rows[form_name] = self._event_column.rows([
+                valid_forms is None or form_name in valid_forms
+                for valid_forms in self._event_forms
+            ])
+        return rows
+    
+    def _rows_should_exist(self, field_meta: FieldMetadata) -> Optional[np.ndarray]:
+        """
+        Resultado da branching logic do campo por linha.
+        
+        Avaliada uma vez por lógica distinta (campos com a mesma lógica
+        compartilham a máscara).
+        
+        Returns:
+            Máscara booleana, ou None se o campo não tem branching logic (sempre visível)
+        """
+        logic = field_meta.branching_logic
+        if not logic or not logic.strip():
+            return None
+        
+        mask = self._should_exist.get(logic)
+        if mask is None:
+            records = self.project_data.records
+            mask = self._should_exist[logic] = np.fromiter(
+                (self.evaluate_branching_logic(logic, record) for record in records),
+                dtype=bool,
+                count=len(records),
+            )
+        return mask
+    
+    def _visible_rows(self, field_meta: FieldMetadata, rows: np.ndarray) -> np.ndarray:
+        """rows restritas às linhas em que o campo deveria existir."""
+        should_exist = self._rows_should_exist(field_meta)
+        return rows if should_exist is None else rows & should_exist
+    
+    def _rows_with_form_data(self, form_name: str, completion_field: str) -> np.ndarray:
+        """Linhas com algum campo do formulário preenchido (exceto o campo de status)."""
+        has_data = self._form_has_data.get(form_name)
+        if has_data is None:
+            has_data = np.zeros(len(self.project_data.records), dtype=bool)
+            for fname in self.fields_by_form.get(form_name, []):
+                # Ignore the completion field itself if it happens to be in metadata
+                if fname == completion_field:
+                    continue
+                # Helper to check if value is truly present
+                column = self._column(fname)
+                has_data |= column.rows(column.apply(lambda val: val is not None and str(val).strip() != ""))
+            self._form_has_data[form_name] = has_data
+        return has_data
+    
     def _check_required_field(
         self,
-        record_id: str,
-        event: str,
         field_meta: FieldMetadata,
-        value: any,
-        should_exist: bool,
-        record: dict,
-    ) -> None:
+        column: _Column,
+        rows: np.ndarray,
+    ) -> Iterator[tuple[int, dict]]:
         """Verifica campos obrigatórios vazios."""
         if not field_meta.is_required:
             return
         
-        if not should_exist:
-            return  # Campo não deveria aparecer por branching logic
-            
+        mask = rows & ~column.filled
+        if not mask.any():
+            return
+        
+        # Campo não deveria aparecer por branching logic
+        mask = self._visible_rows(field_meta, mask)
+        
         # Check if form is started
         # REDCap stores form status in [form_name]_complete
         # 0=Incomplete, 1=Unverified, 2=Complete. Missing/Empty = Not started
         completion_field = f"{field_meta.form_name}_complete"
-        form_status = record.get(completion_field)
+        status = self._column(completion_field)
         
         # If status is None or empty string, form was never touched in this event
-        if form_status is None or str(form_status).strip() == "":
-            return
-            
+        not_started = status.apply(lambda value: value is None or str(value).strip() == "")
+        mask &= ~status.rows(not_started)
+        
         # Special check for status '0' (Incomplete)
         # Sometimes REDCap returns '0' for forms that were never actually started but existed for the event.
         # We verify if there is ANY data in the form for this record/event.
-        if str(form_status) == "0":
-             has_data = False
-             form_fields = self.fields_by_form.get(field_meta.form_name, [])
-             completion_field_name = completion_field # e.g. "demographics_complete"
-             
-             for fname in form_fields:
-                 # Check if any field in this form has a value in this record
-                 val = record.get(fname)
-                 
-                 # Helper to check if value is truly present
-                 if val is not None and str(val).strip() != "":
-                     # Ignore the completion field itself if it happens to be in metadata (usually it's not, but safe check)
-                     if fname == completion_field_name:
-                         continue
-                     has_data = True
-                     break
-             
-             if not has_data:
-                 return # Skip checks if form is incomplete and completely empty
-
-        if self.is_empty(value):
-            # DEBUG LOG to diagnose false positives
-            # print(f"DEBUG_EMPTY_CHECK: Flagged '{field_meta.field_name}' for Record {record_id} in {event}. Raw Value='{value}' Type={type(value)}", flush=True)
-            self.add_query(
-                record_id=record_id,
-                event=event,
+        incomplete = status.rows(status.apply(lambda value: value is not None and str(value) == "0"))
+        if (mask & incomplete).any():
+            # Skip checks if form is incomplete and completely empty
+            mask &= ~incomplete | self._rows_with_form_data(field_meta.form_name, completion_field)
+        
+        record_ids = self._column(self.get_record_id_field()).values
+        for row in np.flatnonzero(mask).tolist():
+            value = column.values[row]
+            # DEBUG LOG to diagnose false positives (formatado só com DEBUG ativo)
+            logger.debug(
+                "EMPTY_CHECK: Flagged '%s' for Record %s. Raw Value=%r Type=%s",
+                field_meta.field_name, record_ids[row], value, type(value).__name__,
+            )
+            yield row, dict(
                 instrument=field_meta.form_name,
                 field=field_meta.field_name,
                 value_found=value,
@@ -204,27 +341,15 @@ class StructuralAnalyzer(BaseAnalyzer):
     
     def _check_value_range(
         self,
-        record_id: str,
-        event: str,
         field_meta: FieldMetadata,
-        value: any,
-        should_exist: bool,
-    ) -> None:
+        column: _Column,
+        rows: np.ndarray,
+    ) -> Iterator[tuple[int, dict]]:
         """Verifica valores fora do range definido."""
-        if self.is_empty(value):
-            return
-        
-        if not should_exist:
-            return
-        
         # Só aplica para campos numéricos
-        if field_meta.validation_type not in ["number", "integer", "number_1dp", "number_2dp"]:
+        if field_meta.validation_type not in _NUMERIC_TYPES:
             return
         
-        num_value = self.parse_number(value)
-        if num_value is None:
-            return  # Será tratado por _check_format
-        
         min_val = None
         max_val = None
         
@@ -233,93 +358,92 @@ class StructuralAnalyzer(BaseAnalyzer):
         if field_meta.text_validation_max:
             max_val = self.parse_number(field_meta.text_validation_max)
         
-        violation = None
+        if min_val is None and max_val is None:
+            return
         
-        if min_val is not None and num_value < min_val:
-            violation = f"menor que o mínimo permitido ({min_val})"
-        elif max_val is not None and num_value > max_val:
-            violation = f"maior que o máximo permitido ({max_val})"
+        def violation_of(value: Any) -> Optional[str]:
+            num_value = self.parse_number(value)
+            if num_value is None:
+                return None  # Será tratado por _check_format
+            if min_val is not None and num_value < min_val:
+                return f"menor que o mínimo permitido ({min_val})"
+            if max_val is not None and num_value > max_val:
+                return f"maior que o máximo permitido ({max_val})"
+            return None
+        
+        violations = column.apply_filled(violation_of, None)
+        mask = rows & column.rows([violation is not None for violation in violations])
+        if not mask.any():
+            return
+        mask = self._visible_rows(field_meta, mask)
         
-        if violation:
-            self.add_query(
-                record_id=record_id,
-                event=event,
+        priority = self.determine_priority("value_out_of_range", field_meta.field_name)
+        for row in np.flatnonzero(mask).tolist():
+            value = column.values[row]
+            yield row, dict(
                 instrument=field_meta.form_name,
                 field=field_meta.field_name,
                 value_found=value,
                 issue_type="value_out_of_range",
-                explanation=f"O valor '{value}' no campo '{field_meta.field_label}' é {violation}.",
-                priority=self.determine_priority("value_out_of_range", field_meta.field_name),
+                explanation=f"O valor '{value}' no campo '{field_meta.field_label}' é {violations[column.codes[row]]}.",
+                priority=priority,
                 suggested_action=f"Verificar e corrigir o valor. Range permitido: {min_val or 'N/A'} a {max_val or 'N/A'}.",
             )
     
     def _check_format(
         self,
-        record_id: str,
-        event: str,
         field_meta: FieldMetadata,
-        value: any,
-        should_exist: bool,
-    ) -> None:
+        column: _Column,
+        rows: np.ndarray,
+    ) -> Iterator[tuple[int, dict]]:
         """Verifica formato dos dados."""
-        if self.is_empty(value):
-            return
-        
-        if not should_exist:
-            return
-        
         validation_type = field_meta.validation_type
         
         if not validation_type:
             return
         
-        is_valid = True
-        expected_format = ""
-        
         # Validação de data
-        if validation_type in ["date_ymd", "date_mdy", "date_dmy"]:
-            if self.parse_date(value) is None:
-                is_valid = False
-                expected_format = "data válida (ex: 2024-01-15)"
+        if validation_type in _DATE_TYPES:
+            expected_format = "data válida (ex: 2024-01-15)"
+            is_valid = lambda value: self.parse_date(value) is not None
         
         # Validação de datetime
-        elif validation_type in ["datetime_ymd", "datetime_mdy", "datetime_dmy", "datetime_seconds_ymd"]:
-            if self.parse_date(value) is None:
-                is_valid = False
-                expected_format = "data/hora válida (ex: 2024-01-15 14:30)"
+        elif validation_type in _DATETIME_TYPES:
+            expected_format = "data/hora válida (ex: 2024-01-15 14:30)"
+            is_valid = lambda value: self.parse_date(value) is not None
         
         # Validação de integer
         elif validation_type == "integer":
-            try:
-                int(str(value).strip())
-            except ValueError:
-                is_valid = False
-                expected_format = "número inteiro"
+            expected_format = "número inteiro"
+            is_valid = self._is_integer
         
         # Validação de number
-        elif validation_type in ["number", "number_1dp", "number_2dp"]:
-            if self.parse_number(value) is None:
-                is_valid = False
-                expected_format = "número decimal"
+        elif validation_type in ("number", "number_1dp", "number_2dp"):
+            expected_format = "número decimal"
+            is_valid = lambda value: self.parse_number(value) is not None
         
         # Validação de email
         elif validation_type == "email":
-            email_pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-            if not re.match(email_pattern, str(value).strip()):
-                is_valid = False
-                expected_format = "email válido"
+            expected_format = "email válido"
+            is_valid = lambda value: _EMAIL_RE.match(str(value).strip()) is not None
         
         # Validação de telefone
         elif validation_type == "phone":
-            phone_pattern = r'^[\d\s\-\(\)\+]+$'
-            if not re.match(phone_pattern, str(value).strip()):
-                is_valid = False
-                expected_format = "telefone válido"
-        
-        if not is_valid:
-            self.add_query(
-                record_id=record_id,
-                event=event,
+            expected_format = "telefone válido"
+            is_valid = lambda value: _PHONE_RE.match(str(value).strip()) is not None
+        
+        else:
+            return
+        
+        invalid = column.apply_filled(lambda value: not is_valid(value))
+        mask = rows & column.rows(invalid)
+        if not mask.any():
+            return
+        mask = self._visible_rows(field_meta, mask)
+        
+        for row in np.flatnonzero(mask).tolist():
+            value = column.values[row]
+            yield row, dict(
                 instrument=field_meta.form_name,
                 field=field_meta.field_name,
                 value_found=value,
@@ -328,51 +452,60 @@ class StructuralAnalyzer(BaseAnalyzer):
                 priority="Média",
                 suggested_action=f"Corrigir o valor para o formato: {expected_format}.",
             )
-            
+    
+    @staticmethod
+    def _is_integer(value: Any) -> bool:
+        """Verifica se o valor é um inteiro válido."""
+        try:
+            int(str(value).strip())
+            return True
+        except ValueError:
+            return False
+    
     def _check_future_date(
         self,
-        record_id: str,
-        event: str,
         field_meta: FieldMetadata,
-        value: any,
-        should_exist: bool,
-    ) -> None:
+        column: _Column,
+        rows: np.ndarray,
+    ) -> Iterator[tuple[int, dict]]:
         """Verifica se datas estão no futuro."""
-        if self.is_empty(value) or not should_exist:
-            return
-            
         validation_type = field_meta.validation_type
         if not validation_type or "date" not in validation_type:
             return
-
-        date_val = self.parse_date(value)
-        if date_val is None:
-            return # _check_format will catch this
-            
-        from datetime import datetime
-        now = datetime.now()
         
+        # Check if this field allows future dates (heuristic based on name)
+        field_lower = self.field_name_lower(field_meta.field_name)
+        label_lower = field_meta.field_label.lower()
+        if any(term in field_lower or term in label_lower for term in _FUTURE_TERMS):
+            return
+        
+        now = datetime.now()
         # Ignore time component for pure dates unless it's datetime
-        if "datetime" not in validation_type:
-            date_val = date_val.replace(hour=0, minute=0, second=0, microsecond=0)
+        pure_date = "datetime" not in validation_type
+        if pure_date:
             now = now.replace(hour=0, minute=0, second=0, microsecond=0)
-            
-        if date_val > now:
-            # Check if this field allows future dates (heuristic based on name)
-            # Allowed terms
-            future_terms = ['next', 'expected', 'forecast', 'scheduled', 'proxima', 'agendada', 'previsao']
-            if any(term in field_meta.field_name.lower() or term in field_meta.field_label.lower() for term in future_terms):
-                return
-                
-            priority = "Média"
-            # High priority for critical fields like Birth Date or Enrollment
-            critical_terms = ['birth', 'dob', 'nasc', 'enroll', 'inclusao', 'consent', 'death', 'obito', 'admission', 'admissao']
-            if any(term in field_meta.field_name.lower() for term in critical_terms):
-                priority = "Alta"
-                
-            self.add_query(
-                record_id=record_id,
-                event=event,
+        
+        def is_future(value: Any) -> bool:
+            date_val = self.parse_date(value)
+            if date_val is None:
+                return False  # _check_format will catch this
+            if pure_date:
+                date_val = date_val.replace(hour=0, minute=0, second=0, microsecond=0)
+            return date_val > now
+        
+        mask = rows & column.rows(column.apply_filled(is_future))
+        if not mask.any():
+            return
+        mask = self._visible_rows(field_meta, mask)
+        
+        priority = "Média"
+        # High priority for critical fields like Birth Date or Enrollment
+        if any(term in field_lower for term in _CRITICAL_TERMS):
+            priority = "Alta"
+        
+        for row in np.flatnonzero(mask).tolist():
+            value = column.values[row]
+            yield row, dict(
                 instrument=field_meta.form_name,
                 field=field_meta.field_name,
                 value_found=value,
@@ -381,39 +514,34 @@ class StructuralAnalyzer(BaseAnalyzer):
                 priority=priority,
                 suggested_action="Verificar se a data foi digitada corretamente (ano incorreto?).",
             )
-
+    
     def _check_choices(
         self,
-        record_id: str,
-        event: str,
         field_meta: FieldMetadata,
-        value: any,
-        should_exist: bool,
-    ) -> None:
+        column: _Column,
+        rows: np.ndarray,
+    ) -> Iterator[tuple[int, dict]]:
         """Verifica se o valor está na lista de opções válidas."""
-        if self.is_empty(value):
-            return
-        
-        if not should_exist:
-            return
-        
-        if field_meta.field_type not in ["dropdown", "radio"]:
+        if field_meta.field_type not in ("dropdown", "radio"):
             return
         
         choices = field_meta.choices
         if not choices:
             return
         
-        str_value = str(value).strip()
+        invalid = column.apply_filled(lambda value: str(value).strip() not in choices)
+        mask = rows & column.rows(invalid)
+        if not mask.any():
+            return
+        mask = self._visible_rows(field_meta, mask)
+        
+        valid_options = ", ".join([f"{k}={v}" for k, v in list(choices.items())[:5]])
+        if len(choices) > 5:
+            valid_options += f"... (+{len(choices)-5} opções)"
         
-        if str_value not in choices:
-            valid_options = ", ".join([f"{k}={v}" for k, v in list(choices.items())[:5]])
-            if len(choices) > 5:
-                valid_options += f"... (+{len(choices)-5} opções)"
-            
-            self.add_query(
-                record_id=record_id,
-                event=event,
+        for row in np.flatnonzero(mask).tolist():
+            value = column.values[row]
+            yield row, dict(
                 instrument=field_meta.form_name,
                 field=field_meta.field_name,
                 value_found=value,
@@ -425,23 +553,24 @@ class StructuralAnalyzer(BaseAnalyzer):
     
     def _check_branching_logic_violation(
         self,
-        record_id: str,
-        event: str,
         field_meta: FieldMetadata,
-        value: any,
-        should_exist: bool,
-    ) -> None:
+        column: _Column,
+        rows: np.ndarray,
+    ) -> Iterator[tuple[int, dict]]:
         """Verifica violações de branching logic."""
         if not field_meta.has_branching_logic:
             return
         
-        has_value = not self.is_empty(value)
+        # Campo preenchido quando não deveria existir (rows já são só as preenchidas)
+        # rows é compartilhado com as verificações seguintes: não alterar no lugar
+        mask = rows
+        should_exist = self._rows_should_exist(field_meta)
+        if should_exist is not None:
+            mask = rows & ~should_exist
         
-        # Campo preenchido quando não deveria existir
-        if has_value and not should_exist:
-            self.add_query(
-                record_id=record_id,
-                event=event,
+        for row in np.flatnonzero(mask).tolist():
+            value = column.values[row]
+            yield row, dict(
                 instrument=field_meta.form_name,
                 field=field_meta.field_name,
                 value_found=value,
@@ -4,14 +4,29 @@ REDCap Data Quality Intelligence Agent - Temporal Analyzer
 Analisador de inconsistências temporais nos dados.
 """
 
-from datetime import datetime
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
 from typing import Optional
 from collections import defaultdict
 
 from .base_analyzer import BaseAnalyzer
-from ..models import Query
+from ..models import Event, Query, ProjectData
 import config
 
+# A partir deste número de registros as verificações por participante são
+# divididas entre processos (conversão de datas e comparações são Python puro)
+PARALLEL_MIN_RECORDS = 20000
+
+
+def _analyze_participants_chunk(metadata: list, events: list, records: list[dict]) -> list[Query]:
+    """Analisa uma fatia de participantes (nível de módulo para ser picklável)."""
+    chunk_data = ProjectData.model_construct(metadata=metadata, records=records, events=events)
+    analyzer = TemporalAnalyzer(chunk_data, max_workers=1)
+    analyzer._analyze_participants()
+    return analyzer.queries
+
 
 class TemporalAnalyzer(BaseAnalyzer):
     """
@@ -25,6 +40,27 @@ class TemporalAnalyzer(BaseAnalyzer):
     - Sequências de repeating instruments quebradas
     """
     
+    _date_fields: Optional[list[str]] = None
+    # id(registro) -> {campo: data convertida}; só durante analyze()
+    _parsed_dates: dict[int, dict[str, datetime]] = {}
+    # Invariantes dos eventos, montados uma vez por analyze()
+    _event_order: dict[str, int] = {}
+    _events_by_name: dict[str, Event] = {}
+    # Lido pelo QueryGenerator, que roda o analisador fora do seu pool quando
+    # ele mesmo vai dividir os participantes entre processos
+    parallel_min_records = PARALLEL_MIN_RECORDS
+    
+    def __init__(self, project_data, max_workers: Optional[int] = None):
+        """
+        Inicializa o analisador temporal.
+        
+        Args:
+            project_data: Dados do projeto
+            max_workers: Processos para projetos grandes (padrão: número de CPUs)
+        """
+        super().__init__(project_data)
+        self.max_workers = max_workers or os.cpu_count() or 1
+    
     def analyze(self) -> list[Query]:
         """
         Executa análise temporal completa.
@@ -34,20 +70,82 @@ class TemporalAnalyzer(BaseAnalyzer):
         """
         self.queries = []
         
-        # Agrupa registros por participante
-        records_by_participant = self._group_records_by_participant()
-        
-        for participant_id, records in records_by_participant.items():
-            self._check_date_order(participant_id, records)
-            self._check_baseline_vs_followup(participant_id, records)
-            self._check_death_date(participant_id, records)
-            self._check_event_timeline(participant_id, records)
+        if self._should_shard():
+            self._analyze_parallel()
+        else:
+            self._analyze_participants()
         
         # Verifica sequências de repeating instruments
         self._check_repeating_sequences()
         
         return self.queries
     
+    def _should_shard(self) -> bool:
+        """
+        Decide se as verificações por participante serão divididas entre processos.
+        
+        Não divide quando já está rodando dentro de um processo filho
+        (ex: pool do QueryGenerator), evitando pools aninhados.
+        """
+        return (
+            self.max_workers > 1
+            and len(self.project_data.records) >= self.parallel_min_records
+            and multiprocessing.parent_process() is None
+        )
+    
+    def _analyze_parallel(self) -> None:
+        """
+        Divide os participantes em fatias contíguas e analisa cada uma em um processo.
+        
+        Todos os registros de um participante ficam na mesma fatia e as fatias
+        seguem a ordem de agrupamento, então as queries saem na mesma ordem da
+        execução sequencial.
+        """
+        groups = list(self._group_records_by_participant().values())
+        chunk_size = -(-len(groups) // self.max_workers)
+        chunks = [
+            [record for records in groups[i:i + chunk_size] for record in records]
+            for i in range(0, len(groups), chunk_size)
+        ]
+        
+        with ProcessPoolExecutor(max_workers=len(chunks)) as executor:
+            futures = [
+                executor.submit(
+                    _analyze_participants_chunk,
+                    self.project_data.metadata,
+                    self.project_data.events,
+                    chunk,
+                )
+                for chunk in chunks
+            ]
+            for future in futures:
+                self.queries.extend(future.result())
+    
+    def _analyze_participants(self) -> None:
+        """Executa as verificações independentes por participante."""
+        self._date_fields = None
+        
+        # Ordem e metadados dos eventos (events_by_name reconstrói o dict a cada acesso)
+        self._event_order = {event.unique_event_name: idx for idx, event in enumerate(self.project_data.events)}
+        self._events_by_name = self.project_data.events_by_name
+        
+        # Agrupa registros por participante
+        records_by_participant = self._group_records_by_participant()
+        
+        # Cada data é convertida uma única vez, não uma vez por verificação
+        self._parse_record_dates()
+        try:
+            for participant_id, records in records_by_participant.items():
+                # Baseline localizada uma vez e compartilhada pelas duas verificações
+                baseline_info = self._find_baseline_date(records)
+                self._check_date_order(participant_id, records)
+                self._check_baseline_vs_followup(participant_id, records, baseline_info)
+                self._check_death_date(participant_id, records)
+                self._check_event_timeline(participant_id, records, baseline_info)
+        finally:
+            # As chaves usam id(registro): não podem sobreviver à execução
+            self._parsed_dates = {}
+    
     def _group_records_by_participant(self) -> dict[str, list[dict]]:
         """Agrupa registros por participante."""
         record_id_field = self.get_record_id_field()
@@ -59,16 +157,41 @@ class TemporalAnalyzer(BaseAnalyzer):
         
         return dict(grouped)
     
-    def _find_date_fields(self) -> list[str]:
-        """Encontra todos os campos de data no projeto."""
-        date_fields = []
+    def _parse_record_dates(self) -> None:
+        """
+        Converte as datas de todos os registros uma vez.
         
-        for field_meta in self.project_data.metadata:
-            validation = field_meta.validation_type
-            if validation and "date" in validation.lower():
-                date_fields.append(field_meta.field_name)
+        Cobre os campos de data do metadata e os campos conhecidos de
+        baseline/críticos (que podem não ter validação de data). Valores
+        vazios ou inválidos ficam fora do dict do registro.
+        """
+        parse_fields = tuple(dict.fromkeys((
+            *self._find_date_fields(),
+            *config.BASELINE_DATE_FIELDS,
+            *config.CRITICAL_DATE_FIELDS,
+        )))
         
-        return date_fields
+        parsed_dates = {}
+        for record in self.project_data.records:
+            dates = {}
+            for field_name in parse_fields:
+                value = record.get(field_name)
+                if value:
+                    parsed = self.parse_date(value)
+                    if parsed:
+                        dates[field_name] = parsed
+            parsed_dates[id(record)] = dates
+        self._parsed_dates = parsed_dates
+    
+    def _find_date_fields(self) -> list[str]:
+        """Encontra todos os campos de data no projeto (calculado uma vez por analisador)."""
+        if self._date_fields is None:
+            self._date_fields = [
+                field_meta.field_name
+                for field_meta in self.project_data.metadata
+                if field_meta.validation_type and "date" in field_meta.validation_type.lower()
+            ]
+        return self._date_fields
     
     def _find_baseline_date(self, records: list[dict]) -> Optional[tuple[datetime, str, dict]]:
         """
@@ -82,11 +205,9 @@ class TemporalAnalyzer(BaseAnalyzer):
         # Primeiro tenta campos conhecidos de baseline
         for field_name in config.BASELINE_DATE_FIELDS:
             for record in records:
-                value = record.get(field_name)
-                if value:
-                    parsed = self.parse_date(value)
-                    if parsed:
-                        return (parsed, field_name, record)
+                parsed = self._parsed_dates[id(record)].get(field_name)
+                if parsed:
+                    return (parsed, field_name, record)
         
         # Se não encontrar, usa a data mais antiga
         earliest = None
@@ -94,15 +215,14 @@ class TemporalAnalyzer(BaseAnalyzer):
         earliest_record = None
         
         for record in records:
+            dates = self._parsed_dates[id(record)]
             for field_name in date_fields:
-                value = record.get(field_name)
-                if value:
-                    parsed = self.parse_date(value)
-                    if parsed:
-                        if earliest is None or parsed < earliest:
-                            earliest = parsed
-                            earliest_field = field_name
-                            earliest_record = record
+                parsed = dates.get(field_name)
+                if parsed:
+                    if earliest is None or parsed < earliest:
+                        earliest = parsed
+                        earliest_field = field_name
+                        earliest_record = record
         
         if earliest:
             return (earliest, earliest_field, earliest_record)
@@ -116,21 +236,19 @@ class TemporalAnalyzer(BaseAnalyzer):
         event_field = self.get_event_field()
         date_fields = self._find_date_fields()
         
-        # Mapa de ordem dos eventos
-        event_order = {event.unique_event_name: idx for idx, event in enumerate(self.project_data.events)}
+        event_order = self._event_order
         
         # Coleta datas por evento
         event_dates: dict[str, list[tuple[datetime, str, dict]]] = defaultdict(list)
         
         for record in records:
             event_name = record.get(event_field, "")
+            dates = self._parsed_dates[id(record)]
             
             for field_name in date_fields:
-                value = record.get(field_name)
-                if value:
-                    parsed = self.parse_date(value)
-                    if parsed:
-                        event_dates[event_name].append((parsed, field_name, record))
+                parsed = dates.get(field_name)
+                if parsed:
+                    event_dates[event_name].append((parsed, field_name, record))
         
         # Verifica ordem entre eventos consecutivos
         sorted_events = sorted(event_dates.keys(), key=lambda e: event_order.get(e, 999))
@@ -163,9 +281,13 @@ class TemporalAnalyzer(BaseAnalyzer):
                             suggested_action="Verificar se as datas estão corretas ou se os eventos foram registrados no formulário errado.",
                         )
     
-    def _check_baseline_vs_followup(self, participant_id: str, records: list[dict]) -> None:
+    def _check_baseline_vs_followup(
+        self,
+        participant_id: str,
+        records: list[dict],
+        baseline_info: Optional[tuple[datetime, str, dict]],
+    ) -> None:
         """Verifica se datas de follow-up são posteriores à baseline."""
-        baseline_info = self._find_baseline_date(records)
         if not baseline_info:
             return
         
@@ -180,17 +302,15 @@ class TemporalAnalyzer(BaseAnalyzer):
             if record is baseline_record:
                 continue
             
+            dates = self._parsed_dates[id(record)]
             for field_name in date_fields:
                 # Pula campos de baseline conhecidos
-                if field_name in config.BASELINE_DATE_FIELDS:
-                    continue
-                
-                value = record.get(field_name)
-                if not value:
+                if field_name in config.BASELINE_DATE_FIELDS_SET:
                     continue
                 
-                parsed = self.parse_date(value)
+                parsed = dates.get(field_name)
                 if parsed and parsed < baseline_date:
+                    value = record.get(field_name)
                     field_meta = self.get_field_metadata(field_name)
                     self.add_query(
                         record_id=participant_id,
@@ -215,16 +335,15 @@ class TemporalAnalyzer(BaseAnalyzer):
 
         
         for field_name in config.CRITICAL_DATE_FIELDS:
-            if "death" in field_name.lower() or "obito" in field_name.lower():
+            field_lower = self.field_name_lower(field_name)
+            if "death" in field_lower or "obito" in field_lower:
                 for record in records:
-                    value = record.get(field_name)
-                    if value:
-                        parsed = self.parse_date(value)
-                        if parsed:
-                            death_date = parsed
-                            death_field = field_name
+                    parsed = self._parsed_dates[id(record)].get(field_name)
+                    if parsed:
+                        death_date = parsed
+                        death_field = field_name
 
-                            break
+                        break
         
         if not death_date:
             return
@@ -233,16 +352,14 @@ class TemporalAnalyzer(BaseAnalyzer):
         for record in records:
             event = record.get(event_field, "")
             
+            dates = self._parsed_dates[id(record)]
             for field_name in date_fields:
                 if field_name == death_field:
                     continue
                 
-                value = record.get(field_name)
-                if not value:
-                    continue
-                
-                parsed = self.parse_date(value)
+                parsed = dates.get(field_name)
                 if parsed and parsed > death_date:
+                    value = record.get(field_name)
                     field_meta = self.get_field_metadata(field_name)
                     self.add_query(
                         record_id=participant_id,
@@ -256,7 +373,12 @@ class TemporalAnalyzer(BaseAnalyzer):
                         suggested_action="Verificar se a data de óbito está correta ou se este registro foi feito erroneamente após o óbito.",
                     )
     
-    def _check_event_timeline(self, participant_id: str, records: list[dict]) -> None:
+    def _check_event_timeline(
+        self,
+        participant_id: str,
+        records: list[dict],
+        baseline_info: Optional[tuple[datetime, str, dict]],
+    ) -> None:
         """Verifica se eventos estão dentro da janela esperada."""
         if not self.project_data.events:
             return
@@ -264,8 +386,7 @@ class TemporalAnalyzer(BaseAnalyzer):
         event_field = self.get_event_field()
         date_fields = self._find_date_fields()
         
-        # Encontra baseline para referência
-        baseline_info = self._find_baseline_date(records)
+        # Baseline para referência
         if not baseline_info:
             return
         
@@ -273,7 +394,7 @@ class TemporalAnalyzer(BaseAnalyzer):
         
         for record in records:
             event_name = record.get(event_field, "")
-            event_meta = self.project_data.events_by_name.get(event_name)
+            event_meta = self._events_by_name.get(event_name)
             
             if not event_meta:
                 continue
@@ -282,9 +403,7 @@ class TemporalAnalyzer(BaseAnalyzer):
             if event_meta.days_offset is None:
                 continue
             
-            expected_date = baseline_date
             # Adiciona offset em dias
-            from datetime import timedelta
             expected_date = baseline_date + timedelta(days=event_meta.days_offset)
             
             min_date = expected_date
@@ -296,16 +415,14 @@ class TemporalAnalyzer(BaseAnalyzer):
                 max_date = baseline_date + timedelta(days=event_meta.offset_max)
             
             # Verifica datas do evento
+            dates = self._parsed_dates[id(record)]
             for field_name in date_fields:
-                value = record.get(field_name)
-                if not value:
-                    continue
-                
-                parsed = self.parse_date(value)
+                parsed = dates.get(field_name)
                 if not parsed:
                     continue
                 
                 if parsed < min_date or parsed > max_date:
+                    value = record.get(field_name)
                     field_meta = self.get_field_metadata(field_name)
                     self.add_query(
                         record_id=participant_id,
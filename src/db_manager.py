@@ -1,12 +1,20 @@
 import os
+import threading
+from collections import OrderedDict
 from datetime import datetime
 from supabase import create_client, Client
 
+# Max number of per-token (RLS) clients kept alive for connection reuse
+TOKEN_CLIENT_CACHE_SIZE = 32
+
 class DBManager:
     def __init__(self):
         self.url: str = os.getenv("SUPABASE_URL")
         self.key: str = os.getenv("SUPABASE_KEY")
         self.client: Client = None
+        # token -> Client, so each user's HTTP connection pool is reused across requests
+        self._token_clients: OrderedDict[str, Client] = OrderedDict()
+        self._token_clients_lock = threading.Lock()
         
         if self.url and self.key:
             try:
@@ -21,11 +29,22 @@ class DBManager:
         Otherwise returns the default (service/anon) client.
         """
         if token:
-            # Create a localized client for this request to respect RLS
+            with self._token_clients_lock:
+                cached = self._token_clients.get(token)
+                if cached is not None:
+                    self._token_clients.move_to_end(token)
+                    return cached
+
+            # Create a localized client for this token to respect RLS
             # Using headers to pass the JWT
             # Fix: Avoid ClientOptions due to library version mismatch
             new_client = create_client(self.url, self.key)
             new_client.postgrest.auth(token)
+
+            with self._token_clients_lock:
+                self._token_clients[token] = new_client
+                if len(self._token_clients) > TOKEN_CLIENT_CACHE_SIZE:
+                    self._token_clients.popitem(last=False)
             return new_client
         return self.client
 
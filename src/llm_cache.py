@@ -0,0 +1,105 @@
+"""
+REDCap Data Quality Intelligence Agent - LLM Response Cache
+
+Cache persistente (SQLite) de respostas dos provedores de IA.
+Reexecuções da mesma auditoria geram os mesmos prompts; com o cache
+a resposta volta do disco em milissegundos em vez de uma nova chamada.
+
+Desativado por padrão (AI_CACHE=true para ativar): prompts e respostas
+contêm valores dos registros clínicos e ficam gravados sem criptografia em
+output/.cache/llm_responses.sqlite3 por até 7 dias.
+"""
+
+import hashlib
+import re
+import sqlite3
+import time
+from pathlib import Path
+from typing import Optional
+
+import config
+
+
+DEFAULT_TTL = 7 * 24 * 3600  # 7 dias
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def _normalize(text: str) -> str:
+    """Colapsa espaços em branco para que variações de indentação gerem a mesma chave."""
+    return _WHITESPACE_RE.sub(" ", text).strip()
+
+
+class ResponseCache:
+    """
+    Cache chave-valor de respostas de LLM em SQLite.
+
+    A chave inclui provedor e modelo, evitando colisões entre modelos diferentes.
+    Cada operação abre sua própria conexão, então a instância pode ser
+    compartilhada entre threads (Waitress) e tarefas asyncio.
+    """
+
+    def __init__(self, path: Path, ttl: int = DEFAULT_TTL):
+        """
+        Args:
+            path: Arquivo SQLite do cache
+            ttl: Validade das entradas em segundos
+        """
+        self.path = Path(path)
+        self.ttl = ttl
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._initialized:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=5)
+        if not self._initialized:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._initialized = True
+        return conn
+
+    @staticmethod
+    def make_key(provider: str, model: str, system_prompt: str, user_prompt: str) -> str:
+        """Gera a chave (sha256) de uma chamada."""
+        payload = "\x1f".join((provider, model, _normalize(system_prompt), _normalize(user_prompt)))
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Retorna a resposta cacheada ou None (ausente, expirada ou erro de I/O)."""
+        try:
+            conn = self._connect()
+            try:
+                row = conn.execute(
+                    "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+            finally:
+                conn.close()
+        except (sqlite3.Error, OSError):
+            # OSError: diretório do cache inexistente/somente leitura (ex: serverless)
+            return None
+
+        if row is None or time.time() - row[1] > self.ttl:
+            return None
+        return row[0]
+
+    def set(self, key: str, response: str) -> None:
+        """Grava uma resposta (falhas de I/O são ignoradas: o cache é best-effort)."""
+        try:
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO responses (key, response, created_at) VALUES (?, ?, ?)",
+                        (key, response, time.time()),
+                    )
+            finally:
+                conn.close()
+        except (sqlite3.Error, OSError):
+            pass
+
+
+# Instância global (compartilhada por todas as instâncias de AIAnalyzer)
+response_cache = ResponseCache(config.OUTPUT_DIR / ".cache" / "llm_responses.sqlite3")
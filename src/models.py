@@ -5,8 +5,8 @@ Modelos Pydantic para validação e estruturação de dados.
 """
 
 from datetime import datetime
-from typing import Optional, Any
-from pydantic import BaseModel, Field
+from typing import Optional, Any, Literal
+from pydantic import BaseModel, Field, PrivateAttr, field_validator
 
 
 class FieldMetadata(BaseModel):
@@ -114,6 +114,39 @@ class LogEntry(BaseModel):
             return None
 
 
+class LazyText:
+    """
+    Texto formatado sob demanda.
+    
+    Guarda o template (str.format) e os argumentos; a string só é montada no
+    primeiro str() e depois reutilizada. Usado em value_found de queries cujo
+    texto pode nunca ser exibido (ex: exportação apenas de contagens).
+    """
+    
+    __slots__ = ("template", "args", "_text")
+    
+    def __init__(self, template: str, *args: Any):
+        self.template = template
+        self.args = args
+        self._text: Optional[str] = None
+    
+    def __str__(self) -> str:
+        if self._text is None:
+            self._text = self.template.format(*self.args)
+        return self._text
+    
+    def __repr__(self) -> str:
+        return repr(str(self))
+    
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, LazyText):
+            other = str(other)
+        return str(self) == other
+    
+    def __hash__(self) -> int:
+        return hash(str(self))
+
+
 class Query(BaseModel):
     """Query gerada pelo análise de qualidade."""
     
@@ -137,6 +170,11 @@ class Query(BaseModel):
     # Link direto para o REDCap
     redcap_link: Optional[str] = None
     
+    @property
+    def rendered_value(self) -> Optional[str]:
+        """value_found como texto (formata LazyText na primeira leitura)."""
+        return str(self.value_found) if self.value_found is not None else None
+    
     def to_dict(self) -> dict:
         """Converte para dicionário."""
         return {
@@ -144,7 +182,7 @@ class Query(BaseModel):
             "event": self.event,
             "instrument": self.instrument,
             "field": self.field,
-            "value_found": str(self.value_found) if self.value_found is not None else None,
+            "value_found": self.rendered_value,
             "issue_type": self.issue_type,
             "explanation": self.explanation,
             "suggested_action": self.suggested_action,
@@ -155,6 +193,29 @@ class Query(BaseModel):
         }
 
 
+class RuleSchema(BaseModel):
+    """Regra de validação estruturada, gerada pela IA a partir de linguagem natural."""
+    
+    name: str = Field(description="Nome curto e descritivo da regra")
+    field: str = Field(description="Nome da variável (snake_case); '_ALL_' para todo o projeto")
+    rule_type: Literal["comparison", "range", "regex", "condition", "uniqueness", "cross_event"]
+    operator: Literal[
+        "=", "!=", ">", "<", ">=", "<=", "between", "matches", "contains",
+        "unique", "empty", "not_empty", "present_implies",
+    ]
+    value: str = Field(default="", description="Valor da regra (para cross_event, o nome do segundo campo)")
+    priority: Literal["Alta", "Média", "Baixa"] = "Média"
+    message: str = Field(description="Mensagem de erro amigável para o usuário")
+    event1: Optional[str] = Field(default=None, description="Evento do primeiro campo (cross_event)")
+    event2: Optional[str] = Field(default=None, description="Evento do segundo campo (cross_event)")
+    
+    @field_validator("value", mode="before")
+    @classmethod
+    def _value_as_str(cls, value: Any) -> str:
+        """Modelos às vezes devolvem números (ex: 18) em vez de strings."""
+        return "" if value is None else str(value)
+
+
 class ProjectSummary(BaseModel):
     """Resumo do projeto após análise."""
     
@@ -225,6 +286,30 @@ class ProjectData(BaseModel):
     form_event_mapping: list[FormEventMapping] = []
     logs: list[LogEntry] = []
     
+    _columns: Optional[dict[str, Any]] = PrivateAttr(default=None)
+    
+    @property
+    def columns(self) -> dict[str, Any]:
+        """
+        Registros em layout colunar: campo -> np.ndarray (dtype object).
+        
+        Construído na primeira chamada e reutilizado por todos os analisadores.
+        Campos ausentes em um registro ficam como None. Os registros não
+        devem ser alterados depois do primeiro acesso.
+        """
+        if self._columns is None:
+            import numpy as np
+            
+            fields = dict.fromkeys(key for record in self.records for key in record)
+            n = len(self.records)
+            columns = {}
+            for field_name in fields:
+                column = np.empty(n, dtype=object)
+                column[:] = [record.get(field_name) for record in self.records]
+                columns[field_name] = column
+            self._columns = columns
+        return self._columns
+    
     @property
     def metadata_by_field(self) -> dict[str, FieldMetadata]:
         """Retorna metadados indexados por nome do campo."""
@@ -363,7 +363,7 @@ class PDFReportGenerator:
         """
         if output_path is None:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            output_path = config.OUTPUT_DIR / f"quality_report_{timestamp}.pdf"
+            output_path = config.ensure_output_dir() / f"quality_report_{timestamp}.pdf"
         
         doc = SimpleDocTemplate(
             str(output_path),
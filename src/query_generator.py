@@ -5,11 +5,22 @@ Consolidador de queries e gerador de relatório final.
 """
 
 import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime
 from pathlib import Path
 from typing import Optional
 from collections import Counter
 
+# orjson serializa em C (bem mais rápido em relatórios grandes); json é o fallback
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 from rich.console import Console
 from rich.table import Table
 
@@ -27,6 +38,37 @@ import config
 
 console = Console()
 
+# A partir deste número de registros os analisadores rodam em processos separados;
+# abaixo disso o custo de iniciar processos e serializar o ProjectData não compensa.
+PARALLEL_MIN_RECORDS = 5000
+
+
+def _run_analyzer(analyzer_cls: type, project_data: ProjectData, kwargs: dict) -> list[Query]:
+    """Instancia e executa um analisador (nível de módulo para ser picklável)."""
+    return analyzer_cls(project_data, **kwargs).analyze()
+
+
+def _pool_context():
+    """
+    Contexto de multiprocessing do pool de analisadores.
+    
+    Evita fork: os servidores (waitress, gunicorn gthread) são multithread e um
+    lock mantido por outra thread no momento do fork travaria o processo filho.
+    """
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+def _shards_itself(analyzer_cls: type, n_records: int) -> bool:
+    """
+    Verifica se o analisador divide os próprios registros entre processos.
+    
+    Esses analisadores só dividem no processo principal (não dentro de um
+    filho do pool), então rodam fora do pool por analisador.
+    """
+    threshold = getattr(analyzer_cls, "parallel_min_records", None)
+    return threshold is not None and n_records >= threshold and (os.cpu_count() or 1) > 1
+
 
 class QueryGenerator:
     """
@@ -95,39 +137,46 @@ class QueryGenerator:
                 if rid.startswith('sys_') or rid in system_uuids
             ]
         
-        # Analisador Estrutural
-        console.print(f"\n[bold cyan]📋 Executando Análise Estrutural ({len(enabled_structural_checks)} checks ativos)...[/bold cyan]")
-        structural = StructuralAnalyzer(self.project_data, enabled_checks=enabled_structural_checks)
-        structural_queries = structural.analyze()
-        self.queries.extend(structural_queries)
-        console.print(f"   ✓ {len(structural_queries)} inconsistências encontradas")
-        
-        # Analisador Temporal
+        # Analisadores locais (CPU-bound, independentes entre si)
+        tasks = [(
+            f"📋 Executando Análise Estrutural ({len(enabled_structural_checks)} checks ativos)...",
+            StructuralAnalyzer, {"enabled_checks": enabled_structural_checks}, "inconsistências encontradas",
+        )]
         if 'sys_temporal' in active_ids:
-            console.print("\n[bold cyan]📅 Executando Análise Temporal...[/bold cyan]")
-            temporal = TemporalAnalyzer(self.project_data)
-            temporal_queries = temporal.analyze()
-            self.queries.extend(temporal_queries)
-            console.print(f"   ✓ {len(temporal_queries)} inconsistências encontradas")
-        
-        # Analisador Clínico
+            tasks.append(("📅 Executando Análise Temporal...", TemporalAnalyzer, {}, "inconsistências encontradas"))
         if 'sys_clinical' in active_ids:
-            console.print("\n[bold cyan]🏥 Executando Análise Clínica...[/bold cyan]")
-            clinical = ClinicalAnalyzer(self.project_data, self.custom_clinical_limits)
-            clinical_queries = clinical.analyze()
-            self.queries.extend(clinical_queries)
-            console.print(f"   ✓ {len(clinical_queries)} inconsistências encontradas")
-        
+            tasks.append((
+                "🏥 Executando Análise Clínica...",
+                ClinicalAnalyzer, {"custom_limits": self.custom_clinical_limits}, "inconsistências encontradas",
+            ))
         # Analisador Operacional (se houver logs)
+        skip_operational = False
         if 'sys_operational' in active_ids:
             if self.include_operational and self.project_data.logs:
-                console.print("\n[bold cyan]📊 Executando Análise Operacional...[/bold cyan]")
-                operational = OperationalAnalyzer(self.project_data)
-                operational_queries = operational.analyze()
-                self.queries.extend(operational_queries)
-                console.print(f"   ✓ {len(operational_queries)} padrões identificados")
+                tasks.append(("📊 Executando Análise Operacional...", OperationalAnalyzer, {}, "padrões identificados"))
             elif self.include_operational:
-                console.print("\n[dim]⚠ Análise Operacional ignorada (logs não disponíveis)[/dim]")
+                skip_operational = True
+        
+        n_records = len(self.project_data.records)
+        parallel = (
+            n_records >= PARALLEL_MIN_RECORDS
+            and (os.cpu_count() or 1) > 1
+            and (len(tasks) > 1 or any(_shards_itself(task[1], n_records) for task in tasks))
+        )
+        if parallel:
+            queries_before = len(self.queries)
+            try:
+                self._run_tasks_parallel(tasks)
+            except (OSError, BrokenProcessPool) as e:
+                # Ambientes sem suporte a processos (ex: serverless): refaz em sequência
+                console.print(f"\n[dim]⚠ Pool de processos indisponível ({e}); executando em sequência[/dim]")
+                del self.queries[queries_before:]
+                parallel = False
+        if not parallel:
+            self._run_tasks_sequential(tasks)
+
+        if skip_operational:
+            console.print("\n[dim]⚠ Análise Operacional ignorada (logs não disponíveis)[/dim]")
         
         # Analisador de Regras Customizadas
         console.print("\n[bold cyan]⚙️ Executando Regras Customizadas...[/bold cyan]")
@@ -150,6 +199,47 @@ class QueryGenerator:
 
         return self.queries
     
+    def _run_tasks_sequential(self, tasks: list[tuple]) -> None:
+        """Executa os analisadores um após o outro no processo atual."""
+        for title, analyzer_cls, kwargs, unit in tasks:
+            console.print(f"\n[bold cyan]{title}[/bold cyan]")
+            analyzer_queries = _run_analyzer(analyzer_cls, self.project_data, kwargs)
+            self.queries.extend(analyzer_queries)
+            console.print(f"   ✓ {len(analyzer_queries)} {unit}")
+    
+    def _run_tasks_parallel(self, tasks: list[tuple]) -> None:
+        """
+        Executa os analisadores em processos separados (contorna o GIL).
+        
+        Os resultados são consolidados na ordem das tarefas, então o relatório
+        é idêntico ao da execução sequencial. Analisadores que dividem os
+        próprios registros entre processos (ver _shards_itself) rodam no
+        processo principal enquanto o pool executa os demais.
+        """
+        n_records = len(self.project_data.records)
+        console.print(f"\n[dim]Executando {len(tasks)} analisadores em paralelo...[/dim]")
+        pooled = [
+            i for i, (_, analyzer_cls, _, _) in enumerate(tasks)
+            if not _shards_itself(analyzer_cls, n_records)
+        ]
+        with ProcessPoolExecutor(
+            max_workers=max(1, min(len(pooled), os.cpu_count() or 1)),
+            mp_context=_pool_context(),
+        ) as executor:
+            futures = {
+                i: executor.submit(_run_analyzer, tasks[i][1], self.project_data, tasks[i][2])
+                for i in pooled
+            }
+            for i, (title, analyzer_cls, kwargs, unit) in enumerate(tasks):
+                future = futures.get(i)
+                if future is None:
+                    analyzer_queries = _run_analyzer(analyzer_cls, self.project_data, kwargs)
+                else:
+                    analyzer_queries = future.result()
+                self.queries.extend(analyzer_queries)
+                console.print(f"\n[bold cyan]{title}[/bold cyan]")
+                console.print(f"   ✓ {len(analyzer_queries)} {unit}")
+    
     def generate_report(self) -> QualityReport:
         """
         Gera relatório de qualidade.
@@ -182,10 +272,16 @@ class QueryGenerator:
         
         if output_path is None:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            output_path = config.OUTPUT_DIR / f"quality_report_{timestamp}.json"
+            output_path = config.ensure_output_dir() / f"quality_report_{timestamp}.json"
         
-        with open(output_path, "w", encoding="utf-8") as f:
-            json.dump(report.to_dict(), f, ensure_ascii=False, indent=2)
+        if ORJSON_AVAILABLE:
+            Path(output_path).write_bytes(orjson.dumps(
+                report.to_dict(),
+                option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NAIVE_UTC,
+            ))
+        else:
+            with open(output_path, "w", encoding="utf-8") as f:
+                json.dump(report.to_dict(), f, ensure_ascii=False, indent=2)
         
         return output_path
     
@@ -245,20 +341,25 @@ class QueryGenerator:
         priority_order = {"Alta": 0, "Média": 1, "Baixa": 2}
         queries = sorted(queries, key=lambda q: priority_order.get(q.priority, 3))
         
-        console.print(f"\n[bold]📝 QUERIES ({min(limit, len(queries))} de {len(queries)})[/bold]")
-        console.print("=" * 70)
+        # Monta toda a saída e imprime de uma vez (um único write no terminal)
+        lines = [
+            f"\n[bold]📝 QUERIES ({min(limit, len(queries))} de {len(queries)})[/bold]",
+            "=" * 70,
+        ]
         
         for i, query in enumerate(queries[:limit]):
             priority_style = "red" if query.priority == "Alta" else "yellow" if query.priority == "Média" else "green"
             
-            console.print(f"\n[bold]#{i+1}[/bold] [{priority_style}][{query.priority}][/{priority_style}]")
-            console.print(f"   [bold]Record:[/bold] {query.record_id} | [bold]Evento:[/bold] {query.event}")
-            console.print(f"   [bold]Campo:[/bold] {query.field} ({query.instrument})")
-            console.print(f"   [bold]Valor:[/bold] {query.value_found}")
-            console.print(f"   [bold]Tipo:[/bold] {config.ISSUE_TYPES.get(query.issue_type, query.issue_type)}")
-            console.print(f"   [bold]Explicação:[/bold] {query.explanation}")
+            lines.append(f"\n[bold]#{i+1}[/bold] [{priority_style}][{query.priority}][/{priority_style}]")
+            lines.append(f"   [bold]Record:[/bold] {query.record_id} | [bold]Evento:[/bold] {query.event}")
+            lines.append(f"   [bold]Campo:[/bold] {query.field} ({query.instrument})")
+            lines.append(f"   [bold]Valor:[/bold] {query.value_found}")
+            lines.append(f"   [bold]Tipo:[/bold] {config.ISSUE_TYPES.get(query.issue_type, query.issue_type)}")
+            lines.append(f"   [bold]Explicação:[/bold] {query.explanation}")
             if query.suggested_action:
-                console.print(f"   [bold]Sugestão:[/bold] {query.suggested_action}")
+                lines.append(f"   [bold]Sugestão:[/bold] {query.suggested_action}")
         
         if len(queries) > limit:
-            console.print(f"\n[dim]... e mais {len(queries) - limit} queries. Use --limit para ver mais.[/dim]")
+            lines.append(f"\n[dim]... e mais {len(queries) - limit} queries. Use --limit para ver mais.[/dim]")
+        
+        console.print("\n".join(lines))
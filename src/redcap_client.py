@@ -4,7 +4,11 @@ REDCap Data Quality Intelligence Agent - REDCap API Client
 Cliente para comunicação com a API do REDCap.
 """
 
+import hashlib
+import json
+import time
 import requests
+from pathlib import Path
 from typing import Optional
 from rich.console import Console
 
@@ -19,6 +23,9 @@ from .models import (
 
 console = Console()
 
+# Conteúdos estáticos do projeto (mudam raramente) que podem ser cacheados em disco
+CACHEABLE_CONTENT = {"project", "metadata", "event", "arm", "formEventMapping"}
+
 
 class REDCapAPIError(Exception):
     """Exceção para erros da API REDCap."""
@@ -33,9 +40,18 @@ class REDCapClient:
         api_url: URL da API REDCap
         token: Token de autenticação do projeto
         timeout: Timeout para requisições em segundos
+        cache_dir: Diretório do cache em disco de exports estáticos (None = desativado)
+        cache_ttl: Validade do cache em segundos
     """
     
-    def __init__(self, api_url: str, token: str, timeout: int = 120):
+    def __init__(
+        self,
+        api_url: str,
+        token: str,
+        timeout: int = 120,
+        cache_dir: Optional[Path] = None,
+        cache_ttl: int = 3600,
+    ):
         """
         Inicializa o cliente REDCap.
         
@@ -43,10 +59,14 @@ class REDCapClient:
             api_url: URL da API REDCap (ex: https://redcap.example.com/api/)
             token: Token de API do projeto
             timeout: Timeout para requisições em segundos
+            cache_dir: Diretório do cache em disco de exports estáticos (None = desativado)
+            cache_ttl: Validade do cache em segundos
         """
         self.api_url = api_url.rstrip("/") + "/"
         self.token = token
         self.timeout = timeout
+        self.cache_dir = cache_dir
+        self.cache_ttl = cache_ttl
         self._project_id = None
         self._base_url = None
         self.events_map: dict[str, int] = {}  # Cache de unique_event_name -> event_id
@@ -182,15 +202,16 @@ class REDCapClient:
         return "14.0.0"  # Versão padrão se não encontrar
 
         
-    def _make_request(self, data: dict) -> list | dict:
+    def _make_request(self, data: dict, parse_json: bool = True) -> list | dict | str:
         """
         Faz uma requisição à API REDCap.
         
         Args:
             data: Dados da requisição
+            parse_json: Se False, retorna o corpo da resposta como texto (ex: CSV)
             
         Returns:
-            Resposta da API em formato JSON
+            Resposta da API em formato JSON (ou texto bruto)
             
         Raises:
             REDCapAPIError: Se houver erro na requisição
@@ -224,7 +245,7 @@ class REDCapClient:
                 print(f"[DEBUG REDCap API] Response Body: {response.text[:500]}", flush=True)
             
             response.raise_for_status()
-            return response.json()
+            return response.json() if parse_json else response.text
         except requests.exceptions.Timeout:
             raise REDCapAPIError(f"Timeout após {self.timeout}s ao conectar com REDCap API")
         except requests.exceptions.ConnectionError as e:
@@ -259,6 +280,41 @@ class REDCapClient:
                 
             raise REDCapAPIError(f"Erro inesperado: {e}")
     
+    def _cached_request(self, data: dict) -> list | dict:
+        """
+        Faz uma requisição de conteúdo estático usando o cache em disco.
+        
+        A chave do cache é o hash de (URL da API + token) mais o tipo de conteúdo,
+        de modo que projetos diferentes nunca compartilham entradas.
+        
+        Args:
+            data: Dados da requisição (deve conter 'content')
+            
+        Returns:
+            Resposta da API (do cache ou da rede)
+        """
+        if self.cache_dir is None or data.get("content") not in CACHEABLE_CONTENT:
+            return self._make_request(data)
+        
+        key = hashlib.sha256((self.api_url + self.token).encode()).hexdigest()
+        cache_file = Path(self.cache_dir) / f"{key}.{data['content']}.json"
+        
+        try:
+            if time.time() - cache_file.stat().st_mtime < self.cache_ttl:
+                return json.loads(cache_file.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            pass  # Sem cache ou cache corrompido: busca na API
+        
+        result = self._make_request(data)
+        
+        try:
+            cache_file.parent.mkdir(parents=True, exist_ok=True)
+            cache_file.write_text(json.dumps(result), encoding="utf-8")
+        except OSError:
+            pass  # Cache é apenas otimização
+        
+        return result
+    
     def test_connection(self) -> bool:
         """
         Testa a conexão com a API REDCap de forma rápida.
@@ -298,7 +354,7 @@ class REDCapClient:
         Returns:
             Dicionário com informações do projeto
         """
-        return self._make_request({"content": "project"})
+        return self._cached_request({"content": "project"})
     
     def export_metadata(self) -> list[FieldMetadata]:
         """
@@ -307,7 +363,7 @@ class REDCapClient:
         Returns:
             Lista de FieldMetadata com informações de cada campo
         """
-        data = self._make_request({"content": "metadata"})
+        data = self._cached_request({"content": "metadata"})
         return [FieldMetadata(**field) for field in data]
     
     def export_records(
@@ -333,8 +389,11 @@ class REDCapClient:
         Returns:
             Lista de dicionários com os registros
         """
+        # CSV é bem menor que JSON (sem chaves repetidas por célula) e é
+        # lido pelo parser em C do pandas
         request_data = {
             "content": "record",
+            "format": "csv",
             "type": "flat",
             "rawOrLabel": raw_or_label,
             "exportCheckboxLabel": str(export_checkbox_labels).lower(),
@@ -349,7 +408,38 @@ class REDCapClient:
         if events:
             request_data["events"] = ",".join(events)
             
-        return self._make_request(request_data)
+        result = self._make_request(request_data, parse_json=False)
+        if isinstance(result, list):
+            return result  # Dados mock (fallback 403)
+        return self._parse_records_csv(result)
+    
+    @staticmethod
+    def _parse_records_csv(text: str) -> list[dict]:
+        """
+        Converte o CSV de registros do REDCap na mesma estrutura do export JSON.
+        
+        Todos os valores são mantidos como string e células vazias como "",
+        exatamente como a API retorna em JSON.
+        
+        Args:
+            text: Corpo da resposta em CSV
+            
+        Returns:
+            Lista de dicionários com os registros
+        """
+        import io
+        import pandas as pd
+        
+        if not text.strip():
+            return []
+        
+        df = pd.read_csv(
+            io.StringIO(text),
+            dtype=str,
+            keep_default_na=False,
+            engine="c",
+        )
+        return df.to_dict("records")
     
     def export_events(self) -> list[Event]:
         """
@@ -359,7 +449,7 @@ class REDCapClient:
             Lista de Event com informações de cada evento
         """
         try:
-            data = self._make_request({"content": "event"})
+            data = self._cached_request({"content": "event"})
             events = []
             for event_data in data:
                 ev = Event(**event_data)
@@ -382,7 +472,7 @@ class REDCapClient:
             Lista de Arm com informações de cada braço
         """
         try:
-            data = self._make_request({"content": "arm"})
+            data = self._cached_request({"content": "arm"})
             return [Arm(**arm) for arm in data]
         except REDCapAPIError as e:
             if "not longitudinal" in str(e).lower():
@@ -397,7 +487,7 @@ class REDCapClient:
             Lista de FormEventMapping
         """
         try:
-            data = self._make_request({"content": "formEventMapping"})
+            data = self._cached_request({"content": "formEventMapping"})
             return [FormEventMapping(**mapping) for mapping in data]
         except REDCapAPIError as e:
             if "not longitudinal" in str(e).lower():
@@ -496,10 +586,13 @@ class REDCapClient:
         )
 
 
-def create_client_from_env() -> REDCapClient:
+def create_client_from_env(use_cache: bool = False) -> REDCapClient:
     """
     Cria cliente REDCap a partir de variáveis de ambiente.
     
+    Args:
+        use_cache: Se True, cacheia exports estáticos em OUTPUT_DIR/.cache
+        
     Returns:
         REDCapClient configurado
         
@@ -517,4 +610,5 @@ def create_client_from_env() -> REDCapClient:
         api_url=config.REDCAP_API_URL,
         token=config.REDCAP_API_TOKEN,
         timeout=config.REDCAP_TIMEOUT,
+        cache_dir=config.OUTPUT_DIR / ".cache" if use_cache else None,
     )
@@ -0,0 +1,119 @@
+"""Testes do compilador de branching logic (src/analyzers/branching_logic.py)."""
+
+import pytest
+
+from src.analyzers.branching_logic import LogicError, compile_logic
+from src.analyzers.structural_analyzer import StructuralAnalyzer
+from src.models import ProjectData
+
+
+def _eval(logic: str, record: dict):
+    return compile_logic(logic)(record)
+
+
+@pytest.mark.parametrize("logic", [
+    "[idade] >= 18 ;",
+    "[sexo] = 1 @",
+    "datediff([a], [b], 'd') > 1",
+    "[a] = 1 xor [b] = 2",
+])
+def test_tokenizer_rejects_unsupported_tokens(logic):
+    with pytest.raises(LogicError):
+        compile_logic(logic)
+
+
+@pytest.mark.parametrize("logic", ["([a] = 1", "[a] = ", "[a] = 1 )"])
+def test_parser_rejects_malformed_expressions(logic):
+    with pytest.raises(LogicError):
+        compile_logic(logic)
+
+
+def test_checkbox_reference_reads_triple_underscore_column():
+    record = {"sintomas___2": "1", "sintomas___3": "0"}
+    assert _eval("[sintomas(2)] = '1'", record) is True
+    assert _eval("[sintomas(3)] = '1'", record) is False
+    # Opção ausente no registro equivale a vazio
+    assert _eval("[sintomas(9)] = ''", record) is True
+
+
+@pytest.mark.parametrize("logic, record, expected", [
+    # Número x texto numérico comparam numericamente (como no REDCap)
+    ("[sexo] = 1", {"sexo": "1"}, True),
+    ("[sexo] = '1'", {"sexo": "1"}, True),
+    ("[peso] = 70", {"peso": "70.0"}, True),
+    ("[idade] > 9", {"idade": "10"}, True),
+    # Texto compara como texto
+    ("[cidade] = 'Recife'", {"cidade": "Recife"}, True),
+    ("[cidade] = 'Recife'", {"cidade": "recife"}, False),
+    # Campo vazio ou ausente
+    ("[idade] = ''", {}, True),
+    ("[idade] = 1", {"idade": ""}, False),
+])
+def test_numeric_vs_text_comparison(logic, record, expected):
+    assert _eval(logic, record) is expected
+
+
+def test_text_ordering_against_number_is_an_error():
+    with pytest.raises(LogicError):
+        _eval("[cidade] > 1", {"cidade": "Recife"})
+
+
+@pytest.mark.parametrize("op", ["<>", "!="])
+def test_not_equal_operators(op):
+    assert _eval(f"[sexo] {op} 1", {"sexo": "2"}) is True
+    assert _eval(f"[sexo] {op} 1", {"sexo": "1"}) is False
+
+
+@pytest.mark.parametrize("logic, expected", [
+    # and tem precedência sobre or
+    ("[a] = 1 or [b] = 1 and [c] = 1", True),
+    ("([a] = 1 or [b] = 1) and [c] = 1", False),
+    # not se aplica só à comparação seguinte
+    ("not [a] = 1 or [c] = 0", True),
+    ("not ([a] = 1 or [b] = 1)", False),
+    ("[a] = 1 AND NOT [c] = 1", True),
+])
+def test_boolean_precedence(logic, expected):
+    record = {"a": "1", "b": "0", "c": "0"}
+    assert bool(_eval(logic, record)) is expected
+
+
+def test_arithmetic_in_comparison():
+    assert _eval("[peso] / ([altura] * [altura]) > 30", {"peso": "100", "altura": "1.7"}) is True
+    assert _eval("-[x] + 2 = 1", {"x": "1"}) is True
+
+
+def test_unsupported_logic_falls_back_to_visible():
+    analyzer = StructuralAnalyzer(ProjectData(metadata=[], records=[]))
+    # Função não suportada: não compila, campo tratado como visível
+    assert analyzer.evaluate_branching_logic("datediff([a], 'today', 'y') > 18", {"a": "2000-01-01"}) is True
+    # Erro na avaliação (texto x número) também assume visível
+    assert analyzer.evaluate_branching_logic("[cidade] > 1", {"cidade": "Recife"}) is True
+    # Divisão por zero idem
+    assert analyzer.evaluate_branching_logic("[a] / [b] > 1", {"a": "1", "b": "0"}) is True
+    # Sem lógica: sempre visível
+    assert analyzer.evaluate_branching_logic("", {}) is True
+    assert analyzer.evaluate_branching_logic("[sexo] = '2'", {"sexo": "1"}) is False
+
+
+@pytest.mark.parametrize("value", ["nan", "NaN", "inf", "-Infinity", "1_000", "1e3"])
+def test_float_like_text_is_not_numeric(value):
+    # float() aceita esses textos, mas o REDCap os trata como texto
+    assert _eval(f"[x] = '{value}'", {"x": value}) is True
+    assert _eval("[x] = 1000", {"x": value}) is False
+    with pytest.raises(LogicError):
+        _eval("[x] > 60", {"x": value})
+    with pytest.raises(LogicError):
+        _eval("[x] + 1 > 60", {"x": value})
+
+
+@pytest.mark.parametrize("value, expected", [(" 61 ", True), ("-5", False), ("60.5", True), (".5", False)])
+def test_plain_decimal_text_is_numeric(value, expected):
+    assert _eval("[x] > 60", {"x": value}) is expected
+
+
+def test_nan_text_keeps_field_visible():
+    analyzer = StructuralAnalyzer(ProjectData(metadata=[], records=[]))
+    logic = "[sym(3)] = '1' or [age] > 60"
+    assert analyzer.evaluate_branching_logic(logic, {"sym___3": "0", "age": "nan"}) is True
+    assert analyzer.evaluate_branching_logic(logic, {"sym___3": "0", "age": "30"}) is False
@@ -0,0 +1,55 @@
+"""Testes do StructuralAnalyzer (verificações coluna a coluna)."""
+
+from datetime import datetime
+
+from src.analyzers.structural_analyzer import StructuralAnalyzer
+from src.models import FieldMetadata, ProjectData
+
+
+def _field(name: str, **kwargs) -> FieldMetadata:
+    return FieldMetadata(field_name=name, form_name="demo", field_type=kwargs.pop("field_type", "text"), field_label=name, **kwargs)
+
+
+def _issues(queries, field_name: str) -> list[str]:
+    return [query.issue_type for query in queries if query.field == field_name]
+
+
+def test_branching_violation_does_not_hide_future_date_on_same_field():
+    """A máscara da branching logic não pode vazar para a verificação de data futura."""
+    future = f"{datetime.now().year + 5}-01-01"
+    metadata = [
+        _field("record_id"),
+        _field("sex", field_type="radio", select_choices_or_calculations="1, M | 2, F"),
+        _field("preg_date", text_validation_type_or_show_slider_number="date_ymd", branching_logic="[sex] = '2'"),
+    ]
+    records = [
+        {"record_id": "1", "sex": "1", "preg_date": future},
+        {"record_id": "2", "sex": "2", "preg_date": future},
+    ]
+    analyzer = StructuralAnalyzer(
+        ProjectData(metadata=metadata, records=records),
+        enabled_checks=["sys_branching", "sys_future_date"],
+    )
+    queries = analyzer.analyze()
+
+    by_record = {
+        record_id: _issues([q for q in queries if q.record_id == record_id], "preg_date")
+        for record_id in ("1", "2")
+    }
+    # Registro 1: campo oculto pela lógica -> só a violação de branching
+    assert by_record["1"] == ["field_should_be_empty"]
+    assert by_record["2"] == ["date_out_of_order"]
+
+
+def test_required_field_empty_only_when_form_started():
+    metadata = [_field("record_id"), _field("age", required_field="y")]
+    records = [
+        {"record_id": "1", "age": "", "demo_complete": "2"},
+        {"record_id": "2", "age": "", "demo_complete": ""},
+        {"record_id": "3", "age": "40", "demo_complete": "2"},
+    ]
+    queries = StructuralAnalyzer(
+        ProjectData(metadata=metadata, records=records), enabled_checks=["sys_required"]
+    ).analyze()
+
+    assert [(q.record_id, q.issue_type) for q in queries] == [("1", "required_field_empty")]
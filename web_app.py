@@ -8,7 +8,7 @@ import json
 import os
 from datetime import datetime
 from pathlib import Path
-from flask import Flask, render_template, request, jsonify, send_file, Response, session, redirect, url_for, flash
+from flask import Flask, render_template, request, jsonify, send_file, Response, session, redirect, url_for, flash, stream_with_context
 
 import io
 
@@ -20,7 +20,7 @@ from src.redcap_client import REDCapClient, REDCapAPIError
 from src.query_generator import QueryGenerator
 from src.pdf_generator import PDFReportGenerator
 from src.models import QualityReport
-from src.ai_analyzer import AIAnalyzer
+from src.ai_analyzer import create_ai_analyzer
 from src.auth_manager import auth_manager, login_required
 from src.db_manager import db
 
@@ -729,9 +729,7 @@ def ai_analysis():
         }), 400
     
     try:
-        from src.ai_analyzer import AIAnalyzer
-        
-        ai = AIAnalyzer()
+        ai = create_ai_analyzer()
         
         if not ai.is_available:
             return jsonify({
@@ -756,6 +754,33 @@ def ai_analysis():
         }), 500
 
 
+@app.route('/api/ai-analysis/stream', methods=['POST'])
+def ai_analysis_stream():
+    """Resumo executivo da IA em streaming (text/plain, entregue à medida que é gerado)."""
+    user_id = session.get('user_id')
+    ctx = get_analysis_context(user_id)
+    
+    if not ctx or not ctx['report']:
+        return jsonify({
+            'success': False,
+            'error': 'Execute uma análise primeiro'
+        }), 400
+    
+    ai = create_ai_analyzer()
+    
+    if not ai.is_available:
+        return jsonify({
+            'success': False,
+            'error': 'Configure ANTHROPIC_API_KEY no arquivo .env para usar análise com IA'
+        }), 400
+    
+    return Response(
+        stream_with_context(ai.stream_report_summary(ctx['report'])),
+        mimetype='text/plain; charset=utf-8',
+        headers={'X-Accel-Buffering': 'no'}
+    )
+
+
 @app.route('/api/download/pdf')
 def download_pdf():
     """Download do relatório em PDF."""
@@ -1088,7 +1113,7 @@ def generate_rule():
             # Extract simple names
             project_events = [e['unique_event_name'] for e in ctx['project_events']]
         
-        ai = AIAnalyzer()
+        ai = create_ai_analyzer()
         if not ai.is_available:
              return jsonify({'success': False, 'error': 'IA não configurada no servidor (API Key ausente).'}), 503
         
@@ -1264,7 +1289,7 @@ def generate_rule_from_text():
 
             
         print("DEBUG: Initializing AIAnalyzer")
-        ai = AIAnalyzer()
+        ai = create_ai_analyzer()
         
         # Get field context from user cache
         user_id = session.get('user_id')